@@ -1,8 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from risk_analyzer import RiskAnalyzer
+from rule_registry import RuleRegistry
+from rules import RuleError
+from revisions import RevisionError
 from backboard_client import BackboardClient
+from result_cache import ResultCache, cache_key, normalize_text
+from verdict_cache import VerdictCache
+from cascade import Cascade
+from handoff import HandoffStore, HandoffTooLarge, new_session, valid_session
+from jobs import JobQueue
+from metrics import metrics
+from response_format import MSGPACK_TYPES, compact_results, encode
+from html_extract import PageReader, PageTooLarge, relevant_text, section_summary
+from corpus_index import CorpusIndex
+import codecs
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,14 +24,115 @@ app = Flask(__name__)
 CORS(app)
 
 # Initialize clients
-risk_analyzer = RiskAnalyzer()
-backboard = BackboardClient(os.getenv('BACKBOARD_API_KEY'))
-received_page = None
+# The RiskAnalyzer for risk_rules.json; handlers read rules.analyzer once per request
+# and it is swapped for a new one when the file changes
+rules = RuleRegistry.from_env().watch()
+verdict_cache = VerdictCache.from_env()
+cascade = Cascade.from_env(rules.analyzer)
+rules.on_swap(cascade.use_analyzer)
+backboard = BackboardClient(os.getenv('BACKBOARD_API_KEY'), verdict_cache=verdict_cache, cascade=cascade)
+result_cache = ResultCache.from_env()
+
+
+def cache_job_result(key, results):
+    # Same key as a synchronous /analyze with use_ai, so either path reuses the
+    # other's work; a partial or failed AI pass would be served to both
+    if key and backboard.is_complete(results):
+        result_cache.set(key, results)
+
+
+# AI validation for /jobs runs here instead of in the request handler
+jobs = JobQueue.from_env(backboard.enhance_analysis, on_done=cache_job_result).start()
+
+# Longest a GET /jobs/<id>?wait= long-poll is held open
+JOB_MAX_WAIT = 30
+
+# Create (or load) the Backboard assistant now, not during the first user's request
+backboard.warm_up()
+
+# Pages from the extension, until the web app picks them up (shared by all workers)
+handoffs = HandoffStore.from_env()
+
+# Every analysis with its clauses and findings, searchable under /corpus (off unless CORPUS_DB is set)
+corpus = CorpusIndex.from_env()
+if corpus:
+    corpus.start()
+
+# Longest page of /corpus/search results
+CORPUS_PAGE_SIZE = 50
+
+# Bytes read from the request body at a time by /analyze/stream and /analyze/html
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Cache and cascade counters are read from their stats when /metrics is scraped
+metrics.add_collector('result_cache_events_total', lambda: result_cache.stats, label='event')
+metrics.add_collector('verdict_cache', lambda: verdict_cache.summary(), kind='gauge')
+metrics.add_collector('cascade', lambda: cascade.summary(), kind='gauge')
+metrics.add_collector('jobs', jobs.stats, kind='gauge')
+metrics.add_collector('handoffs', handoffs.summary, kind='gauge')
+metrics.add_collector('rules', rules.summary, kind='gauge')
+if corpus:
+    metrics.add_collector('corpus', corpus.summary, kind='gauge')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Opt-in stage breakdown, returned as a Server-Timing header
+    g.profile_token = metrics.start_profile() if request.headers.get('X-Profile') else None
+
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.request_start
+    if g.profile_token is not None:
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.stop_profile(g.profile_token), elapsed)
+    route = request.url_rule.rule if request.url_rule else 'other'
+    metrics.observe('http_request', elapsed, route=route)
+    metrics.inc('http_requests', route=route, status=response.status_code)
+    return response
+
+
+def shape(results):
+    """Results in the compact format if the client asked for ?format=compact"""
+    if request.args.get('format') == 'compact':
+        return compact_results(results, rules.analyzer)
+    return results
+
+
+def respond(payload, status=200):
+    """payload as MessagePack and/or gzip when the client's Accept headers allow it, else JSON"""
+    best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_TYPES, default='application/json')
+    with metrics.timer('encode'):
+        body, headers = encode(
+            payload,
+            use_msgpack=best in MSGPACK_TYPES,
+            use_gzip=request.accept_encodings['gzip'] > 0
+        )
+    metrics.inc('response_bytes', len(body), encoding=headers.get('Content-Encoding', 'identity'))
+    return Response(body, status=status, headers=headers)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy'})
+    return jsonify({
+        'status': 'healthy',
+        'backboard': backboard.status(),
+        'caches': {
+            'results': result_cache.stats,
+            'verdicts': verdict_cache.summary()
+        },
+        'cascade': cascade.summary(),
+        'jobs': jobs.stats(),
+        'handoffs': handoffs.summary(),
+        'rules': dict(rules.summary(), version=rules.analyzer.rules_version),
+        'corpus': corpus.summary() if corpus else None
+    })
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
@@ -28,15 +142,204 @@ def analyze():
         if not policy_text or len(policy_text) < 100:
             return jsonify({'error': 'Policy text too short'}), 400
         
+        results = analyze_text(policy_text, request.json.get('use_ai', False), request.json.get('url'))
+        return respond(shape(results))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def analyze_text(policy_text, use_ai=False, url=None):
+    """Regex (and optionally AI) results for policy_text, through the result cache.
+
+    Also recorded in the corpus index (if on), as a version of url's policy
+    when a url is given.
+    """
+    policy_text = normalize_text(policy_text)
+    use_ai = use_ai and backboard.is_configured()
+    analyzer = rules.analyzer
+    rules.remember(policy_text)
+    
+    def run_analysis():
         # Phase 1: Basic risk detection
-        results = risk_analyzer.analyze(policy_text)
+        results = analyzer.analyze(policy_text)
         
         # Phase 2: AI enhancement (if enabled)
+        if use_ai:
+            results = backboard.enhance_analysis(results)
+        
+        return results
+    
+    # Same policy + same patterns/prompts/model -> same answer. Concurrent
+    # identical requests share one computation. A failed or partial AI pass
+    # isn't cached, so the next request tries again.
+    versions = [analyzer.version, backboard.version if use_ai else 'regex-only']
+    results = result_cache.get_or_compute(
+        cache_key(policy_text, *versions),
+        run_analysis,
+        cacheable=backboard.is_complete if use_ai else None
+    )
+    if corpus:
+        corpus.submit(policy_text, results, key=url, analyzer_version=':'.join(versions))
+    return results
+
+
+def start_job(policy_text, use_ai=True):
+    """Regex results now, plus a background AI job if use_ai. Returns (job, HTTP status)."""
+    policy_text = normalize_text(policy_text)
+    analyzer = rules.analyzer
+    regex_key = cache_key(policy_text, analyzer.version, 'regex-only')
+    results = result_cache.get_or_compute(regex_key, lambda: analyzer.analyze(policy_text))
+    
+    if not use_ai or not backboard.is_configured():
+        return jobs.submit(results, done=True), 200
+    
+    ai_key = cache_key(policy_text, analyzer.version, backboard.version)
+    cached = result_cache.get(ai_key)
+    if cached is not None:
+        return jobs.submit(cached, key=ai_key, done=True), 200
+    
+    return jobs.submit(results, key=ai_key), 202
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Regex results right away, AI validation in the background.
+
+    Answers 202 with a job id and the regex results. GET /jobs/<id> (with
+    ?wait=<seconds> to long-poll) returns the AI-enhanced results once the
+    job is done.
+    """
+    try:
+        policy_text = request.json.get('policy', '')
+        
+        if not policy_text or len(policy_text) < 100:
+            return jsonify({'error': 'Policy text too short'}), 400
+        
+        job, status = start_job(policy_text)
+        return respond(dict(job, results=shape(job['results'])), status)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    wait = min(request.args.get('wait', 0, type=float), JOB_MAX_WAIT)
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return respond(dict(job, results=shape(job['results'])))
+
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    return jsonify(jobs.stats())
+
+
+def _read_body_chunks(stream, counter):
+    """Decode a (possibly chunked) request body as UTF-8 text, piece by piece"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        data = stream.read(STREAM_CHUNK_SIZE)
+        if not data:
+            break
+        text = decoder.decode(data)
+        counter['chars'] += len(text)
+        yield text
+    text = decoder.decode(b'', final=True)
+    counter['chars'] += len(text)
+    yield text
+
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Analyze a raw text/plain body without buffering it.
+
+    Meant for multi-MB documents sent with chunked transfer encoding, e.g.
+    curl -T policy.txt -H 'Transfer-Encoding: chunked' .../analyze/stream
+    """
+    try:
+        counter = {'chars': 0}
+        results = rules.analyzer.analyze_stream(_read_body_chunks(request.stream, counter))
+        
+        if counter['chars'] < 100:
+            return jsonify({'error': 'Policy text too short'}), 400
+        
+        use_ai = request.args.get('use_ai', 'false').lower() == 'true'
+        if use_ai and backboard.is_configured():
+            results = backboard.enhance_analysis(results)
+        
+        return respond(shape(results))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/analyze/html', methods=['POST'])
+def analyze_html():
+    """Analyze a whole page of raw HTML, e.g. from the extension.
+
+    The body may be gzip/deflate compressed (Content-Encoding). Only the
+    policy sections found by html_extract are analyzed; the response gets
+    an 'extraction' entry with their heading paths and the size stats.
+    Pass ?url= to file the result under that page in the corpus index.
+    """
+    try:
+        with metrics.timer('extract'):
+            reader = PageReader(request.headers.get('Content-Encoding'), request.mimetype_params.get('charset'))
+            while True:
+                data = request.stream.read(STREAM_CHUNK_SIZE)
+                if not data:
+                    break
+                reader.feed(data)
+            sections, stats = reader.close()
+        policy_text = relevant_text(sections)
+    except PageTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if len(policy_text) < 100:
+        return jsonify({'error': 'No policy sections found in the page', 'extraction': stats}), 400
+    
+    try:
+        use_ai = request.args.get('use_ai', 'false').lower() == 'true'
+        results = analyze_text(policy_text, use_ai, request.args.get('url'))
+        extraction = dict(stats, outline=section_summary(sections))
+        return respond(shape(dict(results, extraction=extraction)))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/analyze/revision', methods=['POST'])
+def analyze_revision():
+    """Re-analyze a new version of a policy given the previous /analyze/revision result.
+
+    Only changed clauses are scanned (and sent to Backboard), and the response
+    includes a 'revision' diff of which findings appeared or disappeared.
+    Omit 'previous' to get a first analysis to diff against later.
+    """
+    try:
+        policy_text = request.json.get('policy', '')
+        previous = request.json.get('previous')
+        
+        if not policy_text or len(policy_text) < 100:
+            return jsonify({'error': 'Policy text too short'}), 400
+        
+        results = rules.analyzer.analyze_revision(normalize_text(policy_text), previous)
+        
         use_ai = request.json.get('use_ai', False)
         if use_ai and backboard.is_configured():
+            results = backboard.reuse_validations(previous, results)
             results = backboard.enhance_analysis(results)
         
-        return jsonify(results)
+        # Always the full format: the client sends this back as 'previous'
+        return respond(results)
+    
+    except RevisionError as e:
+        return jsonify({'error': str(e)}), 400
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -44,16 +347,156 @@ def analyze():
 
 @app.route("/receive_data", methods=["POST"])
 def receive_data():
-    global received_page
-    data = request.get_json()
-    received_page = data.get("page_text", "")
-    print("Page text received:", received_page[:200], "...")  # print first 200 chars
-    return jsonify({"status": "ok"})
+    """Store a page from the extension under a session id for the web app.
+
+    With "analyze": true the page is analyzed right away (AI too if
+    "use_ai") and the job id is kept with it, so the web app can show the
+    results without posting the text back.
+    """
+    # JSON escaping can make the body several times bigger than the text
+    if request.content_length and request.content_length > handoffs.max_entry_bytes * 6 + 4096:
+        return jsonify({"error": "Page too large"}), 413
+
+    data = request.get_json() or {}
+    page_text = data.get("page_text") or ""
+    session = data.get("session") or new_session()
+    if not valid_session(session):
+        return jsonify({"error": "Invalid session"}), 400
+
+    try:
+        handoffs.put(session, page_text)
+    except HandoffTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    job = None
+    if data.get("analyze") and len(page_text) >= 100:
+        job, _status = start_job(page_text, use_ai=bool(data.get("use_ai")))
+        handoffs.attach_job(session, job["job_id"])
+
+    print(f"📥 Page received for session {session[:8]} ({len(page_text)} chars)")
+    return jsonify({"status": "ok", "session": session, "job_id": job["job_id"] if job else None})
 
 @app.route("/get_page", methods=["GET"])
 def get_page():
-    global received_page
-    return jsonify({"page_text": received_page or ""})
+    session = request.args.get("session", "")
+    if not valid_session(session):
+        return jsonify({"error": "Missing or invalid session"}), 400
+
+    entry = handoffs.get(session, with_text=request.args.get("text", "1") != "0")
+    if entry is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return jsonify(entry)
+
+@app.route('/corpus/search', methods=['GET'])
+def corpus_search():
+    """Recorded policies by category score, keyword, domain and risk level.
+
+    ?category= and ?q= may repeat (every one must match); min_score/max_score
+    bound each category's score, or the overall score if no category is
+    given. ?all_versions=true also searches superseded versions.
+    """
+    if not corpus:
+        return jsonify({'error': 'Corpus index is off (set CORPUS_DB)'}), 404
+    
+    args = request.args
+    categories = [c for value in args.getlist('category') for c in value.split(',') if c]
+    unknown = [c for c in categories if c not in rules.analyzer.patterns]
+    if unknown:
+        return jsonify({'error': f"Unknown category: {', '.join(unknown)}"}), 400
+    
+    try:
+        min_score = args.get('min_score', type=float)
+        max_score = args.get('max_score', type=float)
+        with metrics.timer('corpus_query'):
+            found = corpus.search(
+                categories, min_score, max_score, args.getlist('q'),
+                domain=args.get('domain'),
+                risk_level=args.get('risk_level'),
+                all_versions=args.get('all_versions', 'false').lower() == 'true',
+                limit=args.get('limit', CORPUS_PAGE_SIZE, type=int),
+                offset=args.get('offset', 0, type=int)
+            )
+        return respond(found)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/corpus/documents', methods=['GET'])
+def corpus_document():
+    """Score history of one recorded policy (?key= its url or id)"""
+    if not corpus:
+        return jsonify({'error': 'Corpus index is off (set CORPUS_DB)'}), 404
+    
+    document = corpus.document(request.args.get('key', ''))
+    if document is None:
+        return jsonify({'error': 'Unknown document'}), 404
+    return respond(document)
+
+
+@app.route('/corpus/versions/<int:version_id>', methods=['GET'])
+def corpus_version(version_id):
+    """One recorded version: results, matched clauses and, with ?text=true, the policy text"""
+    if not corpus:
+        return jsonify({'error': 'Corpus index is off (set CORPUS_DB)'}), 404
+    
+    entry = corpus.version(version_id, with_text=request.args.get('text', 'false').lower() == 'true')
+    if entry is None:
+        return jsonify({'error': 'Unknown version'}), 404
+    return respond(entry)
+
+
+@app.route('/corpus/ingest', methods=['POST'])
+def corpus_ingest():
+    """Analyze and record a batch: {"documents": [{"text": ..., "url": ...}, ...]} in one transaction"""
+    if not corpus:
+        return jsonify({'error': 'Corpus index is off (set CORPUS_DB)'}), 404
+    
+    try:
+        documents = request.json.get('documents') or []
+        analyzer = rules.analyzer
+        items = []
+        for document in documents:
+            text = normalize_text(document.get('text', ''))
+            if len(text) < 100:
+                return jsonify({'error': f"Policy text too short: {document.get('url') or 'document'}"}), 400
+            items.append(dict(text=text, results=analyzer.analyze(text), key=document.get('url'),
+                              domain=document.get('domain'), analyzer_version=f'{analyzer.version}:regex-only'))
+        
+        with metrics.timer('corpus_ingest'):
+            recorded = corpus.add_many(items)
+        return jsonify({
+            'recorded': [{'version_id': version_id, 'new_version': created} for version_id, created in recorded]
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/rules', methods=['GET'])
+def rules_info():
+    """The rule set this worker is using, plus its recent reloads"""
+    return jsonify(rules.describe())
+
+
+@app.route('/rules/reload', methods=['POST'])
+def rules_reload():
+    """Re-read the rule file now instead of waiting for the watcher.
+
+    Answers with the old and new versions, the compile time and the new
+    rules' timing and score changes on recently analyzed policies. With
+    ?dry_run=true the new rules are only checked, not swapped in. If
+    RULES_RELOAD_TOKEN is set, the X-Reload-Token header must match it.
+    """
+    token = os.getenv('RULES_RELOAD_TOKEN')
+    if token and request.headers.get('X-Reload-Token') != token:
+        return jsonify({'error': 'Bad or missing X-Reload-Token'}), 403
+    
+    try:
+        report = rules.reload(dry_run=request.args.get('dry_run', 'false').lower() == 'true')
+        return jsonify(report)
+    
+    except RuleError as e:
+        return jsonify({'error': str(e), 'problems': e.problems, 'version': rules.analyzer.rules_version}), 400
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -1,21 +1,348 @@
-import requests
+import contextvars
+import hashlib
+import json
 import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from batching import estimate_tokens, pack_batches, parse_json_array
+from gdpr_retriever import retriever
+from metrics import metrics
+from result_cache import fingerprint
+from revisions import check_matches
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+
+GDPR_PATH = os.path.join(os.path.dirname(__file__), 'gdpr_articles.txt')
+
+# Where the GDPR text comes from:
+#   local    - articles picked by the in-process retriever go into the prompt (no knowledge base)
+#   remote   - Backboard's knowledge base (RAG) plus a second call for the citation
+#   articles - no LLM at all, just the best matching articles as citations
+GDPR_MODES = ('local', 'remote', 'articles')
+
+# Article paragraphs put into each prompt in local mode
+GDPR_TOP_K = 3
+
+# Knowledge base / assistant IDs survive restarts and are shared by all workers
+STATE_PATH = os.getenv('BACKBOARD_STATE_FILE', os.path.join(os.path.dirname(__file__), '.backboard_state.json'))
+
+MODEL = "gpt-4o"  # Using GPT-4o as it's cheaper and you already have it
+
+SYSTEM_PROMPT = """You are a GDPR compliance expert. Analyze privacy policy clauses against GDPR regulations.
+
+When analyzing clauses:
+1. Search the knowledge base for relevant GDPR articles
+2. Compare the clause against the specific GDPR requirements
+3. Identify conflicts or compliance issues
+4. Cite the specific GDPR article number and provision
+5. Be precise and factual
+
+Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name."""
+
+# Local mode: the relevant articles come with every message, there is no knowledge base to search
+GROUNDED_SYSTEM_PROMPT = """You are a GDPR compliance expert. Analyze privacy policy clauses against GDPR regulations.
+
+When analyzing clauses:
+1. Use the GDPR articles provided with each clause
+2. Compare the clause against the specific GDPR requirements
+3. Identify conflicts or compliance issues
+4. Cite the specific GDPR article number and provision
+5. Be precise and factual
+
+Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name."""
+
+# Map categories to GDPR focus areas
+CATEGORY_GDPR_FOCUS = {
+    'data_resale': 'consent requirements and lawful basis for selling or monetizing user data',
+    'biometric': 'special categories of personal data, specifically biometric data processing',
+    'indefinite_retention': 'storage limitation and data retention requirements',
+    'vague_language': 'transparency, purpose limitation, and specificity requirements'
+}
+
+VALIDATION_PROMPT = """Analyze this privacy policy clause for GDPR compliance:
+
+CLAUSE:
+"{clause}"
+
+FOCUS AREA: {focus}
+
+INSTRUCTIONS:
+1. Search the GDPR knowledge base for relevant articles about {focus}
+2. Determine if this clause violates or conflicts with GDPR requirements
+3. Answer YES or NO
+4. Provide a 1-2 sentence explanation citing the specific GDPR article
+
+FORMAT:
+[YES/NO]. [Explanation with GDPR Article citation]"""
+
+CITATION_PROMPT = """Based on the GDPR knowledge base, provide a detailed regulatory citation for this issue:
+
+CLAUSE: "{clause}"
+
+ISSUE: {focus}
+
+Provide:
+1. The specific GDPR Article number and name
+2. A 1-2 sentence explanation of how this clause conflicts with that article
+
+FORMAT:
+Article: [Article number and name]
+Conflict: [Detailed explanation]"""
+
+# Local mode: validation and citation in one call, grounded in retrieved articles
+GROUNDED_PROMPT = """Analyze this privacy policy clause for GDPR compliance:
+
+CLAUSE:
+"{clause}"
+
+FOCUS AREA: {focus}
+
+RELEVANT GDPR ARTICLES:
+{articles}
+
+INSTRUCTIONS:
+1. Determine if this clause violates or conflicts with the GDPR articles above
+2. Answer YES or NO
+3. Provide a 1-2 sentence explanation
+4. Name the article it conflicts with, or None
+
+FORMAT:
+[YES/NO]. [Explanation]
+Article: [Article number and name, or None]"""
+
+
+# Several clauses in one message; replaces one validation + one citation call each
+BATCH_PROMPT = """Analyze each numbered privacy policy clause below for GDPR compliance.
+Search the GDPR knowledge base for the articles relevant to each clause's focus area.
+
+{clauses}
+
+For each clause, decide whether it violates or conflicts with GDPR requirements for its
+focus area and cite the specific GDPR article.
+
+Respond with ONLY a JSON array, one object per clause, in this format:
+[{{"id": 1, "verdict": "YES", "explanation": "1-2 sentences citing the article", "article": "Article X(Y)(Z) - Article name"}}]
+
+"verdict" is "YES" or "NO". Use an empty "article" if there is no conflict."""
+
+BATCH_CLAUSE = '[{id}] FOCUS AREA: {focus}\nCLAUSE: "{clause}"'
+
+GROUNDED_BATCH_PROMPT = BATCH_PROMPT.replace(
+    "Search the GDPR knowledge base for the articles relevant to each clause's focus area.",
+    "Each clause comes with the GDPR articles relevant to it."
+)
+GROUNDED_BATCH_CLAUSE = BATCH_CLAUSE + '\nGDPR ARTICLES:\n{articles}'
+
+# Token cost of the batch instructions, on top of the clauses themselves
+BATCH_OVERHEAD_TOKENS = estimate_tokens(BATCH_PROMPT)
+
+
+def _articles_for(match, gdpr_focus):
+    return retriever.snippets(f"{match['text']} {gdpr_focus}", GDPR_TOP_K)
+
+
+def _parse_verdict(entry):
+    """Turn one batched {verdict, explanation, article} object into match fields"""
+    verdict = str(entry.get('verdict', '')).strip().upper()
+    explanation = str(entry.get('explanation', '')).strip()
+    article = str(entry.get('article') or '').strip()
+    if verdict not in ('YES', 'NO') or not explanation:
+        return None
+    
+    fields = {'ai_validation': f"{verdict}. {explanation}"}
+    if verdict == 'YES' and article:
+        fields['gdpr_citation'] = f"Article: {article}\nConflict: {explanation}"
+    return fields
+
+
+def _parse_grounded(response):
+    """Turn a GROUNDED_PROMPT answer ('YES. ...' plus an 'Article: ...' line) into match fields"""
+    article = ''
+    lines = []
+    for line in response.strip().splitlines():
+        if line.strip().lower().startswith('article:'):
+            article = line.split(':', 1)[1].strip()
+        elif line.strip():
+            lines.append(line.strip())
+    validation = ' '.join(lines)
+    verdict, _, explanation = validation.partition('.')
+    if article.lower().strip('.') == 'none':
+        article = ''
+    fields = _parse_verdict({'verdict': verdict, 'explanation': explanation, 'article': article})
+    return fields or {'ai_validation': response.strip()}
+
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 class BackboardClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=None, max_workers=6, max_retries=2, deadline=90, batch_tokens=None,
+                 verdict_cache=None, cascade=None, rate_limiter=None, gdpr_mode=None):
         self.api_key = api_key
-        self.base_url = "https://app.backboard.io/api"
+        self.base_url = base_url or os.getenv('BACKBOARD_BASE_URL', "https://app.backboard.io/api")
         self.headers = {"X-API-Key": self.api_key}
         self.assistant_id = None
         self.knowledge_base_id = None
-    
-    def is_configured(self):
-        is_valid = self.api_key is not None and len(self.api_key) > 20 and self.api_key != 'your_api_key_here'
-        if is_valid:
+        
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.deadline = deadline  # seconds for a whole enhance_analysis() run
+        
+        # Pack clauses into one prompt up to this many tokens (0 = one call per clause)
+        if batch_tokens is None:
+            batch_tokens = int(os.getenv('BACKBOARD_BATCH_TOKENS', 0))
+        self.batch_tokens = batch_tokens
+        
+        self.gdpr_mode = gdpr_mode or os.getenv('GDPR_MODE', 'local')
+        if self.gdpr_mode not in GDPR_MODES:
+            raise ValueError(f"GDPR_MODE must be one of {', '.join(GDPR_MODES)}, not {self.gdpr_mode!r}")
+        self.system_prompt = SYSTEM_PROMPT if self.gdpr_mode == 'remote' else GROUNDED_SYSTEM_PROMPT
+        
+        # Optional VerdictCache: boilerplate clauses seen on other sites skip the LLM
+        self.verdict_cache = verdict_cache
+        
+        # Optional Cascade: matches the regex tier is sure about skip the LLM
+        self.cascade = cascade
+        
+        # Optional RateLimiter shared with other clients (e.g. bulk runs)
+        self.rate_limiter = rate_limiter
+        
+        # One keep-alive connection pool shared by all worker threads
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backboard')
+        self._bootstrap_lock = threading.Lock()
+        self.state_path = STATE_PATH
+        self.bootstrap_status = 'not_started'
+        
+        # The key can't change at runtime, so check (and log) it once
+        self._configured = (
+            self.api_key is not None and len(self.api_key) > 20 and self.api_key != 'your_api_key_here'
+        )
+        if self._configured:
             print(f"🔑 Backboard API Key configured")
         else:
             print(f"⚠️ API Key not properly configured")
-        return is_valid
+    
+    @property
+    def version(self):
+        """Fingerprint of everything that shapes the AI output, for cache keys"""
+        if self.gdpr_mode == 'articles':
+            return fingerprint('articles', CATEGORY_GDPR_FOCUS, GDPR_TOP_K, retriever.version)
+        if self.gdpr_mode == 'local':
+            prompts = (GROUNDED_PROMPT, GDPR_TOP_K, retriever.version)
+            batch_prompts = (GROUNDED_BATCH_PROMPT, GROUNDED_BATCH_CLAUSE)
+        else:
+            prompts = (VALIDATION_PROMPT, CITATION_PROMPT)
+            batch_prompts = (BATCH_PROMPT, BATCH_CLAUSE)
+        return fingerprint(
+            MODEL, self.system_prompt, *prompts, CATEGORY_GDPR_FOCUS,
+            batch_prompts if self.batch_tokens else None,
+            self.cascade.version if self.cascade else None
+        )
+    
+    def is_configured(self):
+        """True if enhance_analysis() can do anything (article-only mode needs no API key)"""
+        return self._configured or self.gdpr_mode == 'articles'
+    
+    @property
+    def ready(self):
+        return self.assistant_id is not None
+    
+    def status(self):
+        """Bootstrap state for /health"""
+        if self.gdpr_mode == 'articles':
+            return {'configured': True, 'ready': True, 'bootstrap': 'disabled', 'gdpr_mode': self.gdpr_mode}
+        if not self._configured:
+            return {'configured': False, 'ready': False, 'bootstrap': 'disabled', 'gdpr_mode': self.gdpr_mode}
+        return {
+            'configured': True,
+            'ready': self.ready,
+            'gdpr_mode': self.gdpr_mode,
+            'bootstrap': self.bootstrap_status,
+            'assistant_id': self.assistant_id,
+            'knowledge_base_id': self.knowledge_base_id
+        }
+    
+    def warm_up(self, background=True):
+        """Bootstrap the knowledge base and assistant before the first request needs them"""
+        if not self._configured or self.gdpr_mode == 'articles':
+            return None
+        if not background:
+            return self._get_or_create_assistant()
+        thread = threading.Thread(target=self._get_or_create_assistant, name='backboard-warm-up', daemon=True)
+        thread.start()
+        return thread
+    
+    def _bootstrap_key(self):
+        """Remote resources are only reusable for the same GDPR text, prompt, model and API"""
+        if self.gdpr_mode != 'remote':
+            # No knowledge base, the assistant doesn't depend on the GDPR text
+            return fingerprint(self.system_prompt, MODEL, self.base_url)
+        with open(GDPR_PATH, 'rb') as f:
+            gdpr_hash = hashlib.sha256(f.read()).hexdigest()
+        return fingerprint(gdpr_hash, SYSTEM_PROMPT, MODEL, self.base_url)
+    
+    def _read_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    def _write_state(self, state):
+        # Write-then-rename so a crash never leaves a half-written file behind
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.backboard_state.')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+    
+    def _post(self, path, timeout, **kwargs):
+        """POST on the pooled session, retrying transient failures with backoff"""
+        # /threads/<id>/messages -> messages, so IDs don't become label values
+        endpoint = path.rsplit('/', 1)[-1]
+        for attempt in range(self.max_retries + 1):
+            try:
+                start = time.perf_counter()
+                try:
+                    response = self.session.post(f"{self.base_url}{path}", timeout=timeout, **kwargs)
+                except requests.RequestException as e:
+                    metrics.inc('backboard_calls', endpoint=endpoint, status=type(e).__name__)
+                    raise
+                finally:
+                    metrics.observe('backboard_call', time.perf_counter() - start, endpoint=endpoint)
+                metrics.inc('backboard_calls', endpoint=endpoint, status=response.status_code)
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    raise requests.HTTPError(f"{response.status_code} from {path}", response=response)
+                response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                retryable = not isinstance(e, requests.HTTPError) or (
+                    e.response is not None and e.response.status_code in RETRY_STATUSES
+                )
+                if not retryable or attempt == self.max_retries:
+                    raise
+                metrics.inc('backboard_retries', endpoint=endpoint)
+                delay = 0.5 * 2 ** attempt + random.uniform(0, 0.25)
+                print(f"  🔁 Retrying {path} in {delay:.1f}s ({e})")
+                time.sleep(delay)
     
     def _create_knowledge_base(self):
         """Create knowledge base with GDPR articles"""
@@ -26,29 +353,26 @@ class BackboardClient:
             print("📚 Creating GDPR knowledge base...")
             
             # Read GDPR articles
-            gdpr_path = os.path.join(os.path.dirname(__file__), 'gdpr_articles.txt')
-            with open(gdpr_path, 'r', encoding='utf-8') as f:
+            with open(GDPR_PATH, 'r', encoding='utf-8') as f:
                 gdpr_text = f.read()
             
             # Create knowledge base
-            response = requests.post(
-                f"{self.base_url}/knowledge-bases",
+            response = self._post(
+                "/knowledge-bases",
                 json={
                     "name": "GDPR Regulation",
                     "description": "GDPR articles for privacy policy analysis"
                 },
-                headers=self.headers,
                 timeout=10
             )
-            response.raise_for_status()
             kb_id = response.json()["knowledge_base_id"]
             
             print(f"✅ Knowledge base created: {kb_id}")
             
             # Upload GDPR document to knowledge base
             print("📄 Uploading GDPR articles...")
-            upload_response = requests.post(
-                f"{self.base_url}/knowledge-bases/{kb_id}/documents",
+            self._post(
+                f"/knowledge-bases/{kb_id}/documents",
                 json={
                     "content": gdpr_text,
                     "metadata": {
@@ -56,10 +380,8 @@ class BackboardClient:
                         "type": "legal_text"
                     }
                 },
-                headers=self.headers,
                 timeout=15
             )
-            upload_response.raise_for_status()
             print("✅ GDPR articles uploaded to knowledge base")
             
             self.knowledge_base_id = kb_id
@@ -76,27 +398,53 @@ class BackboardClient:
         if self.assistant_id:
             return self.assistant_id
         
+        # Worker threads (and other gunicorn workers, via the file lock) race
+        # here on startup; only one may create the remote resources
+        with self._bootstrap_lock:
+            if self.assistant_id:
+                return self.assistant_id
+            
+            self.bootstrap_status = 'running'
+            with open(self.state_path + '.lock', 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    key = self._bootstrap_key()
+                    state = self._read_state()
+                    saved = state.get(key)
+                    if saved:
+                        self.knowledge_base_id = saved.get('knowledge_base_id')
+                        self.assistant_id = saved['assistant_id']
+                        print(f"♻️ Reusing Backboard assistant {self.assistant_id}")
+                    elif self._create_assistant():
+                        state[key] = {
+                            'assistant_id': self.assistant_id,
+                            'knowledge_base_id': self.knowledge_base_id,
+                            'created': time.time()
+                        }
+                        self._write_state(state)
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            
+            self.bootstrap_status = 'done' if self.assistant_id else 'failed'
+            return self.assistant_id
+    
+    def _create_assistant(self):
         try:
-            # First create knowledge base
-            kb_id = self._create_knowledge_base()
-            if not kb_id:
-                print("⚠️ Proceeding without knowledge base")
+            # First create knowledge base (local mode retrieves articles itself)
+            kb_id = None
+            if self.gdpr_mode == 'remote':
+                kb_id = self._create_knowledge_base()
+                if not kb_id:
+                    print("⚠️ Proceeding without knowledge base")
             
             # Create assistant
-            print("🤖 Creating Backboard assistant with RAG...")
+            print(f"🤖 Creating Backboard assistant ({self.gdpr_mode} GDPR articles)...")
             assistant_config = {
                 "name": "Policy Forensics GDPR Analyzer",
-                "system_prompt": """You are a GDPR compliance expert. Analyze privacy policy clauses against GDPR regulations.
-
-When analyzing clauses:
-1. Search the knowledge base for relevant GDPR articles
-2. Compare the clause against the specific GDPR requirements
-3. Identify conflicts or compliance issues
-4. Cite the specific GDPR article number and provision
-5. Be precise and factual
-
-Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name.""",
-                "model": "gpt-4o"  # Using GPT-4o as it's cheaper and you already have it
+                "system_prompt": self.system_prompt,
+                "model": MODEL
             }
             
             # Add knowledge base if created successfully
@@ -104,13 +452,7 @@ Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name.
                 assistant_config["knowledge_base_ids"] = [kb_id]
                 print("✅ Assistant will use GDPR knowledge base (RAG enabled)")
             
-            response = requests.post(
-                f"{self.base_url}/assistants",
-                json=assistant_config,
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._post("/assistants", json=assistant_config, timeout=10)
             
             self.assistant_id = response.json()["assistant_id"]
             print(f"✅ Assistant created: {self.assistant_id}")
@@ -122,6 +464,18 @@ Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name.
                 print(f"Response: {e.response.text[:300]}")
             return None
     
+    def _forget_assistant(self, assistant_id):
+        with self._bootstrap_lock:
+            if self.assistant_id != assistant_id:
+                return
+            print(f"⚠️ Assistant {assistant_id} no longer exists, dropping saved state")
+            self.assistant_id = None
+            self.knowledge_base_id = None
+            self.bootstrap_status = 'not_started'
+            state = self._read_state()
+            state.pop(self._bootstrap_key(), None)
+            self._write_state(state)
+    
     def _call_api(self, prompt):
         """Call Backboard.io API with RAG support"""
         if not self.is_configured():
@@ -134,23 +488,24 @@ Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name.
                 return None
             
             # Create thread
-            thread_response = requests.post(
-                f"{self.base_url}/assistants/{assistant_id}/threads",
-                json={},
-                headers=self.headers,
-                timeout=10
-            )
-            thread_response.raise_for_status()
+            try:
+                thread_response = self._post(f"/assistants/{assistant_id}/threads", json={}, timeout=10)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    # Saved assistant was deleted remotely; bootstrap again next time
+                    self._forget_assistant(assistant_id)
+                raise
             thread_id = thread_response.json()["thread_id"]
             
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
             # Send message (RAG happens automatically if knowledge base is attached)
-            message_response = requests.post(
-                f"{self.base_url}/threads/{thread_id}/messages",
-                headers=self.headers,
+            message_response = self._post(
+                f"/threads/{thread_id}/messages",
                 data={"content": prompt, "stream": "false"},
                 timeout=30
             )
-            message_response.raise_for_status()
             
             result = message_response.json()
             content = result.get("content", "")
@@ -162,77 +517,229 @@ Always format GDPR citations as: "Article X(Y)(Z)" followed by the article name.
                 print(f"Response: {e.response.text[:200]}")
             return None
     
-    def enhance_analysis(self, results):
-        """Phase 2: Add AI validation with RAG-based GDPR analysis"""
+    def _verdict_namespace(self, gdpr_focus):
+        if self.gdpr_mode == 'local':
+            return fingerprint(MODEL, self.system_prompt, GROUNDED_PROMPT, retriever.version, gdpr_focus)
+        return fingerprint(MODEL, SYSTEM_PROMPT, VALIDATION_PROMPT, CITATION_PROMPT, gdpr_focus)
+    
+    def _enhance_match(self, match, gdpr_focus):
+        """Validate one clause (plus a citation if it conflicts). Returns the fields to set."""
+        if self.gdpr_mode == 'local':
+            # One call: the retrieved articles are in the prompt, the citation comes back with the verdict
+            prompt = GROUNDED_PROMPT.format(
+                clause=match['text'], focus=gdpr_focus, articles=_articles_for(match, gdpr_focus)
+            )
+            ai_response = self._call_api(prompt)
+            return _parse_grounded(ai_response) if ai_response else None
         
-        print("🤖 Starting RAG-enhanced AI analysis...")
+        # RAG-enhanced validation prompt
+        validation_prompt = VALIDATION_PROMPT.format(clause=match['text'], focus=gdpr_focus)
+        ai_response = self._call_api(validation_prompt)
+        if not ai_response:
+            return None
         
-        # Map categories to GDPR focus areas
-        category_gdpr_focus = {
-            'data_resale': 'consent requirements and lawful basis for selling or monetizing user data',
-            'biometric': 'special categories of personal data, specifically biometric data processing',
-            'indefinite_retention': 'storage limitation and data retention requirements',
-            'vague_language': 'transparency, purpose limitation, and specificity requirements'
-        }
+        fields = {'ai_validation': ai_response}
+        
+        # If violation detected, get detailed GDPR citation
+        if 'YES' in ai_response.upper() or 'VIOLAT' in ai_response.upper() or 'CONFLICT' in ai_response.upper():
+            citation_prompt = CITATION_PROMPT.format(clause=match['text'], focus=gdpr_focus)
+            gdpr_response = self._call_api(citation_prompt)
+            if gdpr_response:
+                fields['gdpr_citation'] = gdpr_response
+        
+        return fields
+    
+    def _batch_clause(self, clause_id, match, gdpr_focus):
+        if self.gdpr_mode == 'local':
+            return GROUNDED_BATCH_CLAUSE.format(
+                id=clause_id, focus=gdpr_focus, clause=match['text'], articles=_articles_for(match, gdpr_focus)
+            )
+        return BATCH_CLAUSE.format(id=clause_id, focus=gdpr_focus, clause=match['text'])
+    
+    def _enhance_batch(self, batch):
+        """Validate a batch of (category, idx, match, focus) jobs with one call.
+
+        Entries the model didn't answer properly are retried one clause at a
+        time. Returns the fields to set for each job (None if it failed).
+        """
+        if len(batch) == 1:
+            _category, _idx, match, gdpr_focus = batch[0]
+            return [self._enhance_match(match, gdpr_focus)]
         
-        for category, gdpr_focus in category_gdpr_focus.items():
+        clauses = '\n\n'.join(
+            self._batch_clause(i + 1, match, focus) for i, (_category, _idx, match, focus) in enumerate(batch)
+        )
+        prompt = GROUNDED_BATCH_PROMPT if self.gdpr_mode == 'local' else BATCH_PROMPT
+        ai_response = self._call_api(prompt.format(clauses=clauses))
+        verdicts = parse_json_array(ai_response, len(batch), _parse_verdict)
+        
+        fields = []
+        for (category, idx, match, gdpr_focus), verdict in zip(batch, verdicts):
+            if verdict is None:
+                metrics.inc('backboard_parse_failures')
+                print(f"  🔁 No usable verdict for {category} clause {idx + 1}, retrying on its own")
+                fields.append(self._enhance_match(match, gdpr_focus))
+            else:
+                fields.append(verdict)
+        return fields
+    
+    def enhance_analysis(self, results, deadline=None):
+        """Phase 2: Add AI validation with RAG-based GDPR analysis
+        
+        Clauses are validated in parallel on the shared worker pool. Whatever
+        hasn't finished by the deadline is left out and the results are
+        marked with 'ai_partial'; so are results with failed calls, counted
+        in 'ai_failed'. Only a full pass is stamped with 'ai_version'.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        start = time.perf_counter()
+        # A rerun (e.g. a retried job) says only how this pass went
+        for marker in ('ai_partial', 'ai_failed', 'ai_version'):
+            results.pop(marker, None)
+        if self.gdpr_mode == 'articles':
+            return self._cite_articles(results, start)
+        print("🤖 Starting RAG-enhanced AI analysis...")
+        
+        jobs = []
+        for category, gdpr_focus in CATEGORY_GDPR_FOCUS.items():
             if category in results and results[category]['matches']:
-                print(f"\n🔍 Enhancing {category} with RAG...")
-                
-                all_matches = results[category]['matches']
-                
                 # Enhance up to 3 clauses per category
-                max_to_enhance = min(3, len(all_matches))
-                
-                for idx in range(max_to_enhance):
-                    match = all_matches[idx]
-                    print(f"  → Analyzing clause {idx + 1}/{max_to_enhance}...")
-                    
-                    # RAG-enhanced validation prompt
-                    validation_prompt = f"""Analyze this privacy policy clause for GDPR compliance:
-
-CLAUSE:
-"{match['text']}"
-
-FOCUS AREA: {gdpr_focus}
-
-INSTRUCTIONS:
-1. Search the GDPR knowledge base for relevant articles about {gdpr_focus}
-2. Determine if this clause violates or conflicts with GDPR requirements
-3. Answer YES or NO
-4. Provide a 1-2 sentence explanation citing the specific GDPR article
-
-FORMAT:
-[YES/NO]. [Explanation with GDPR Article citation]"""
-
-                    ai_response = self._call_api(validation_prompt)
-                    
-                    if ai_response:
-                        match['ai_validation'] = ai_response
-                        print(f"  ✅ RAG-enhanced validation complete")
-                        
-                        # If violation detected, get detailed GDPR citation
-                        if 'YES' in ai_response.upper() or 'VIOLAT' in ai_response.upper() or 'CONFLICT' in ai_response.upper():
-                            citation_prompt = f"""Based on the GDPR knowledge base, provide a detailed regulatory citation for this issue:
-
-CLAUSE: "{match['text']}"
-
-ISSUE: {gdpr_focus}
-
-Provide:
-1. The specific GDPR Article number and name
-2. A 1-2 sentence explanation of how this clause conflicts with that article
-
-FORMAT:
-Article: [Article number and name]
-Conflict: [Detailed explanation]"""
-
-                            gdpr_response = self._call_api(citation_prompt)
-                            if gdpr_response:
-                                match['gdpr_citation'] = gdpr_response
-                                print(f"  ⚖️ GDPR citation retrieved from knowledge base")
-                    else:
-                        print(f"  ⚠️ API call failed for clause {idx + 1}")
+                for idx, match in enumerate(results[category]['matches'][:3]):
+                    if 'ai_validation' in match:
+                        print(f"  ♻️ {category} clause {idx + 1} unchanged, reusing validation")
+                        continue
+                    if self.cascade:
+                        fields = self.cascade.settle_match(category, match)
+                        if fields:
+                            match.update(fields)
+                            print(f"  📏 {category} clause {idx + 1} settled by rules")
+                            continue
+                    if self.verdict_cache:
+                        cached = self.verdict_cache.get(self._verdict_namespace(gdpr_focus), match['text'])
+                        if cached:
+                            match.update(cached)
+                            print(f"  💾 {category} clause {idx + 1} answered from verdict cache")
+                            continue
+                    jobs.append((category, idx, match, gdpr_focus))
+        
+        if jobs and not self._get_or_create_assistant():
+            results['ai_partial'] = True
+            results['ai_failed'] = len(jobs)
+            print(f"  ⚠️ No Backboard assistant, {len(jobs)} clauses left unvalidated")
+            return results
+        
+        if self.batch_tokens:
+            batches = pack_batches(
+                jobs, self.batch_tokens - BATCH_OVERHEAD_TOKENS,
+                cost=lambda job: estimate_tokens(self._batch_clause(0, job[2], job[3]))
+            )
+        else:
+            batches = [[job] for job in jobs]
+        
+        if self.cascade:
+            self.cascade.record_llm_calls(len(batches))
+        # Each worker runs in a copy of this context, so its call timings reach the request's profile
+        futures = {
+            self._executor.submit(contextvars.copy_context().run, self._enhance_batch, batch): batch
+            for batch in batches
+        }
+        print(f"🔍 Enhancing {len(jobs)} clauses in {len(batches)} requests ({self.max_workers} at a time)...")
+        done, pending = wait(futures, timeout=deadline)
+        
+        # Only this thread writes to results, stragglers can't touch the response
+        failed = 0
+        for future in done:
+            batch = futures[future]
+            batch_fields = future.result() if future.exception() is None else [None] * len(batch)
+            for (category, idx, match, gdpr_focus), fields in zip(batch, batch_fields):
+                if fields:
+                    match.update(fields)
+                    if self.verdict_cache:
+                        self.verdict_cache.put(self._verdict_namespace(gdpr_focus), match['text'], fields)
+                    print(f"  ✅ {category} clause {idx + 1} validated")
+                else:
+                    failed += 1
+                    print(f"  ⚠️ API call failed for {category} clause {idx + 1}")
+        
+        if pending:
+            for future in pending:
+                future.cancel()
+            results['ai_partial'] = True
+            print(f"  ⏱️ Deadline of {deadline}s hit, {sum(len(futures[f]) for f in pending)} clauses left unvalidated")
+        if failed:
+            results['ai_partial'] = True
+            results['ai_failed'] = failed
         
+        metrics.observe('ai_enhance', time.perf_counter() - start)
+        if results.get('ai_partial'):
+            print("\n⚠️ RAG-enhanced analysis incomplete")
+            return results
+        results['ai_version'] = self.version
         print("\n✨ RAG-enhanced analysis complete!")
+        return results
+    
+    def is_complete(self, results):
+        """True if results had a full AI pass from this client, so they can be cached"""
+        if results.get('ai_partial') or results.get('ai_version') != self.version:
+            return False
+        if self.gdpr_mode == 'articles':
+            return True
+        return all(
+            'ai_validation' in match
+            for category in CATEGORY_GDPR_FOCUS if category in results
+            for match in results[category]['matches'][:3]
+        )
+    
+    def _cite_articles(self, results, start):
+        """Article-only mode: attach the best matching GDPR articles, no LLM and no network"""
+        cited = 0
+        for category, gdpr_focus in CATEGORY_GDPR_FOCUS.items():
+            if category not in results:
+                continue
+            for match in results[category]['matches'][:3]:
+                if 'gdpr_citation' in match:
+                    continue
+                fields = retriever.cite(match['text'], gdpr_focus)
+                if fields:
+                    match.update(fields)
+                    cited += 1
+        results['ai_version'] = self.version
+        metrics.observe('ai_enhance', time.perf_counter() - start)
+        print(f"⚖️ Cited GDPR articles for {cited} clauses (article-only mode)")
+        return results
+    
+    def reuse_validations(self, previous, results):
+        """Copy AI results from a previous revision onto matches whose clause is unchanged.
+
+        previous must already have passed analyze_revision(), which checks its
+        clause index; raises RevisionError if its matches point elsewhere.
+        """
+        if not previous or previous.get('ai_version') != self.version:
+            return results
+        if 'clause_index' not in previous or 'clause_index' not in results:
+            return results
+        
+        old_hashes = [entry['hash'] for entry in previous['clause_index']['clauses']]
+        new_hashes = [entry['hash'] for entry in results['clause_index']['clauses']]
+        
+        reused = 0
+        for category in CATEGORY_GDPR_FOCUS:
+            if category not in previous or category not in results:
+                continue
+            check_matches(previous, category, len(old_hashes))
+            known = {
+                old_hashes[m['clause_id']]: m
+                for m in previous[category]['matches']
+                if 'ai_validation' in m
+            }
+            for match in results[category]['matches']:
+                old = known.get(new_hashes[match['clause_id']])
+                if old is None:
+                    continue
+                for field in ('ai_validation', 'gdpr_citation', 'validated_by'):
+                    if field in old:
+                        match[field] = old[field]
+                reused += 1
+        
+        print(f"♻️ Reused AI validation for {reused} unchanged clauses")
         return results
\ No newline at end of file
@@ -0,0 +1,65 @@
+import json
+import re
+
+
+# Rough English average for GPT/Qwen-style tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(items, token_budget, cost, max_items=None):
+    """Greedily group items, in order, into batches whose total cost fits the budget.
+
+    An item that is over budget on its own still gets a batch to itself.
+    """
+    batches = []
+    current = []
+    used = 0
+    for item in items:
+        item_cost = cost(item)
+        full = max_items is not None and len(current) >= max_items
+        if current and (used + item_cost > token_budget or full):
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(item)
+        used += item_cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_json_array(raw, count, validate):
+    """Pull a per-item JSON array out of an LLM response.
+
+    Returns a list of `count` entries, where each is validate(obj) or None if
+    that item is missing or malformed. Objects with an "id" (1-based) are
+    placed by id, the rest by position.
+    """
+    parsed = [None] * count
+    if not raw:
+        return parsed
+
+    # LLMs like to wrap the array in prose or a ```json fence
+    array_match = re.search(r"\[.*\]", raw, re.DOTALL)
+    if not array_match:
+        return parsed
+    try:
+        entries = json.loads(array_match.group())
+    except ValueError:
+        return parsed
+    if not isinstance(entries, list):
+        return parsed
+
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        slot = entry.get("id")
+        slot = slot - 1 if isinstance(slot, int) and 1 <= slot <= count else position
+        if slot >= count or parsed[slot] is not None:
+            continue
+        parsed[slot] = validate(entry)
+    return parsed
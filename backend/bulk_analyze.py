@@ -0,0 +1,393 @@
+"""Run RiskAnalyzer over a whole corpus of policies, without the Flask server.
+
+Input is a directory of text files, a JSONL file ({"id": ..., "text": ...}
+per line) or a tarball. Documents are spread over a process pool and written
+to JSONL in input order. Progress is checkpointed, so running the same
+command again after a crash picks up where it stopped.
+
+    python backend/bulk_analyze.py corpus/ -o results.jsonl --workers 8
+    python backend/bulk_analyze.py crawl.jsonl -o results.jsonl --ai ollama --ai-rate 2
+
+With --hits every record also carries its clause x pattern hit matrix, so
+backend/hit_matrix.py can rescore the corpus under new weights later. With
+--index corpus.sqlite3 every document is also recorded in a corpus index
+(backend/corpus_index.py) for keyword/category/score search.
+"""
+import argparse
+import json
+import os
+import sys
+import tarfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+from cascade import FLAG_KEYS
+from corpus_index import CorpusIndex
+from metrics import metrics
+from risk_analyzer import RiskAnalyzer
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # only needed for --parquet
+    pyarrow = None
+
+
+TEXT_SUFFIXES = ('.txt', '.md', '.text')
+TEXT_FIELDS = ('text', 'policy', 'policy_text', 'content')
+
+# How often progress is printed and the checkpoint rewritten
+PROGRESS_SECONDS = 5
+CHECKPOINT_EVERY = 200
+
+
+# ---------------------------
+# Input
+# ---------------------------
+def iter_documents(path):
+    """Yield (doc_id, text) in a stable order, so a resumed run lines up"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(TEXT_SUFFIXES):
+                    full = os.path.join(root, name)
+                    with open(full, encoding='utf-8', errors='replace') as f:
+                        yield os.path.relpath(full, path), f.read()
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, 'r:*') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith(TEXT_SUFFIXES):
+                    yield member.name, tar.extractfile(member).read().decode('utf-8', 'replace')
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                doc = json.loads(line)
+                text = next((doc[field] for field in TEXT_FIELDS if field in doc), '')
+                yield str(doc.get('id', line_no)), text
+
+
+# ---------------------------
+# Regex stage (process pool)
+# ---------------------------
+_analyzer = None
+_with_hits = False
+
+
+def _init_worker(match_budget, with_hits=False):
+    global _analyzer, _with_hits
+    # Nobody scrapes a pool worker; skip the per-clause timing
+    metrics.enabled = False
+    _analyzer = RiskAnalyzer(match_budget=match_budget)
+    _with_hits = with_hits
+
+
+def _analyze(doc):
+    doc_id, text = doc
+    try:
+        if _with_hits:
+            results, matrix = _analyzer.analyze_with_hits(text)
+            return {'id': doc_id, 'chars': len(text), 'results': results, 'hits': matrix.to_dict()}
+        return {'id': doc_id, 'chars': len(text), 'results': _analyzer.analyze(text)}
+    except Exception as e:
+        return {'id': doc_id, 'chars': len(text), 'error': repr(e)}
+
+
+def _analyze_batch(batch):
+    return [_analyze(doc) for doc in batch]
+
+
+def analyze_in_pool(pool, documents, batch_size, window):
+    """Yield (record, text) in input order.
+
+    Pool.imap would read the whole corpus into its task queue up front;
+    this keeps at most `window` batches in flight, and texts stay in this
+    process instead of being sent back.
+    """
+    pending = deque()
+
+    def batches():
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    for batch in batches():
+        pending.append((batch, pool.apply_async(_analyze_batch, (batch,))))
+        if len(pending) >= window:
+            done_batch, result = pending.popleft()
+            yield from zip(result.get(), (text for _doc_id, text in done_batch))
+    while pending:
+        done_batch, result = pending.popleft()
+        yield from zip(result.get(), (text for _doc_id, text in done_batch))
+
+
+def ordered_map(executor, fn, items, window):
+    """executor.map that only keeps `window` items in flight (it doesn't drain the input first)"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# ---------------------------
+# Optional AI stage
+# ---------------------------
+def backboard_stage(rate_limiter):
+    from dotenv import load_dotenv
+    from backboard_client import BackboardClient
+    from cascade import Cascade
+    from verdict_cache import VerdictCache
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    client = BackboardClient(
+        os.getenv('BACKBOARD_API_KEY'),
+        verdict_cache=VerdictCache.from_env(),
+        cascade=Cascade.from_env(),
+        rate_limiter=rate_limiter
+    )
+    if not client.is_configured():
+        sys.exit("❌ --ai backboard needs BACKBOARD_API_KEY")
+
+    def enhance(item):
+        record, _text = item
+        if 'results' in record:
+            record['results'] = client.enhance_analysis(record['results'])
+        return record
+
+    return enhance, client.version
+
+
+def ollama_stage(rate_limiter):
+    import asyncio
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'privacy-risk-extension', 'backend'))
+    import main as extension
+
+    extension.ollama.rate_limiter = rate_limiter
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def enhance(item):
+        record, text = item
+        # Same pipeline as the extension's /analyze: cascade, verdict cache, shared scheduler
+        future = asyncio.run_coroutine_threadsafe(extension.run_analysis(extension.normalize_text(text)), loop)
+        record['ollama'] = future.result()
+        return record
+
+    return enhance, extension.ANALYSIS_VERSION
+
+
+# ---------------------------
+# Checkpoints
+# ---------------------------
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---------------------------
+# Columnar export
+# ---------------------------
+def flatten(record, categories):
+    """One summary row per document for the Parquet file"""
+    results = record.get('results') or {}
+    overall = results.get('overall', {})
+    row = {
+        'id': record['id'],
+        'chars': record.get('chars'),
+        'error': record.get('error'),
+        'score': overall.get('score'),
+        'risk_level': overall.get('risk_level'),
+    }
+    for category in categories:
+        data = results.get(category, {})
+        row[f'{category}_score'] = data.get('score')
+        # 'matches' only keeps the top 5 examples
+        row[f'{category}_matches'] = data.get('total_matches') if data else None
+    analysis = (record.get('ollama') or {}).get('analysis', {})
+    for key in FLAG_KEYS:
+        row[key] = analysis.get(key)
+    return row
+
+
+def parquet_schema(categories):
+    fields = [
+        ('id', pyarrow.string()), ('chars', pyarrow.int64()), ('error', pyarrow.string()),
+        ('score', pyarrow.float64()), ('risk_level', pyarrow.string()),
+    ]
+    for category in categories:
+        fields += [(f'{category}_score', pyarrow.float64()), (f'{category}_matches', pyarrow.int64())]
+    fields += [(key, pyarrow.bool_()) for key in FLAG_KEYS]
+    return pyarrow.schema(fields)
+
+
+def write_parquet(jsonl_path, parquet_path, categories, batch_rows=1000):
+    """Convert the finished JSONL output to Parquet, a batch of rows at a time"""
+    schema = parquet_schema(categories)
+    rows = []
+    with pyarrow.parquet.ParquetWriter(parquet_path, schema) as writer:
+        with open(jsonl_path, encoding='utf-8') as f:
+            for line in f:
+                rows.append(flatten(json.loads(line), categories))
+                if len(rows) >= batch_rows:
+                    writer.write_table(pyarrow.Table.from_pylist(rows, schema=schema))
+                    rows.clear()
+        if rows:
+            writer.write_table(pyarrow.Table.from_pylist(rows, schema=schema))
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+def run(args):
+    checkpoint_path = args.output + '.checkpoint'
+    analyzer = RiskAnalyzer(match_budget=args.match_budget)
+
+    # Fork the workers before the AI stage starts any threads
+    pool = Pool(args.workers, initializer=_init_worker, initargs=(args.match_budget, args.hits))
+
+    ai_stage = None
+    ai_version = None
+    if args.ai:
+        from rate_limit import RateLimiter
+        limiter = RateLimiter(args.ai_rate) if args.ai_rate else None
+        stage = backboard_stage if args.ai == 'backboard' else ollama_stage
+        ai_stage, ai_version = stage(limiter)
+
+    # A checkpoint is only valid for the same input and the same analysis
+    identity = {'input': os.path.abspath(args.input), 'version': analyzer.version, 'ai': args.ai, 'ai_version': ai_version}
+    if args.hits:
+        identity['hits'] = True
+    state = read_checkpoint(checkpoint_path) if not args.restart else None
+    if state and state.get('identity') != identity:
+        sys.exit(f"❌ {checkpoint_path} belongs to a different input or analyzer version; use --restart")
+    if state and (not os.path.exists(args.output) or os.path.getsize(args.output) < state['offset']):
+        sys.exit(f"❌ {args.output} is shorter than its checkpoint says; use --restart")
+
+    skip = state['done'] if state else 0
+    offset = state['offset'] if state else 0
+    out = open(args.output, 'a+b' if state else 'wb')
+    # Anything written after the last checkpoint is redone
+    out.truncate(offset)
+    out.seek(offset)
+    if skip:
+        print(f"♻️ Resuming after {skip} documents", file=sys.stderr)
+
+    documents = iter_documents(args.input)
+    for _ in range(skip):
+        next(documents, None)
+
+    # Rows since the last checkpoint; a resumed run records them again, which the index skips as unchanged
+    index = CorpusIndex(args.index) if args.index else None
+    to_index = []
+    analyzer_version = ':'.join([analyzer.version, ai_version or 'regex-only'])
+
+    done = skip
+    errors = 0
+    start = last_report = time.monotonic()
+    with pool:
+        analyzed = analyze_in_pool(pool, documents, args.chunksize, window=args.workers * 4)
+        if ai_stage:
+            executor = ThreadPoolExecutor(max_workers=args.ai_docs)
+            records = ordered_map(executor, lambda item: (ai_stage(item), item[1]), analyzed, window=args.ai_docs * 2)
+        else:
+            records = analyzed
+
+        for record, text in records:
+            out.write(json.dumps(record).encode('utf-8') + b'\n')
+            done += 1
+            errors += 'error' in record
+            if index and 'results' in record:
+                to_index.append(dict(text=text, results=record['results'], key=str(record['id']),
+                                    analyzer_version=analyzer_version))
+
+            if done % CHECKPOINT_EVERY == 0:
+                if to_index:
+                    index.add_many(to_index)
+                    to_index = []
+                out.flush()
+                os.fsync(out.fileno())
+                write_checkpoint(checkpoint_path, {'identity': identity, 'done': done, 'offset': out.tell()})
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_SECONDS:
+                rate = (done - skip) / (now - start)
+                print(f"📊 {done} docs, {rate:.1f} docs/sec, {errors} errors", file=sys.stderr)
+                last_report = now
+
+        if ai_stage:
+            executor.shutdown()
+
+    if to_index:
+        index.add_many(to_index)
+    out.flush()
+    os.fsync(out.fileno())
+    write_checkpoint(checkpoint_path, {'identity': identity, 'done': done, 'offset': out.tell(), 'complete': True})
+    out.close()
+
+    elapsed = time.monotonic() - start
+    processed = done - skip
+    print(
+        f"✅ {processed} docs in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} docs/sec), "
+        f"{errors} errors, {done} total in {args.output}",
+        file=sys.stderr
+    )
+
+    if args.parquet:
+        write_parquet(args.output, args.parquet, list(analyzer.patterns))
+        print(f"📦 Wrote {args.parquet}", file=sys.stderr)
+
+    if index:
+        summary = index.summary()
+        print(f"🗂️ {args.index}: {summary['documents']} documents, {summary['versions']} versions, "
+              f"{summary['clauses']} distinct clauses", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help='directory, .jsonl file or tarball of policies')
+    parser.add_argument('-o', '--output', required=True, help='JSONL results, one line per document in input order')
+    parser.add_argument('--parquet', help='also write a per-document summary table here (needs pyarrow)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='analyzer processes')
+    parser.add_argument('--chunksize', type=int, default=8, help='documents handed to a worker at a time')
+    parser.add_argument('--match-budget', type=int, default=None, help='max characters scanned per clause')
+    parser.add_argument('--hits', action='store_true', help='store each document\'s hit matrix for rescoring')
+    parser.add_argument('--index', help='also record every document in this corpus index (SQLite)')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint and start over')
+    parser.add_argument('--ai', choices=['backboard', 'ollama'], help='also run an LLM stage on every document')
+    parser.add_argument('--ai-rate', type=float, default=None, help='max LLM calls per second')
+    parser.add_argument('--ai-docs', type=int, default=4, help='documents in the LLM stage at once')
+    args = parser.parse_args()
+
+    if args.parquet and pyarrow is None:
+        parser.error('--parquet needs pyarrow (pip install pyarrow)')
+
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
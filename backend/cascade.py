@@ -0,0 +1,274 @@
+import os
+import re
+
+from result_cache import fingerprint
+from risk_analyzer import RiskAnalyzer
+
+
+# Chunks/matches scored at or above this are settled without asking an LLM
+CONFIDENCE_THRESHOLD = 0.85
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'fourteen': 14,
+    'fifteen': 15, 'eighteen': 18, 'twenty': 20, 'thirty': 30, 'sixty': 60,
+    'ninety': 90, 'hundred': 100,
+}
+UNIT_DAYS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+
+# "30 days", "for 12 months", "thirty (30) days", "two years", "6-month"
+DURATION_RE = re.compile(
+    r'\b(?P<number>\d{1,4}|' + '|'.join(NUMBER_WORDS) + r')'
+    r'(?:\s*\(\d{1,4}\))?[\s-]*'
+    r'(?P<unit>day|week|month|year)s?\b',
+    re.IGNORECASE
+)
+
+FLAG_KEYS = [
+    "mentions_biometric_data",
+    "mentions_location_tracking",
+    "mentions_camera_or_microphone",
+    "data_retention_policy_present",
+    "retention_duration_specified",
+]
+
+# Per flag: terms that settle it (strong) and terms that only hint at it (weak)
+STRONG = {
+    "mentions_location_tracking": re.compile(
+        r'\b(gps|geo-?location|precise\s+location|location\s+(data|information|history|services|tracking)|'
+        r'(track|collect)\w*\s+(your\s+)?location)\b', re.IGNORECASE),
+    "mentions_camera_or_microphone": re.compile(r'\b(camera|microphone)s?\b', re.IGNORECASE),
+    "data_retention_policy_present": re.compile(
+        r'\b(retain|retained|retention|retains|keep\s+(your\s+)?(data|information|records))\b', re.IGNORECASE),
+}
+WEAK = {
+    "mentions_biometric_data": re.compile(r'\b(face|facial|voice|iris|retina|palm)\b', re.IGNORECASE),
+    "mentions_location_tracking": re.compile(r'\b(location|tracking|track)\b', re.IGNORECASE),
+    "mentions_camera_or_microphone": re.compile(r'\b(photos?|videos?|audio|recordings?)\b', re.IGNORECASE),
+    "data_retention_policy_present": re.compile(r'\b(store|stored|storage|delete|deleted|deletion|keep)\b', re.IGNORECASE),
+}
+
+SURE = 0.95
+UNSURE = 0.5
+
+# Rule-file categories whose regex hit settles an extension flag
+FLAG_CATEGORIES = {
+    "mentions_biometric_data": 'biometric',
+    "data_retention_policy_present": 'indefinite_retention',
+}
+
+# Verbs that must appear near a matched term before a rule verdict holds
+RETENTION_VERB_RE = re.compile(
+    r'(retain|retains|retained|keep|keeps|kept|store|stores|stored|hold|holds|held|'
+    r'preserve|preserves|preserved|maintain|maintains|maintained|archive|archives|archived)', re.IGNORECASE)
+COLLECTION_VERB_RE = re.compile(
+    r'(collect|collects|collected|use|uses|used|process|processes|processed|capture|captures|captured|'
+    r'scan|scans|scanned|obtain|obtains|obtained|create|creates|created|extract|extracts|extracted|'
+    r'share|shares|shared|analy[sz]e|analy[sz]es|analy[sz]ed)|' + RETENTION_VERB_RE.pattern, re.IGNORECASE)
+DEFINITE_INDEFINITE = re.compile(r'\b(indefinitely|permanently)\b', re.IGNORECASE)
+
+# Matches the Flask app can answer without Backboard, with the article it
+# would have cited anyway. Keyed by rule-file category (a category the rule
+# file doesn't have is never settled here). A verdict only holds with a
+# 'verbs' word near the matched term, a term matching 'terms' if set, and no
+# period in the sentence if 'undated'
+RULE_VERDICTS = {
+    'biometric': {
+        'verdict': "YES. The clause names biometric identifiers ({term}), special category data that needs explicit consent.",
+        'citation': "Article: Article 9(1) - Processing of special categories of personal data",
+        'verbs': COLLECTION_VERB_RE,
+        'terms': None,
+        'undated': False,
+    },
+    'indefinite_retention': {
+        'verdict': "YES. The clause keeps data {term} without a defined retention period.",
+        'citation': "Article: Article 5(1)(e) - Storage limitation",
+        'verbs': RETENTION_VERB_RE,
+        # "as long as necessary" usually comes with a purpose or a period, let the LLM read it
+        'terms': DEFINITE_INDEFINITE,
+        'undated': True,
+    },
+}
+
+# "We do not collect biometric identifiers", "we never keep data permanently"
+NEGATION_RE = re.compile(r"\b(not|no|never|neither|nor|none|without|cannot)\b|n['\u2019]t\b", re.IGNORECASE)
+# Words allowed between the verb and the term: "keep your account data indefinitely"
+VERB_WINDOW_WORDS = 6
+SENTENCE_BREAK_RE = re.compile(r'[.;!?](?=\s|$)')
+WORD_RE = re.compile(r"[\w'\u2019]+")
+
+
+def term_sentence(text, term):
+    """(sentence or ;-separated part around the first occurrence of term, term's offset in it), else None"""
+    at = text.lower().find(term.lower())
+    if at < 0:
+        return None
+    start = 0
+    for m in SENTENCE_BREAK_RE.finditer(text, 0, at):
+        start = m.end()
+    m = SENTENCE_BREAK_RE.search(text, at + len(term))
+    return text[start:m.end() if m else len(text)], at - start
+
+
+def affirmed(text, term, verbs):
+    """The sentence around term if it has a verbs word near term and no negation, else None.
+
+    "We do not collect biometric identifiers" and "You can permanently
+    delete your account" match the patterns but aren't violations, so
+    they go to the LLM.
+    """
+    found = term_sentence(text, term)
+    if found is None:
+        return None
+    sentence, at = found
+    if NEGATION_RE.search(sentence):
+        return None
+    around = WORD_RE.findall(sentence[:at])[-VERB_WINDOW_WORDS:] + \
+        WORD_RE.findall(sentence[at + len(term):])[:VERB_WINDOW_WORDS]
+    return sentence if any(verbs.fullmatch(word) for word in around) else None
+
+
+def extract_durations(text):
+    """Concrete time periods in the text as [{'text': '30 days', 'days': 30}, ...]"""
+    durations = []
+    for m in DURATION_RE.finditer(text):
+        number = m.group('number').lower()
+        count = int(number) if number.isdigit() else NUMBER_WORDS[number]
+        durations.append({'text': m.group(0), 'days': count * UNIT_DAYS[m.group('unit').lower()]})
+    return durations
+
+
+class Cascade:
+    """Deterministic first tier in front of the LLM.
+
+    Scores a chunk (extension flags) or a regex match (Flask categories) with
+    the RiskAnalyzer patterns, a few precise keyword rules and the duration
+    extractor. Anything scored at or above the threshold is settled here and
+    never reaches the LLM; `stats` counts both outcomes per tier.
+    """
+
+    def __init__(self, analyzer=None, threshold=CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.stats = {'rules_hits': 0, 'rules_skips': 0, 'llm_calls': 0}
+        self.use_analyzer(analyzer or RiskAnalyzer())
+
+    def use_analyzer(self, analyzer):
+        """Score with another RiskAnalyzer from now on (e.g. after a rule reload)"""
+        missing = sorted((set(RULE_VERDICTS) | set(FLAG_CATEGORIES.values())) - set(analyzer.patterns))
+        if missing:
+            print(f"⚠️ Rules {analyzer.rules_version} have no {', '.join(missing)} category; "
+                  f"the cascade sends those to the LLM")
+        version = fingerprint(
+            analyzer.version, self.threshold, DURATION_RE.pattern,
+            {key: p.pattern for key, p in STRONG.items()},
+            {key: p.pattern for key, p in WEAK.items()},
+            {key: dict(rule, verbs=rule['verbs'].pattern, terms=rule['terms'] and rule['terms'].pattern)
+             for key, rule in RULE_VERDICTS.items()},
+            FLAG_CATEGORIES, NEGATION_RE.pattern, VERB_WINDOW_WORDS
+        )
+        self.analyzer = analyzer
+        self.version = version
+
+    @classmethod
+    def from_env(cls, analyzer=None):
+        """CASCADE_THRESHOLD > 1 sends everything to the LLM"""
+        return cls(analyzer, threshold=float(os.getenv('CASCADE_THRESHOLD', CONFIDENCE_THRESHOLD)))
+
+    def assess(self, chunk):
+        """Flags for an extension chunk, their confidence (lowest flag wins) and the reasons"""
+        hits = self.analyzer.engine.scan(chunk)
+        durations = extract_durations(chunk)
+        flags = {}
+        scores = {}
+        reasons = []
+
+        for key in FLAG_KEYS[:4]:
+            strong = STRONG.get(key)
+            category = FLAG_CATEGORIES.get(key)
+            if category in hits:
+                found = hits[category][1]
+                # "We do not collect biometric data" mentions it too, but let the LLM decide
+                sure = affirmed(chunk, found, RULE_VERDICTS[category]['verbs']) is not None
+            else:
+                m = strong.search(chunk) if strong else None
+                found = m.group(0) if m else None
+                sure = True
+
+            if found and not sure:
+                flags[key], scores[key] = True, UNSURE
+            elif found:
+                flags[key], scores[key] = True, SURE
+                reasons.append(f"'{found}'")
+            elif WEAK[key].search(chunk):
+                flags[key], scores[key] = False, UNSURE
+            else:
+                flags[key], scores[key] = False, SURE
+
+        key = "retention_duration_specified"
+        if durations and flags["data_retention_policy_present"]:
+            flags[key], scores[key] = True, SURE
+            reasons.append(f"retention period '{durations[0]['text']}'")
+        elif durations:
+            # A period next to "store"/"delete", or a deadline that isn't about retention
+            flags[key], scores[key] = False, UNSURE
+        elif FLAG_CATEGORIES["data_retention_policy_present"] in hits:
+            flags[key], scores[key] = False, SURE
+        else:
+            flags[key], scores[key] = False, 0.9 if flags["data_retention_policy_present"] else SURE
+
+        flags["risk_reason"] = f"Rule check: mentions {', '.join(reasons)}." if reasons else ""
+        return flags, min(scores.values()), reasons
+
+    def route(self, chunks):
+        """Split chunks into ([(chunk, flags)] settled by rules, [chunk] for the LLM)"""
+        settled = []
+        escalated = []
+        for chunk in chunks:
+            flags, confidence, _reasons = self.assess(chunk)
+            if confidence >= self.threshold:
+                settled.append((chunk, flags))
+            else:
+                escalated.append(chunk)
+        self.stats['rules_hits'] += len(settled)
+        self.stats['rules_skips'] += len(escalated)
+        return settled, escalated
+
+    def assess_match(self, category, match):
+        """Fields a Flask match gets without an LLM call, and how sure that is"""
+        if category not in RULE_VERDICTS:
+            return None, 0.0
+        rule = RULE_VERDICTS[category]
+        term = match['matched_keyword']
+        fields = {
+            'ai_validation': rule['verdict'].format(term=term),
+            'gdpr_citation': rule['citation'],
+            'validated_by': 'rules',
+        }
+        if rule['terms'] is not None and not rule['terms'].search(term):
+            return fields, UNSURE
+        sentence = affirmed(match['text'], term, rule['verbs'])
+        if sentence is None or rule['undated'] and extract_durations(sentence):
+            return fields, UNSURE
+        return fields, SURE
+
+    def settle_match(self, category, match):
+        """Rule verdict fields for a match, or None if it needs the LLM"""
+        fields, confidence = self.assess_match(category, match)
+        if fields is not None and confidence >= self.threshold:
+            self.stats['rules_hits'] += 1
+            return fields
+        self.stats['rules_skips'] += 1
+        return None
+
+    def record_llm_calls(self, count):
+        self.stats['llm_calls'] += count
+
+    def summary(self):
+        """Counters per tier plus the share of items the rules settled"""
+        routed = self.stats['rules_hits'] + self.stats['rules_skips']
+        return dict(
+            self.stats,
+            llm_calls_saved=self.stats['rules_hits'],
+            settled_rate=round(self.stats['rules_hits'] / routed, 3) if routed else 0.0,
+            threshold=self.threshold
+        )
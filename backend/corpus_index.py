@@ -0,0 +1,487 @@
+"""Searchable store of analyzed policies: versions, clauses, scores and findings.
+
+Every analysis recorded here keeps the policy text (later versions of the
+same document as a line diff against the previous one), its clauses (each
+distinct clause stored once, full-text indexed with FTS5), per-category
+scores and the matched clauses. Questions like "which sites mention facial
+recognition and score high on indefinite retention" are then a query
+instead of a re-run:
+
+    GET /corpus/search?q=facial+recognition&category=indefinite_retention&min_score=60
+
+Filled by the Flask app when CORPUS_DB is set, by POST /corpus/ingest, and
+by bulk_analyze.py --index.
+"""
+import difflib
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from segmenter import clause_spans
+
+
+# Every Nth version of a document is stored whole, so rebuilding one applies at most N-1 diffs
+KEYFRAME_EVERY = 10
+MAX_LIMIT = 200
+# Highlighted clauses returned per search hit
+SNIPPETS = 3
+# Recordings waiting for the writer thread; more than this and they are dropped
+QUEUE_SIZE = 1000
+WRITE_BATCH = 100
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS documents ('
+    'id INTEGER PRIMARY KEY, doc_key TEXT UNIQUE NOT NULL, domain TEXT, '
+    'latest_version_id INTEGER, versions INTEGER NOT NULL DEFAULT 0)',
+    'CREATE INDEX IF NOT EXISTS documents_domain ON documents (domain)',
+
+    'CREATE TABLE IF NOT EXISTS versions ('
+    'id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, version_no INTEGER NOT NULL, '
+    'content_hash TEXT NOT NULL, analyzer_version TEXT, created REAL NOT NULL, '
+    'overall_score REAL, risk_level TEXT, text_bytes INTEGER NOT NULL, stored_bytes INTEGER NOT NULL, '
+    'base_id INTEGER, text_blob BLOB NOT NULL, results_blob BLOB NOT NULL, '
+    'UNIQUE (document_id, version_no))',
+    'CREATE INDEX IF NOT EXISTS versions_score ON versions (overall_score)',
+
+    # latest = 1 on the current version's rows, so most queries skip old versions in the index
+    'CREATE TABLE IF NOT EXISTS scores ('
+    'version_id INTEGER NOT NULL, category TEXT NOT NULL, score REAL NOT NULL, risk_level TEXT, '
+    'total_matches INTEGER NOT NULL, latest INTEGER NOT NULL, '
+    'PRIMARY KEY (version_id, category)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS scores_category ON scores (category, latest, score)',
+
+    'CREATE TABLE IF NOT EXISTS clauses (id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL, text TEXT NOT NULL)',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5("
+    "text, content='clauses', content_rowid='id', tokenize='porter unicode61')",
+
+    'CREATE TABLE IF NOT EXISTS version_clauses ('
+    'version_id INTEGER NOT NULL, position INTEGER NOT NULL, clause_id INTEGER NOT NULL, '
+    'PRIMARY KEY (version_id, position)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS version_clauses_clause ON version_clauses (clause_id)',
+
+    'CREATE TABLE IF NOT EXISTS findings ('
+    'version_id INTEGER NOT NULL, category TEXT NOT NULL, position INTEGER NOT NULL, '
+    'matched_keyword TEXT, pattern TEXT)',
+    'CREATE INDEX IF NOT EXISTS findings_version ON findings (version_id)',
+]
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def domain_of(key):
+    """'example.com' for 'https://www.example.com/privacy' or 'example.com/privacy.txt', else None"""
+    if not key:
+        return None
+    if '://' in key:
+        host = urlsplit(key).hostname or ''
+    else:
+        host = key.split('/', 1)[0] if '/' in key else ''
+        if ' ' in host or '.' not in host:
+            return None
+    host = host.lower()
+    return host[4:] if host.startswith('www.') else host or None
+
+
+def fts_phrase(keyword):
+    """A keyword as one quoted FTS5 phrase, so user input can't be query syntax"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def make_delta(base_lines, lines):
+    """Line diff: [i, j] copies base_lines[i:j], a list of strings is inserted as is"""
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, base_lines, lines).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j1 < j2:
+            ops.append(lines[j1:j2])
+    return ops
+
+
+def apply_delta(base_lines, ops):
+    lines = []
+    for op in ops:
+        if op and isinstance(op[0], int):
+            lines.extend(base_lines[op[0]:op[1]])
+        else:
+            lines.extend(op)
+    return lines
+
+
+class CorpusIndex:
+    """Analyzed policy versions in SQLite, queryable by category, score, keyword and domain.
+
+    Lives in one file shared by every worker. add()/add_many() write right
+    away; request handlers use submit(), which hands the write to a
+    background thread after start().
+    """
+
+    def __init__(self, db_path, keyframe_every=KEYFRAME_EVERY):
+        self.keyframe_every = keyframe_every
+        self.stats = {'recorded': 0, 'unchanged': 0, 'dropped': 0, 'errors': 0, 'queries': 0}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    @classmethod
+    def from_env(cls):
+        """Build from CORPUS_DB; None (no index) if it isn't set"""
+        db_path = os.getenv('CORPUS_DB')
+        if not db_path:
+            return None
+        return cls(db_path, keyframe_every=int(os.getenv('CORPUS_KEYFRAME_EVERY', KEYFRAME_EVERY)))
+
+    # ---------------------------
+    # Recording
+    # ---------------------------
+    def add(self, text, results, key=None, domain=None, analyzer_version=None):
+        """Record one analysis; returns (version_id, created_new_version)"""
+        return self.add_many([dict(text=text, results=results, key=key, domain=domain,
+                                   analyzer_version=analyzer_version)])[0]
+
+    def add_many(self, items):
+        """Record many analyses in one transaction.
+
+        items are dicts with text, results and optionally key (a URL or
+        document id; defaults to the text's hash), domain (defaults to the
+        key's host) and analyzer_version. Text identical to the document's
+        latest version under the same analyzer_version adds nothing.
+        """
+        recorded = []
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for item in items:
+                    recorded.append(self._add(**item))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        new = sum(1 for _version_id, created in recorded if created)
+        self.stats['recorded'] += new
+        self.stats['unchanged'] += len(recorded) - new
+        return recorded
+
+    def _add(self, text, results, key=None, domain=None, analyzer_version=None):
+        conn = self._conn
+        digest = content_hash(text)
+        key = key or f'sha256:{digest[:32]}'
+        domain = (domain or domain_of(key) or '').lower() or None
+
+        row = conn.execute('SELECT id, latest_version_id, versions FROM documents WHERE doc_key = ?', (key,)).fetchone()
+        if row is None:
+            document_id = conn.execute('INSERT INTO documents (doc_key, domain) VALUES (?, ?)', (key, domain)).lastrowid
+            latest_id, count = None, 0
+        else:
+            document_id, latest_id, count = row
+            if domain:
+                conn.execute('UPDATE documents SET domain = ? WHERE id = ?', (domain, document_id))
+
+        if latest_id is not None:
+            previous = conn.execute(
+                'SELECT content_hash, analyzer_version FROM versions WHERE id = ?', (latest_id,)
+            ).fetchone()
+            if previous == (digest, analyzer_version):
+                return latest_id, False
+
+        version_no = count + 1
+        text_blob, base_id = self._encode_text(text, latest_id, version_no)
+        overall = results.get('overall', {})
+        version_id = conn.execute(
+            'INSERT INTO versions (document_id, version_no, content_hash, analyzer_version, created, '
+            'overall_score, risk_level, text_bytes, stored_bytes, base_id, text_blob, results_blob) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (document_id, version_no, digest, analyzer_version, time.time(), overall.get('score'),
+             overall.get('risk_level'), len(text.encode('utf-8')), len(text_blob), base_id, text_blob,
+             zlib.compress(json.dumps(results).encode('utf-8'), 6))
+        ).lastrowid
+
+        categories = [(name, data) for name, data in results.items() if isinstance(data, dict) and 'matches' in data]
+        if latest_id is not None:
+            conn.execute('UPDATE scores SET latest = 0 WHERE version_id = ?', (latest_id,))
+        conn.executemany(
+            'INSERT INTO scores (version_id, category, score, risk_level, total_matches, latest) '
+            'VALUES (?, ?, ?, ?, ?, 1)',
+            [(version_id, name, data['score'], data.get('risk_level'), data.get('total_matches', 0))
+             for name, data in categories]
+        )
+        conn.executemany(
+            'INSERT INTO findings (version_id, category, position, matched_keyword, pattern) VALUES (?, ?, ?, ?, ?)',
+            [(version_id, name, match['clause_id'], match.get('matched_keyword'), match.get('pattern'))
+             for name, data in categories for match in data['matches']]
+        )
+
+        # Same clause boundaries as RiskAnalyzer, so finding positions line up
+        links = []
+        for position, (start, end) in enumerate(clause_spans(text)):
+            links.append((version_id, position, self._clause_id(text[start:end])))
+        conn.executemany('INSERT INTO version_clauses (version_id, position, clause_id) VALUES (?, ?, ?)', links)
+
+        conn.execute('UPDATE documents SET latest_version_id = ?, versions = ? WHERE id = ?',
+                     (version_id, version_no, document_id))
+        return version_id, True
+
+    def _clause_id(self, clause):
+        digest = hashlib.sha1(clause.encode('utf-8')).hexdigest()
+        cursor = self._conn.execute('INSERT OR IGNORE INTO clauses (hash, text) VALUES (?, ?)', (digest, clause))
+        if cursor.rowcount:
+            self._conn.execute('INSERT INTO clauses_fts (rowid, text) VALUES (?, ?)', (cursor.lastrowid, clause))
+            return cursor.lastrowid
+        return self._conn.execute('SELECT id FROM clauses WHERE hash = ?', (digest,)).fetchone()[0]
+
+    def _encode_text(self, text, base_id, version_no):
+        """(blob, base_id): the whole text, or a diff against version base_id if that's smaller"""
+        full = zlib.compress(text.encode('utf-8'), 6)
+        if base_id is None or (version_no - 1) % self.keyframe_every == 0:
+            return full, None
+        base_lines = self._text(base_id).splitlines(keepends=True)
+        delta = make_delta(base_lines, text.splitlines(keepends=True))
+        blob = zlib.compress(json.dumps(delta).encode('utf-8'), 6)
+        return (blob, base_id) if len(blob) < len(full) else (full, None)
+
+    def _text(self, version_id):
+        chain = []
+        while version_id is not None:
+            blob, version_id = self._conn.execute(
+                'SELECT text_blob, base_id FROM versions WHERE id = ?', (version_id,)
+            ).fetchone()
+            chain.append(blob)
+        lines = zlib.decompress(chain.pop()).decode('utf-8').splitlines(keepends=True)
+        while chain:
+            lines = apply_delta(lines, json.loads(zlib.decompress(chain.pop())))
+        return ''.join(lines)
+
+    # ---------------------------
+    # Background writes
+    # ---------------------------
+    def start(self):
+        self._queue = queue.Queue(QUEUE_SIZE)
+        threading.Thread(target=self._writer, name='corpus-writer', daemon=True).start()
+        return self
+
+    def submit(self, text, results, key=None, domain=None, analyzer_version=None):
+        """add() from a request handler: queued for the writer thread, dropped if it is QUEUE_SIZE behind"""
+        try:
+            self._queue.put_nowait(dict(text=text, results=results, key=key, domain=domain,
+                                        analyzer_version=analyzer_version))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def flush(self):
+        """Wait until everything submitted has been written"""
+        self._queue.join()
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.add_many(batch)
+            except Exception as e:
+                self.stats['errors'] += len(batch)
+                print(f"⚠️ Corpus index write failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def search(self, categories=(), min_score=None, max_score=None, keywords=(), domain=None,
+               risk_level=None, all_versions=False, limit=50, offset=0):
+        """Versions matching every filter, highest overall score first.
+
+        Each category must be within [min_score, max_score] (or have any
+        match if neither is given); without categories the range applies to
+        the overall score. Each keyword must appear in one of the version's
+        clauses. Only the latest version of each document unless all_versions.
+        """
+        where = []
+        params = []
+        if not all_versions:
+            where.append('v.id = d.latest_version_id')
+        if domain:
+            where.append('d.domain = ?')
+            params.append(domain.lower())
+        if risk_level:
+            where.append('v.risk_level = ?')
+            params.append(risk_level)
+
+        latest = '' if all_versions else ' AND latest = 1'
+        for category in categories:
+            condition = f'v.id IN (SELECT version_id FROM scores WHERE category = ?{latest}'
+            params.append(category)
+            if min_score is None and max_score is None:
+                condition += ' AND total_matches > 0'
+            if min_score is not None:
+                condition += ' AND score >= ?'
+                params.append(min_score)
+            if max_score is not None:
+                condition += ' AND score <= ?'
+                params.append(max_score)
+            where.append(condition + ')')
+        if not categories:
+            if min_score is not None:
+                where.append('v.overall_score >= ?')
+                params.append(min_score)
+            if max_score is not None:
+                where.append('v.overall_score <= ?')
+                params.append(max_score)
+
+        keywords = [k.strip() for k in keywords if k and k.strip()]
+        for keyword in keywords:
+            where.append(
+                'v.id IN (SELECT vc.version_id FROM version_clauses vc WHERE vc.clause_id IN '
+                '(SELECT rowid FROM clauses_fts WHERE clauses_fts MATCH ?))'
+            )
+            params.append(fts_phrase(keyword))
+
+        sql_where = ' WHERE ' + ' AND '.join(where) if where else ''
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        with self._lock:
+            total = self._conn.execute(
+                f'SELECT COUNT(*) FROM versions v JOIN documents d ON d.id = v.document_id{sql_where}', params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                'SELECT v.id, d.doc_key, d.domain, v.version_no, v.created, v.overall_score, v.risk_level '
+                f'FROM versions v JOIN documents d ON d.id = v.document_id{sql_where} '
+                'ORDER BY v.overall_score DESC, v.id LIMIT ? OFFSET ?',
+                params + [limit, int(offset)]
+            ).fetchall()
+            hits = [
+                {'version_id': r[0], 'key': r[1], 'domain': r[2], 'version': r[3], 'created': r[4],
+                 'overall': {'score': r[5], 'risk_level': r[6]}, 'scores': {}}
+                for r in rows
+            ]
+            by_id = {hit['version_id']: hit for hit in hits}
+            if by_id:
+                marks = ','.join('?' * len(by_id))
+                for version_id, category, score, level in self._conn.execute(
+                    f'SELECT version_id, category, score, risk_level FROM scores WHERE version_id IN ({marks})',
+                    list(by_id)
+                ):
+                    by_id[version_id]['scores'][category] = {'score': score, 'risk_level': level}
+                if keywords:
+                    for version_id, position, snippet in self._conn.execute(
+                        "SELECT vc.version_id, vc.position, snippet(clauses_fts, 0, '[', ']', '…', 16) "
+                        'FROM clauses_fts JOIN version_clauses vc ON vc.clause_id = clauses_fts.rowid '
+                        f'WHERE clauses_fts MATCH ? AND vc.version_id IN ({marks}) ORDER BY vc.position',
+                        [' OR '.join(fts_phrase(k) for k in keywords)] + list(by_id)
+                    ):
+                        clauses = by_id[version_id].setdefault('clauses', [])
+                        if len(clauses) < SNIPPETS:
+                            clauses.append({'position': position, 'snippet': snippet})
+        self.stats['queries'] += 1
+        return {'total': total, 'limit': limit, 'offset': int(offset), 'results': hits}
+
+    def document(self, key):
+        """Every recorded version of a document with its scores, oldest first; None if unknown"""
+        with self._lock:
+            row = self._conn.execute('SELECT id, domain, latest_version_id FROM documents WHERE doc_key = ?',
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            document_id, domain, latest_id = row
+            versions = []
+            for r in self._conn.execute(
+                'SELECT id, version_no, created, analyzer_version, overall_score, risk_level, text_bytes, '
+                'stored_bytes, base_id FROM versions WHERE document_id = ? ORDER BY version_no', (document_id,)
+            ).fetchall():
+                scores = {
+                    category: score for category, score in self._conn.execute(
+                        'SELECT category, score FROM scores WHERE version_id = ?', (r[0],)
+                    )
+                }
+                versions.append({
+                    'version_id': r[0], 'version': r[1], 'created': r[2], 'analyzer_version': r[3],
+                    'overall': {'score': r[4], 'risk_level': r[5]}, 'scores': scores,
+                    'text_bytes': r[6], 'stored_bytes': r[7], 'delta': r[8] is not None
+                })
+        return {'key': key, 'domain': domain, 'latest_version_id': latest_id, 'versions': versions}
+
+    def version(self, version_id, with_text=False):
+        """One version's full results and findings (and text); None if unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT d.doc_key, d.domain, v.version_no, v.created, v.analyzer_version, v.results_blob '
+                'FROM versions v JOIN documents d ON d.id = v.document_id WHERE v.id = ?', (version_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            findings = [
+                {'category': r[0], 'position': r[1], 'matched_keyword': r[2], 'clause': r[3]}
+                for r in self._conn.execute(
+                    'SELECT f.category, f.position, f.matched_keyword, c.text FROM findings f '
+                    'JOIN version_clauses vc ON vc.version_id = f.version_id AND vc.position = f.position '
+                    'JOIN clauses c ON c.id = vc.clause_id WHERE f.version_id = ? ORDER BY f.category, f.position',
+                    (version_id,)
+                )
+            ]
+            entry = {
+                'version_id': version_id, 'key': row[0], 'domain': row[1], 'version': row[2],
+                'created': row[3], 'analyzer_version': row[4],
+                'results': json.loads(zlib.decompress(row[5])), 'findings': findings
+            }
+            if with_text:
+                entry['text'] = self._text(version_id)
+        return entry
+
+    def summary(self):
+        with self._lock:
+            documents, = self._conn.execute('SELECT COUNT(*) FROM documents').fetchone()
+            versions, text_bytes, stored_bytes, deltas = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(text_bytes), 0), COALESCE(SUM(stored_bytes), 0), '
+                'COUNT(base_id) FROM versions'
+            ).fetchone()
+            clauses, = self._conn.execute('SELECT COUNT(*) FROM clauses').fetchone()
+        return dict(
+            self.stats, documents=documents, versions=versions, delta_versions=deltas, clauses=clauses,
+            text_bytes=text_bytes, stored_bytes=stored_bytes,
+            queued=self._queue.qsize() if self._queue is not None else 0
+        )
+
+
+def main():
+    """python backend/corpus_index.py corpus.sqlite3 [--q ...] [--category ...]: query from the shell"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query a corpus index')
+    parser.add_argument('db')
+    parser.add_argument('--q', action='append', default=[], help='keyword or phrase (repeat for AND)')
+    parser.add_argument('--category', action='append', default=[])
+    parser.add_argument('--min-score', type=float)
+    parser.add_argument('--max-score', type=float)
+    parser.add_argument('--domain')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    index = CorpusIndex(args.db)
+    start = time.perf_counter()
+    found = index.search(args.category, args.min_score, args.max_score, args.q, args.domain, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for hit in found['results']:
+        print(f"{hit['overall']['score']:>6} {hit['key']}")
+        for clause in hit.get('clauses', []):
+            print(f"         {clause['snippet']}")
+    print(f"🔎 {found['total']} matches in {elapsed:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import hashlib
+import math
+import os
+import re
+
+
+GDPR_PATH = os.path.join(os.path.dirname(__file__), 'gdpr_articles.txt')
+
+HEADING_RE = re.compile(r'^(?:GDPR\s+)?(Article\s+\d+(?:\(\w+\))*)\s+-\s+(.+)$')
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the their this those to was we '
+    'were which will with you your our us may any all not shall such other'.split()
+)
+
+# BM25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+
+
+def stem(word):
+    """Crude suffix stripping so 'stored'/'storage'/'store' and 'selling'/'sell' meet"""
+    for suffix in ('ations', 'ation', 'ing', 'age', 'ies', 'ed', 'es', 'ly', 's', 'e'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def parse_articles(text):
+    """Split gdpr_articles.txt into paragraph records.
+
+    Each 'Article 5(1)(e) - Storage limitation' heading followed by text
+    becomes {'article', 'title', 'heading', 'text', 'parent'}, where parent is
+    the title of the enclosing article ('Principles relating to ...').
+    Headings without text of their own only set the parent.
+    """
+    records = []
+    parent = ''
+    for block in re.split(r'\n\s*\n', text.strip()):
+        lines = block.strip().splitlines()
+        m = HEADING_RE.match(lines[0].strip())
+        if not m:
+            continue
+        article, title = m.group(1), m.group(2).strip()
+        body = ' '.join(line.strip() for line in lines[1:]).strip()
+        if not body:
+            parent = title
+            continue
+        records.append({
+            'article': article,
+            'title': title,
+            'heading': f"{article} - {title}",
+            'text': body,
+            'parent': parent
+        })
+    return records
+
+
+class GdprRetriever:
+    """BM25 search over the GDPR article paragraphs, entirely in-process.
+
+    The per-(term, paragraph) BM25 weights are computed once, so a query is a
+    few dict lookups and additions: microseconds for this corpus. Headings
+    count twice, so a clause about 'retention' finds 'Retention period'
+    before paragraphs that only mention storing data in passing.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.version = hashlib.sha256(
+            '\n'.join(f"{r['heading']}\n{r['text']}" for r in records).encode('utf-8')
+        ).hexdigest()[:16]
+
+        docs = [
+            tokenize(f"{r['heading']} {r['heading']} {r['parent']} {r['text']}") for r in records
+        ]
+        avg_len = sum(len(doc) for doc in docs) / len(docs) if docs else 0.0
+
+        doc_freq = {}
+        for doc in docs:
+            for term in set(doc):
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        # term -> [(record index, BM25 weight)]: a sparse term x paragraph matrix
+        self.postings = {}
+        for i, doc in enumerate(docs):
+            counts = {}
+            for term in doc:
+                counts[term] = counts.get(term, 0) + 1
+            norm = K1 * (1 - B + B * len(doc) / avg_len)
+            for term, tf in counts.items():
+                idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                self.postings.setdefault(term, []).append((i, idf * tf * (K1 + 1) / (tf + norm)))
+
+    @classmethod
+    def from_file(cls, path=GDPR_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(parse_articles(f.read()))
+
+    def search(self, query, k=3):
+        """Top-k (score, record) pairs for the query, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            for i, weight in self.postings.get(term, ()):
+                scores[i] = scores.get(i, 0.0) + weight
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(score, self.records[i]) for i, score in best]
+
+    def snippets(self, query, k=3):
+        """The top-k paragraphs formatted for a prompt"""
+        return '\n'.join(f"- {record['heading']}: {record['text']}" for _score, record in self.search(query, k))
+
+    def cite(self, clause, focus):
+        """Deterministic citation without an LLM: the best matching article for the clause and focus"""
+        hits = self.search(f"{clause} {focus}", k=3)
+        if not hits:
+            return None
+        _score, best = hits[0]
+        return {
+            'gdpr_citation': f"Article: {best['heading']}\nText: {best['text']}",
+            'gdpr_articles': [record['heading'] for _score, record in hits]
+        }
+
+
+# Built once at import; the corpus is small and never changes at runtime
+retriever = GdprRetriever.from_file()
@@ -0,0 +1,139 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+
+SESSION_RE = re.compile(r'^[A-Za-z0-9_-]{8,128}$')
+
+# Pages shorter than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+
+class HandoffTooLarge(ValueError):
+    pass
+
+
+def new_session():
+    return uuid.uuid4().hex
+
+
+def valid_session(session):
+    return isinstance(session, str) and bool(SESSION_RE.match(session))
+
+
+class HandoffStore:
+    """Pages sent by the extension, keyed by session, until the web app picks them up.
+
+    Lives in SQLite so every gunicorn worker sees the same pages. Each entry
+    is capped at max_entry_bytes of text, expires after ttl seconds, and the
+    least recently used entries are evicted once the stored (compressed)
+    bytes exceed max_total_bytes.
+    """
+
+    def __init__(self, db_path, max_entry_bytes=2 * 1024 * 1024, max_total_bytes=64 * 1024 * 1024,
+                 ttl=600, compress=True):
+        self.max_entry_bytes = max_entry_bytes
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self.compress = compress
+        self.stats = {'stored': 0, 'hits': 0, 'misses': 0, 'rejected': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS handoffs ('
+                'session TEXT PRIMARY KEY, data BLOB NOT NULL, compressed INTEGER NOT NULL, '
+                'size INTEGER NOT NULL, job_id TEXT, created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS handoffs_accessed ON handoffs (accessed)')
+
+    @classmethod
+    def from_env(cls):
+        """Build from HANDOFF_DB, HANDOFF_MAX_BYTES, HANDOFF_MAX_TOTAL_BYTES, HANDOFF_TTL, HANDOFF_COMPRESS"""
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.handoff.sqlite3')
+        return cls(
+            db_path=os.getenv('HANDOFF_DB', default_path),
+            max_entry_bytes=int(os.getenv('HANDOFF_MAX_BYTES', 2 * 1024 * 1024)),
+            max_total_bytes=int(os.getenv('HANDOFF_MAX_TOTAL_BYTES', 64 * 1024 * 1024)),
+            ttl=float(os.getenv('HANDOFF_TTL', 600)),
+            compress=os.getenv('HANDOFF_COMPRESS', '1') == '1'
+        )
+
+    def put(self, session, text):
+        data = text.encode('utf-8')
+        if len(data) > self.max_entry_bytes:
+            self.stats['rejected'] += 1
+            raise HandoffTooLarge(f"Page is {len(data)} bytes, the limit is {self.max_entry_bytes}")
+
+        compressed = self.compress and len(data) >= COMPRESS_MIN_BYTES
+        if compressed:
+            data = zlib.compress(data, 6)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO handoffs (session, data, compressed, size, created, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (session, data, int(compressed), len(data), now, now)
+                )
+                self._conn.execute('DELETE FROM handoffs WHERE created < ?', (now - self.ttl,))
+                evicted = self._evict(session)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self.stats['stored'] += 1
+            self.stats['evicted'] += evicted
+
+    def attach_job(self, session, job_id):
+        """Remember the analysis job started for this page"""
+        with self._lock:
+            self._conn.execute('UPDATE handoffs SET job_id = ? WHERE session = ?', (job_id, session))
+
+    def _evict(self, keep):
+        """Drop least recently used entries (never `keep`) until under max_total_bytes"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM handoffs').fetchone()[0]
+        evicted = 0
+        if total <= self.max_total_bytes:
+            return evicted
+        for session, size in self._conn.execute(
+            'SELECT session, size FROM handoffs WHERE session != ? ORDER BY accessed', (keep,)
+        ).fetchall():
+            self._conn.execute('DELETE FROM handoffs WHERE session = ?', (session,))
+            evicted += 1
+            total -= size
+            if total <= self.max_total_bytes:
+                break
+        return evicted
+
+    def get(self, session, with_text=True):
+        """{'page_text': ..., 'job_id': ...} for a live session, else None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, compressed, job_id, created FROM handoffs WHERE session = ?', (session,)
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute('UPDATE handoffs SET accessed = ? WHERE session = ?', (now, session))
+            self.stats['hits'] += 1
+        data, compressed, job_id, _created = row
+        entry = {'job_id': job_id}
+        if with_text:
+            entry['page_text'] = (zlib.decompress(data) if compressed else data).decode('utf-8')
+        return entry
+
+    def summary(self):
+        with self._lock:
+            entries, stored_bytes = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM handoffs'
+            ).fetchone()
+        return dict(self.stats, entries=entries, stored_bytes=stored_bytes)
@@ -0,0 +1,154 @@
+"""Per-document clause x pattern hit matrices, and rescoring a corpus from them.
+
+RiskAnalyzer.analyze_with_hits() (or bulk_analyze.py --hits) records which
+patterns matched which clauses. Scores only depend on those hits, so new
+weights, caps, thresholds or disabled patterns can be tried on a whole
+corpus without running a single regex:
+
+    python backend/bulk_analyze.py corpus/ -o results.jsonl --hits
+    python backend/hit_matrix.py results.jsonl --config whatif.json -o rescored.jsonl
+
+whatif.json holds any of {"weights": {"biometric": 40}, "pair_cap": 70,
+"max_score": 100, "thresholds": [30, 60], "disabled_patterns": [3, 7]};
+pattern ids index RiskAnalyzer.pattern_table.
+"""
+import argparse
+import json
+import sys
+import time
+
+from scoring import DEFAULT_SCORING, category_score, overall_score, risk_level
+
+
+class HitMatrix:
+    """Which patterns matched which clauses of one document.
+
+    Stored by pattern: columns[p] is an int used as a bitset, bit c set if
+    pattern p matched clause c. spans has (clause, pattern, start, end) for
+    every hit, offsets into the stripped clause. Rescoring only needs the
+    columns, and OR-ing them covers all clauses at once.
+    """
+
+    def __init__(self, patterns_version, clauses=0, columns=None, spans=None):
+        self.patterns_version = patterns_version
+        self.clauses = clauses
+        self.columns = columns or {}
+        self.spans = spans or []
+
+    def add(self, clause_id, pattern_id, start, end):
+        self.columns[pattern_id] = self.columns.get(pattern_id, 0) | (1 << clause_id)
+        self.spans.append((clause_id, pattern_id, start, end))
+
+    def to_dict(self):
+        return {
+            'patterns_version': self.patterns_version,
+            'clauses': self.clauses,
+            'columns': {str(p): format(bits, 'x') for p, bits in sorted(self.columns.items())},
+            'spans': [list(span) for span in self.spans]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['patterns_version'],
+            data['clauses'],
+            {int(p): int(bits, 16) for p, bits in data['columns'].items()},
+            [tuple(span) for span in data['spans']]
+        )
+
+
+class Rescorer:
+    """Scores for hit matrices under a what-if config (see the module docstring)"""
+
+    def __init__(self, analyzer, config=None):
+        config = config or {}
+        self.patterns_version = analyzer.patterns_version
+        self.weights = {
+            category: config.get('weights', {}).get(category, settings['weight'])
+            for category, settings in analyzer.patterns.items()
+        }
+        self.scoring = dict(analyzer.scoring, **{k: config[k] for k in DEFAULT_SCORING if k in config})
+
+        # Pattern ids still enabled, per category
+        disabled = set(config.get('disabled_patterns', ()))
+        self.category_patterns = {category: [] for category in analyzer.patterns}
+        for pattern_id, (category, _pattern) in enumerate(analyzer.pattern_table):
+            if pattern_id not in disabled:
+                self.category_patterns[category].append(pattern_id)
+
+    def counts(self, matrix):
+        """Clauses per category matched by at least one enabled pattern"""
+        counts = {}
+        for category, pattern_ids in self.category_patterns.items():
+            clauses = 0
+            for pattern_id in pattern_ids:
+                clauses |= matrix.columns.get(pattern_id, 0)
+            counts[category] = clauses.bit_count()
+        return counts
+
+    def score(self, matrix):
+        """The score part of analyze() results (no match lists)"""
+        if matrix.patterns_version != self.patterns_version:
+            raise ValueError("hit matrix is from a different pattern set; re-run the analysis")
+        thresholds = self.scoring['thresholds']
+        results = {}
+        scores = {}
+        for category, count in self.counts(matrix).items():
+            score = category_score(count, self.weights[category], self.scoring)
+            scores[category] = score
+            results[category] = {'score': score, 'risk_level': risk_level(score, thresholds), 'total_matches': count}
+        overall = overall_score(scores, self.weights)
+        results['overall'] = {'score': round(overall, 1), 'risk_level': risk_level(overall, thresholds)}
+        return results
+
+
+def main():
+    from risk_analyzer import RiskAnalyzer
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help='bulk_analyze.py --hits output (JSONL)')
+    parser.add_argument('--config', help='JSON file with the weights/caps/thresholds to try')
+    parser.add_argument('-o', '--output', help='write {"id", "results"} per document here')
+    parser.add_argument('--match-budget', type=int, default=None, help='the --match-budget the corpus was run with')
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+    rescorer = Rescorer(RiskAnalyzer(match_budget=args.match_budget), config)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    before = {'low': 0, 'medium': 0, 'high': 0}
+    after = dict(before)
+    changed = skipped = done = 0
+    start = time.monotonic()
+    with open(args.input, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'hits' not in record:
+                skipped += 1
+                continue
+            results = rescorer.score(HitMatrix.from_dict(record['hits']))
+            old_level = record['results']['overall']['risk_level']
+            new_level = results['overall']['risk_level']
+            before[old_level] += 1
+            after[new_level] += 1
+            changed += old_level != new_level
+            done += 1
+            if out:
+                out.write(json.dumps({'id': record['id'], 'results': results}) + '\n')
+    if out:
+        out.close()
+
+    elapsed = time.monotonic() - start
+    print(f"✅ Rescored {done} docs in {elapsed:.2f}s ({done / elapsed if elapsed else 0:.0f} docs/sec)", file=sys.stderr)
+    if skipped:
+        print(f"⚠️ {skipped} records had no hit matrix (run bulk_analyze.py with --hits)", file=sys.stderr)
+    for level in before:
+        print(f"  {level:<7} {before[level]:>8} -> {after[level]:<8}", file=sys.stderr)
+    print(f"  {changed} docs changed overall risk level", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
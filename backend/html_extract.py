@@ -0,0 +1,282 @@
+"""Policy sections from raw HTML, in one streaming pass.
+
+Both backends accept whole pages (optionally gzip/deflate compressed) at
+POST /analyze/html. The page is parsed as it arrives: navigation, footers,
+cookie banners, scripts and other boilerplate are dropped, headings split
+the text into sections with their heading path ("Privacy Policy > How Long
+We Keep Data"), and only sections about the topics we score (retention,
+sharing, biometrics, ...) are passed on. No length cap is needed because
+the page is never held as one big string.
+"""
+import codecs
+import re
+import zlib
+from html.parser import HTMLParser
+
+try:
+    import brotli
+except ImportError:  # optional; 'br' bodies are rejected without it
+    brotli = None
+
+
+# Decompressed pages larger than this are refused (a few MB is already a huge policy)
+MAX_HTML_BYTES = 20 * 1024 * 1024
+
+# Never content, whatever they contain
+SKIP_TAGS = frozenset((
+    'head', 'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+    'nav', 'footer', 'aside', 'form', 'button', 'select', 'dialog'
+))
+SKIP_ROLES = frozenset((
+    'navigation', 'banner', 'contentinfo', 'dialog', 'alertdialog', 'complementary', 'search', 'menu', 'menubar'
+))
+# Whole id/class tokens of cookie banners and site chrome (not a policy's own "Cookies" section)
+BOILERPLATE_RE = re.compile(
+    r'(?:[\w-]*[-_])?(?:cookie|consent|gdpr)[-_]?(?:banner|bar|notice|popup|modal|dialog|wrapper|container)|'
+    r'onetrust[\w-]*|cookiebot[\w-]*|cc-window|navbar|(?:site|global|page)[-_]?(?:header|footer|nav)|'
+    r'breadcrumbs?|sidebar|social[-_]?(?:links|share|icons)|newsletter[\w-]*|skip[-_]?link|(?:main|nav|site)?[-_]?menu',
+    re.IGNORECASE
+)
+# Tags whose class says nothing about boilerplate ('menu-open' on <body>)
+WRAPPER_TAGS = frozenset(('html', 'body', 'main', 'article'))
+
+class PageTooLarge(ValueError):
+    pass
+
+
+BLOCK_TAGS = frozenset((
+    'p', 'div', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'section', 'article', 'main', 'header', 'table', 'tr',
+    'blockquote', 'pre', 'br', 'hr', 'figure', 'figcaption', 'address', 'details', 'summary'
+))
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# Topic -> words that mark a section heading as being about it
+TOPICS = {
+    'retention': ('retention', 'retain', 'how long', 'storage', 'store', 'delet', 'keep'),
+    'sharing': ('shar', 'disclos', 'third part', 'sell', 'sale', 'partner', 'advertis', 'transfer'),
+    'biometrics': ('biometric', 'face', 'facial', 'fingerprint', 'voice'),
+    'location': ('location', 'gps', 'geolocation'),
+    'devices': ('camera', 'microphone', 'device'),
+    'collection': ('collect', 'information we', 'data we', 'personal information', 'personal data'),
+    'purposes': ('purpose', 'how we use', 'use of', 'legal basis', 'legitimate interest'),
+}
+TOPIC_RES = {
+    topic: re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    for topic, words in TOPICS.items()
+}
+# A section under some other heading is still kept if its text mentions one of these
+BODY_RE = re.compile(
+    r'biometric|fingerprint|facial|face (?:recognition|geometry)|location|gps|tracking|camera|microphone|'
+    r'retain|retention|indefinitely|permanently|as long as|delete|sell|third[\s-]part|advertis|'
+    r'legitimate (?:\w+ )?interest|at our discretion',
+    re.IGNORECASE
+)
+
+
+class PolicyExtractor(HTMLParser):
+    """Streaming HTML -> sections. feed() pieces of the page, then close() and read .sections.
+
+    Each section is {'heading', 'level', 'path', 'paragraphs', 'topics', 'relevant'};
+    text before the first heading goes into a section with an empty heading.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections = []
+        self.stats = {'text_chars': 0, 'boilerplate_chars': 0}
+        self._headings = []     # [(level, text)] of the enclosing headings
+        self._paragraph = []
+        self._heading = None    # (level, [text]) while inside an <hN>
+        self._skip_tag = None   # tag that started the boilerplate being skipped
+        self._skip_depth = 0
+        self._content_depth = 0  # inside <main>/<article>, where a <header> is content
+        self._new_section(0, '')
+
+    # Section and paragraph bookkeeping
+    def _new_section(self, level, heading):
+        self.sections.append({
+            'heading': heading,
+            'level': level,
+            'path': [text for _level, text in self._headings],
+            'paragraphs': []
+        })
+
+    def _flush(self):
+        if self._paragraph:
+            text = ' '.join(''.join(self._paragraph).split())
+            self._paragraph = []
+            if text:
+                self.sections[-1]['paragraphs'].append(text)
+                self.stats['text_chars'] += len(text)
+
+    def _is_boilerplate(self, tag, attrs):
+        if tag in SKIP_TAGS or (tag == 'header' and not self._content_depth):
+            return True
+        attrs = dict(attrs)
+        if 'hidden' in attrs or attrs.get('aria-hidden') == 'true' or attrs.get('role') in SKIP_ROLES:
+            return True
+        if tag in WRAPPER_TAGS:
+            return False
+        names = f"{attrs.get('id') or ''} {attrs.get('class') or ''}".split()
+        return any(BOILERPLATE_RE.fullmatch(name) for name in names)
+
+    # HTMLParser callbacks
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if self._is_boilerplate(tag, attrs):
+            self._flush()
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+
+        if tag in ('main', 'article'):
+            self._content_depth += 1
+        if tag in HEADING_TAGS:
+            self._flush()
+            self._heading = (HEADING_TAGS[tag], [])
+        elif tag in BLOCK_TAGS:
+            self._flush()
+        elif tag in ('td', 'th'):
+            self._paragraph.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        if self._skip_tag is None and tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+
+        if tag in ('main', 'article') and self._content_depth:
+            self._content_depth -= 1
+        if tag in HEADING_TAGS and self._heading is not None:
+            level, parts = self._heading
+            self._heading = None
+            text = ' '.join(''.join(parts).split())
+            if text:
+                while self._headings and self._headings[-1][0] >= level:
+                    self._headings.pop()
+                self._new_section(level, text)
+                self._headings.append((level, text))
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_tag is not None:
+            self.stats['boilerplate_chars'] += len(data.strip())
+        elif self._heading is not None:
+            self._heading[1].append(data)
+        else:
+            self._paragraph.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+        for section in self.sections:
+            label = ' '.join(section['path'] + [section['heading']])
+            section['topics'] = [topic for topic, pattern in TOPIC_RES.items() if pattern.search(label)]
+            section['relevant'] = bool(section['topics']) or any(
+                BODY_RE.search(paragraph) for paragraph in section['paragraphs']
+            )
+        # Drop headings with nothing under them
+        self.sections = [s for s in self.sections if s['paragraphs']]
+
+
+class PageReader:
+    """Raw (optionally compressed) page bytes in, sections out.
+
+    feed() each piece of the request body as it arrives, then close() for
+    (sections, stats). Raises ValueError for an unsupported Content-Encoding
+    or a corrupt body, PageTooLarge once more than max_bytes have been
+    decompressed.
+    """
+
+    def __init__(self, content_encoding=None, charset='utf-8', max_bytes=MAX_HTML_BYTES):
+        encoding = (content_encoding or 'identity').strip().lower()
+        self._zlib = None
+        if encoding in ('gzip', 'x-gzip', 'deflate'):
+            # 47 = zlib or gzip header, detected automatically
+            self._zlib = zlib.decompressobj(47)
+            self._decompress, self._flush = self._zlib.decompress, self._zlib.flush
+        elif encoding == 'br':
+            if brotli is None:
+                raise ValueError("br bodies need the brotli package")
+            self._decompress, self._flush = brotli.Decompressor().process, (lambda: b'')
+        elif encoding == 'identity':
+            self._decompress, self._flush = (lambda data: data), (lambda: b'')
+        else:
+            raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+        try:
+            self._decoder = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.max_bytes = max_bytes
+        self.bytes_in = 0
+        self.bytes_html = 0
+        self.parser = PolicyExtractor()
+
+    def feed(self, data, final=False):
+        self.bytes_in += len(data)
+        try:
+            html = self._decompress(data)
+            if final:
+                html += self._flush()
+        except Exception as e:  # zlib.error, brotli.error
+            raise ValueError(f"Could not decompress the page: {e}")
+        self.bytes_html += len(html)
+        if self.bytes_html > self.max_bytes:
+            raise PageTooLarge(f"Page is over the {self.max_bytes} byte limit")
+        self.parser.feed(self._decoder.decode(html, final=final))
+
+    def close(self):
+        self.feed(b'', final=True)
+        if self._zlib is not None and not self._zlib.eof:
+            raise ValueError("Compressed page body is truncated")
+        self.parser.close()
+        return self.parser.sections, page_stats(self.parser, bytes_in=self.bytes_in, html_bytes=self.bytes_html)
+
+
+def page_stats(parser, **extra):
+    relevant = [s for s in parser.sections if s['relevant']]
+    return dict(
+        parser.stats,
+        sections=len(parser.sections),
+        relevant_sections=len(relevant),
+        kept_chars=sum(len(p) for s in relevant for p in s['paragraphs']),
+        **extra
+    )
+
+
+def extract_sections(text_chunks):
+    """(sections, stats) for HTML that is already text, whole or in pieces"""
+    parser = PolicyExtractor()
+    for chunk in text_chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.sections, page_stats(parser)
+
+
+def relevant_text(sections):
+    """The relevant sections' paragraphs, '\\n\\n'-separated (one clause each for RiskAnalyzer)"""
+    return '\n\n'.join(p for section in sections if section['relevant'] for p in section['paragraphs'])
+
+
+def section_summary(sections):
+    """Heading paths and topics for a response, without the text"""
+    return [
+        {
+            'path': ' > '.join(section['path'] + [section['heading']]) if section['heading'] else '',
+            'topics': section['topics'],
+            'relevant': section['relevant'],
+            'chars': sum(len(p) for p in section['paragraphs'])
+        }
+        for section in sections
+    ]
@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from metrics import metrics
+
+
+# A job still 'running' after this long lost its worker (crash, restart) and is run again
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+# How often idle workers look for jobs queued by other processes
+POLL_SECONDS = 1.0
+
+
+class JobQueue:
+    """AI enhancement jobs in a SQLite table, run by a bounded pool of worker threads.
+
+    submit() stores the regex results and returns straight away; a worker
+    later replaces them with work(results). Every process using the same file
+    sees the same jobs, so a poll can land on any gunicorn worker, and jobs
+    left behind by a restart are picked up again once their lease runs out.
+    """
+
+    def __init__(self, work, db_path, workers=2, ttl=86400, lease=LEASE_SECONDS, on_done=None):
+        self.work = work
+        self.workers = workers
+        self.ttl = ttl
+        self.lease = lease
+        self.on_done = on_done  # on_done(key, result) after a job succeeds
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._threads = []
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, key TEXT, status TEXT NOT NULL, results TEXT NOT NULL, error TEXT, '
+                'attempts INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, started REAL, finished REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)')
+        self.purge()
+
+    @classmethod
+    def from_env(cls, work, on_done=None):
+        """Build from JOB_DB, JOB_WORKERS and JOB_TTL"""
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jobs.sqlite3')
+        return cls(
+            work,
+            db_path=os.getenv('JOB_DB', default_path),
+            workers=int(os.getenv('JOB_WORKERS', 2)),
+            ttl=float(os.getenv('JOB_TTL', 86400)),
+            on_done=on_done
+        )
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    # ---------------------------
+    # Submitting and polling
+    # ---------------------------
+    def submit(self, results, key=None, done=False):
+        """Queue results for enhancement and return the job.
+
+        A job already queued or running for the same key is returned instead
+        of a new one. With done=True the job is stored as finished (nothing
+        left to do, e.g. the AI result was cached).
+        """
+        now = time.time()
+        with self._lock:
+            if key is not None and not done:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running') LIMIT 1", (key,)
+                ).fetchone()
+                if row:
+                    return self._get(row[0])
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                'INSERT INTO jobs (id, key, status, results, created, finished) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, key, 'done' if done else 'queued', json.dumps(results), now, now if done else None)
+            )
+            job = self._get(job_id)
+        if not done:
+            metrics.inc('jobs_submitted')
+            self._notify()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id):
+        row = self._conn.execute(
+            'SELECT id, status, results, error, attempts, created, started, finished FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, status, results, error, attempts, created, started, finished = row
+        job = {'job_id': job_id, 'status': status, 'results': json.loads(results), 'created': created}
+        if status == 'queued':
+            job['position'] = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?", (created,)
+            ).fetchone()[0]
+        if error:
+            job['error'] = error
+        if started:
+            job['started'] = started
+        if finished:
+            job['finished'] = finished
+        return job
+
+    def wait(self, job_id, timeout):
+        """Long-poll: return the job once it is finished or after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in ('done', 'failed') or remaining <= 0:
+                return job
+            # Woken by this process's workers; jobs finished elsewhere are seen on the next poll
+            with self._changed:
+                self._changed.wait(min(remaining, POLL_SECONDS))
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    # ---------------------------
+    # Workers
+    # ---------------------------
+    def _claim(self):
+        """Atomically take the oldest runnable job; returns (id, results) or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Jobs that failed every attempt (e.g. they crash the worker) are given up on
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'gave up after repeated attempts', finished = ? "
+                    "WHERE status = 'running' AND started < ? AND attempts >= ?",
+                    (now, now - self.lease, MAX_ATTEMPTS)
+                )
+                row = self._conn.execute(
+                    "SELECT id, results FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND started < ?) ORDER BY created LIMIT 1",
+                    (now - self.lease,)
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now, row[0])
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _finish(self, job_id, results=None, error=None):
+        with self._lock:
+            if error is None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'done', results = ?, finished = ? WHERE id = ?",
+                    (json.dumps(results), time.time(), job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                    (error, time.time(), job_id)
+                )
+            key = self._conn.execute('SELECT key FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+        self._notify()
+        return key
+
+    def _worker(self):
+        last_purge = time.monotonic()
+        while True:
+            try:
+                claimed = self._claim()
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Job queue busy: {e}")
+                claimed = None
+
+            if claimed is None:
+                if time.monotonic() - last_purge > 600:
+                    self.purge()
+                    last_purge = time.monotonic()
+                with self._changed:
+                    self._changed.wait(POLL_SECONDS)
+                continue
+
+            job_id, results = claimed
+            with self._lock:
+                self._busy += 1
+            start = time.monotonic()
+            try:
+                print(f"🧵 Job {job_id[:8]} started")
+                enhanced = self.work(results)
+                key = self._finish(job_id, enhanced)
+                if self.on_done:
+                    self.on_done(key, enhanced)
+                metrics.inc('jobs_finished', status='done')
+                print(f"✅ Job {job_id[:8]} done in {time.monotonic() - start:.1f}s")
+            except Exception as e:
+                self._finish(job_id, error=str(e))
+                metrics.inc('jobs_finished', status='failed')
+                print(f"❌ Job {job_id[:8]} failed: {e}")
+            finally:
+                elapsed = time.monotonic() - start
+                metrics.observe('job_run', elapsed)
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += elapsed
+
+    # ---------------------------
+    # Housekeeping
+    # ---------------------------
+    def purge(self):
+        """Drop finished jobs older than the TTL"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (time.time() - self.ttl,)
+            )
+
+    def stats(self):
+        """Queue depth (shared by all processes) and this process's worker utilization"""
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            busy = self._busy
+            busy_seconds = self._busy_seconds
+        uptime = time.monotonic() - self._started
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'workers': self.workers,
+            'busy_workers': busy,
+            'utilization': round(busy_seconds / (self.workers * uptime), 3) if uptime and self.workers else 0.0
+        }
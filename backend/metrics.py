@@ -0,0 +1,162 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Latency histogram buckets in seconds, from a regex pass up to a slow LLM call
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Stage timings for the current request, when it asked for a profile
+_profile = contextvars.ContextVar('profile', default=None)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class Metrics:
+    """Process-wide counters and latency histograms, rendered as Prometheus text.
+
+    Shared by both backends. With enabled=False (METRICS_ENABLED=0) every
+    call returns straight away. Collectors expose stats dicts that already
+    exist (caches, scheduler, cascade) and are read only when /metrics is
+    scraped. A request can also collect its own stage timings with
+    start_profile(), whether or not metrics are enabled.
+    """
+
+    def __init__(self, enabled=True, prefix='privacy_forensics'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+        self._collectors = []  # (name, kind, label, fn)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(enabled=os.getenv('METRICS_ENABLED', '1') == '1')
+
+    def active(self):
+        """True if timings are wanted at all; lets hot loops skip the clock calls"""
+        return self.enabled or _profile.get() is not None
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration for stage `name` (exported as <name>_seconds)"""
+        profile = _profile.get()
+        if profile is not None:
+            profile[name] = profile.get(name, 0.0) + seconds
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(BUCKETS) + [0, 0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        if not self.active():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, name, fn, kind='counter', label='stat'):
+        """Export fn()'s numeric values as <name>{<label>="<key>"}, read at scrape time"""
+        self._collectors.append((name, kind, label, fn))
+
+    # Per-request profiles
+    def start_profile(self):
+        return _profile.set({})
+
+    def stop_profile(self, token):
+        """End the profile; returns {stage: seconds}"""
+        profile = _profile.get()
+        _profile.reset(token)
+        return profile or {}
+
+    @staticmethod
+    def server_timing(profile, total=None):
+        """Server-Timing header value (shown in the browser's network panel)"""
+        entries = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in profile.items()]
+        if total is not None:
+            entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            full = f'{self.prefix}_{name}_total'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} counter')
+            lines.append(f'{full}{_format_labels(labels)} {_format_value(value)}')
+
+        for (name, labels), histogram in histograms:
+            full = f'{self.prefix}_{name}_seconds'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} histogram')
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram):
+                cumulative += count
+                lines.append(f'{full}_bucket{_format_labels(labels, [("le", str(bound))])} {cumulative}')
+            lines.append(f'{full}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram[-2]}')
+            lines.append(f'{full}_sum{_format_labels(labels)} {histogram[-1]!r}')
+            lines.append(f'{full}_count{_format_labels(labels)} {histogram[-2]}')
+
+        for name, kind, label, fn in self._collectors:
+            try:
+                values = fn()
+            except Exception as e:
+                print(f"⚠️ Metrics collector {name} failed: {e}")
+                continue
+            full = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {full} {kind}')
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'{full}{_format_labels([(label, str(key))])} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# One registry per process; both apps import this
+metrics = Metrics.from_env()
@@ -0,0 +1,443 @@
+import re
+from time import perf_counter
+
+from segmenter import folded
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+# Anchors shorter than this filter almost nothing and just cost substring scans
+MIN_ANCHOR_LENGTH = 3
+
+# Longest stretch of arbitrary text a pattern may skip between two terms.
+# Unbounded `.*` chains go quadratic (or worse) on long clauses.
+MAX_GAP = 100
+
+# A lowercase word a folded pattern can start with, so re finds it with a fast prefix scan
+WORD_START_RE = re.compile(r'[a-z0-9]+')
+QUANTIFIERS = ('?', '*', '+', '{')
+
+
+class UnsafePatternError(ValueError):
+    pass
+
+
+def bound_gaps(pattern, max_gap=MAX_GAP):
+    """Rewrite unbounded `.*` / `.+` gaps into `.{0,N}` / `.{1,N}` windows"""
+    out = []
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            if ch == ']':
+                in_class = False
+            out.append(ch)
+            i += 1
+            continue
+        if ch == '[':
+            in_class = True
+            out.append(ch)
+            i += 1
+            # A leading ']' (after an optional '^') is a literal, not the end
+            if pattern[i:i + 1] == '^':
+                out.append('^')
+                i += 1
+            if pattern[i:i + 1] == ']':
+                out.append(']')
+                i += 1
+            continue
+        if ch == '.' and pattern[i + 1:i + 2] in ('*', '+'):
+            low = 0 if pattern[i + 1] == '*' else 1
+            out.append(f'.{{{low},{max_gap}}}')
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return ''.join(out)
+
+
+def _unsafe_constructs(parsed, in_unbounded=False):
+    problems = []
+    for op, av in parsed:
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                  getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            _min_count, max_count, body = av
+            unbounded = max_count == sre_constants.MAXREPEAT
+            if unbounded and in_unbounded:
+                problems.append('nested unbounded quantifier')
+            if unbounded and any(sub_op is sre_constants.ANY for sub_op, _ in body):
+                problems.append("unbounded '.' gap")
+            problems.extend(_unsafe_constructs(body, in_unbounded or unbounded))
+        elif op is sre_constants.SUBPATTERN:
+            problems.extend(_unsafe_constructs(av[-1], in_unbounded))
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                problems.extend(_unsafe_constructs(branch, in_unbounded))
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            problems.extend(_unsafe_constructs(av[1], in_unbounded))
+    return problems
+
+
+def validate_pattern(pattern):
+    """Raise UnsafePatternError if the pattern can backtrack super-linearly"""
+    problems = _unsafe_constructs(sre_parse.parse(pattern, re.IGNORECASE))
+    if problems:
+        raise UnsafePatternError(f"{pattern!r}: {', '.join(sorted(set(problems)))}")
+    return pattern
+
+
+def make_safe(pattern, max_gap=MAX_GAP, strict=False):
+    """Validate a pattern, rewriting unbounded gaps first unless strict"""
+    if not strict:
+        pattern = bound_gaps(pattern, max_gap)
+    return validate_pattern(pattern)
+
+
+def _fold_invariant(parsed):
+    """Whether every literal and range in the parsed pattern is already casefolded"""
+    def is_folded(code):
+        return chr(code).casefold() == chr(code)
+
+    for op, av in parsed:
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL):
+            if not is_folded(av):
+                return False
+        elif op is sre_constants.IN:
+            for item_op, item_av in av:
+                if item_op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL) and not is_folded(item_av):
+                    return False
+                if item_op is sre_constants.RANGE:
+                    low, high = item_av
+                    if high - low > 0x3000 or not all(is_folded(code) for code in range(low, high + 1)):
+                        return False
+        elif op is sre_constants.SUBPATTERN:
+            # (?-i:...) must stay case-sensitive on the original text
+            if av[2] & sre_constants.SRE_FLAG_IGNORECASE or not _fold_invariant(av[-1]):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_fold_invariant(branch) for branch in av[1]):
+                return False
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            if not _fold_invariant(av[2]):
+                return False
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if not _fold_invariant(av[1]):
+                return False
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            if not _fold_invariant(av):
+                return False
+        elif op is sre_constants.GROUPREF_EXISTS:
+            return False
+    return True
+
+
+def _word_start(branch):
+    """'share.{0,100}...' -> 'share(?<=\\bshare).{0,100}...', or None if branch doesn't start with a word"""
+    m = WORD_START_RE.match(branch)
+    word = m.group(0) if m else ''
+    if branch[len(word):len(word) + 1] in QUANTIFIERS:
+        # "ads?" only promises "ad"
+        word = word[:-1]
+    if not word:
+        return None
+    return f'{word}(?<=\\b{word}){branch[len(word):]}'
+
+
+def _group_branches(pattern):
+    """(opening, [branches], rest) for a pattern starting with a group, else None"""
+    if pattern.startswith('(?:'):
+        opening = '(?:'
+    elif pattern.startswith('(') and not pattern.startswith('(?'):
+        opening = '('
+    else:
+        return None
+    branches = []
+    depth = 0
+    in_class = False
+    start = i = len(opening)
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            if ch == ']':
+                in_class = False
+        elif ch == '[':
+            in_class = True
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            if depth == 0:
+                branches.append(pattern[start:i])
+                return opening, branches, pattern[i + 1:]
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    return None
+
+
+def fold_pattern(pattern):
+    """A case-sensitive pattern that matches casefolded text where pattern (IGNORECASE) matches the original.
+
+    Returns None if the pattern has uppercase literals or ranges. Python's
+    re can't use its fast literal prefix scan with IGNORECASE or behind a
+    leading \\b, so "\\bshare..." becomes "share(?<=\\bshare)...", and
+    "\\b(sell|sold)..." becomes "(sell(?<=\\bsell)|sold(?<=\\bsold))...".
+    Matches keep the same offsets.
+    """
+    if not _fold_invariant(sre_parse.parse(pattern, re.IGNORECASE)):
+        return None
+    if not pattern.startswith('\\b'):
+        return pattern
+    rest = pattern[2:]
+    word = _word_start(rest)
+    if word:
+        return word
+    group = _group_branches(rest)
+    if group:
+        opening, branches, after = group
+        anchored = [_word_start(branch) for branch in branches]
+        if all(anchored) and after[:1] not in QUANTIFIERS:
+            return opening + '|'.join(anchored) + ')' + after
+    return pattern
+
+
+def _best(candidates):
+    """Pick the most selective any-of literal set (longest shortest literal)"""
+    candidates = [c for c in candidates if c]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda alts: (min(len(a) for a in alts), -len(alts)))
+
+
+def _required_literals(parsed):
+    """Return a list of any-of literal sets that every match must contain.
+
+    Each entry is a frozenset of lowercase strings: a match always contains at
+    least one string from every entry. An empty list means no requirement
+    could be proven and the pattern must always be tried.
+    """
+    required = []
+    run = []
+
+    def flush():
+        if len(run) >= MIN_ANCHOR_LENGTH:
+            required.append(frozenset([''.join(run)]))
+        run.clear()
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av).casefold())
+            continue
+        if op is sre_constants.AT:
+            # \b and friends are zero-width, they don't break a literal run
+            continue
+
+        flush()
+
+        if op is sre_constants.SUBPATTERN:
+            required.extend(_required_literals(av[-1]))
+        elif op is sre_constants.BRANCH:
+            branch_sets = [_best(_required_literals(b)) for b in av[1]]
+            if all(branch_sets):
+                required.append(frozenset().union(*branch_sets))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            min_count, _max_count, body = av
+            if min_count >= 1:
+                required.extend(_required_literals(body))
+        # IN, ANY, ASSERT, ASSERT_NOT etc. give us nothing we can rely on
+
+    flush()
+    return required
+
+
+def extract_anchors(pattern):
+    """Required literal anchors for a raw pattern (matched case-insensitively)"""
+    return _required_literals(sre_parse.parse(pattern, re.IGNORECASE))
+
+
+class CompiledCategory:
+    def __init__(self, name, patterns, max_gap=MAX_GAP, strict=False):
+        self.name = name
+        self.raw_patterns = list(patterns)
+        # What actually runs: gaps bounded, checked for catastrophic backtracking
+        self.patterns = [make_safe(p, max_gap, strict) for p in self.raw_patterns]
+        self.compiled = [re.compile(p, re.IGNORECASE) for p in self.patterns]
+        self.anchors = [extract_anchors(p) for p in self.patterns]
+        # One alternation so a clause with no hit costs a single regex pass
+        self.combined = re.compile(
+            '|'.join(f'(?P<p{i}>{p})' for i, p in enumerate(self.patterns)),
+            re.IGNORECASE
+        )
+        # Case-sensitive twins for the casefolded text (None where a pattern can't be folded)
+        self.folded = [self._compile_folded(p) for p in self.patterns]
+        # A folded pattern starting with a word finds it as fast as the anchor lookups would
+        self.prefix_scan = [f is not None and WORD_START_RE.match(f.pattern) is not None for f in self.folded]
+
+    @staticmethod
+    def _compile_folded(pattern):
+        folded_pattern = fold_pattern(pattern)
+        if folded_pattern is None:
+            return None
+        try:
+            return re.compile(folded_pattern)
+        except re.error:
+            return None
+
+    def _worth_trying(self, i, has_literal, lowered):
+        if lowered is not None and self.prefix_scan[i]:
+            return True
+        return all(any(has_literal(lit) for lit in alts) for alts in self.anchors[i])
+
+    def _search(self, i, clause, start, end, lowered):
+        pattern = self.folded[i] if lowered is not None else None
+        if pattern is None:
+            return self.compiled[i].search(clause, start, end)
+        return pattern.search(lowered, start, end)
+
+    def match(self, clause, has_literal, start=0, end=None, lowered=None):
+        """Find the first pattern (in list order) that matches the clause.
+
+        Returns (pattern_index, matched_text, match_start) or None, with
+        match_start an offset into clause. `has_literal` is the
+        per-clause anchor lookup shared across categories. With lowered
+        (clause casefolded, same offsets) the folded patterns run on it.
+        """
+        if end is None:
+            end = len(clause)
+
+        if lowered is not None:
+            # Folded patterns run at prefix-scan speed, so trying them in list
+            # order is cheaper than the IGNORECASE alternation
+            for i in range(len(self.patterns)):
+                if self._worth_trying(i, has_literal, lowered):
+                    m = self._search(i, clause, start, end, lowered)
+                    if m:
+                        return i, clause[m.start():m.end()], m.start()
+            return None
+
+        candidates = [i for i in range(len(self.patterns)) if self._worth_trying(i, has_literal, None)]
+        if not candidates:
+            return None
+
+        if len(candidates) == 1:
+            i = candidates[0]
+            m = self.compiled[i].search(clause, start, end)
+            return (i, m.group(0), m.start()) if m else None
+
+        m = self.combined.search(clause, start, end)
+        if not m:
+            return None
+
+        hit = int(m.lastgroup[1:])
+        # The alternation reports the leftmost hit, but the original rule is
+        # "first pattern in list order wins". Earlier patterns can't match at
+        # or before m.start(), so only the rest of the clause needs checking.
+        for i in candidates:
+            if i >= hit:
+                break
+            earlier = self.compiled[i].search(clause, m.start() + 1, end)
+            if earlier:
+                return i, earlier.group(0), earlier.start()
+        return hit, m.group(m.lastgroup), m.start()
+
+    def match_all(self, clause, has_literal, start=0, end=None, lowered=None):
+        """Every pattern that matches the clause: [(pattern_index, start, end)] of each one's first match"""
+        if end is None:
+            end = len(clause)
+        hits = []
+        for i in range(len(self.patterns)):
+            if self._worth_trying(i, has_literal, lowered):
+                m = self._search(i, clause, start, end, lowered)
+                if m:
+                    hits.append((i, m.start(), m.end()))
+        return hits
+
+
+class CompiledPatternSet:
+    """All risk categories compiled once, scanned together per clause"""
+
+    def __init__(self, patterns, max_gap=MAX_GAP, strict=False):
+        self.categories = [
+            CompiledCategory(name, config['patterns'], max_gap, strict)
+            for name, config in patterns.items()
+        ]
+
+    def _literal_lookup(self, clause, start, end, lowered):
+        """has_literal(lit) for clause[start:end], using the caller's casefolded copy of clause if given"""
+        seen = {}
+        if lowered is None:
+            lowered = clause[start:end].casefold()
+
+            def has_literal(lit):
+                if lit not in seen:
+                    seen[lit] = lit in lowered
+                return seen[lit]
+        else:
+            stop = len(clause) if end is None else end
+
+            def has_literal(lit):
+                if lit not in seen:
+                    seen[lit] = lowered.find(lit, start, stop) >= 0
+                return seen[lit]
+        return has_literal
+
+    def scan(self, clause, start=0, end=None, timings=None, lowered=None):
+        """Match clause[start:end] against every category, without slicing it.
+
+        Returns {category: (pattern_index, matched_text, match_start)} for
+        the categories that matched, match_start being an offset into clause.
+        If a timings dict is given, seconds spent per category are added to
+        it. lowered is clause.casefold() with the same offsets
+        (segmenter.folded), for callers scanning many spans of one text.
+        """
+        if lowered is None and start == 0 and end is None:
+            lowered = folded(clause)
+        has_literal = self._literal_lookup(clause, start, end, lowered)
+
+        hits = {}
+        for category in self.categories:
+            if timings is None:
+                hit = category.match(clause, has_literal, start, end, lowered)
+            else:
+                began = perf_counter()
+                hit = category.match(clause, has_literal, start, end, lowered)
+                timings[category.name] = timings.get(category.name, 0.0) + perf_counter() - began
+            if hit:
+                hits[category.name] = hit
+        return hits
+
+    def scan_all(self, clause, start=0, end=None, timings=None, lowered=None):
+        """Like scan(), but {category: [(pattern_index, start, end), ...]} for every matching pattern"""
+        if lowered is None and start == 0 and end is None:
+            lowered = folded(clause)
+        has_literal = self._literal_lookup(clause, start, end, lowered)
+
+        hits = {}
+        for category in self.categories:
+            began = perf_counter() if timings is not None else None
+            found = category.match_all(clause, has_literal, start, end, lowered)
+            if timings is not None:
+                timings[category.name] = timings.get(category.name, 0.0) + perf_counter() - began
+            if found:
+                hits[category.name] = found
+        return hits
@@ -0,0 +1,124 @@
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional; clients asking for it get JSON instead
+    msgpack = None
+
+
+# Smaller bodies go out as is; gzip's overhead eats most of the saving
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Match fields the compact tuple replaces; anything else (AI fields, 'truncated') is kept in a dict
+SPAN_FIELDS = ('clause_id', 'text', 'matched_keyword', 'keyword_start', 'position', 'pattern')
+
+
+def compact_results(results, analyzer):
+    """analyze() results with every clause and pattern sent once.
+
+    Each match becomes [clause_id, start, end, pattern_id], plus a dict of
+    its other fields (ai_validation, truncated, ...) when it has any.
+    start:end is the matched text's span in clauses[clause_id] and
+    pattern_id indexes patterns. A match whose text isn't inside the 400
+    chars kept of its clause gets None for the span and keeps
+    'matched_keyword' (and 'keyword_start') in the dict.
+    """
+    pattern_ids = {entry: i for i, entry in enumerate(analyzer.pattern_table)}
+    clauses = {}
+    patterns = {}
+    compact = {'format': 'compact'}
+
+    for key, value in results.items():
+        if not (isinstance(value, dict) and 'matches' in value):
+            compact[key] = value
+            continue
+
+        matches = []
+        for match in value['matches']:
+            clause_id = match['clause_id']
+            clauses.setdefault(str(clause_id), match['text'])
+            extra = {field: v for field, v in match.items() if field not in SPAN_FIELDS}
+
+            keyword = match['matched_keyword']
+            start = match.get('keyword_start')
+            if start is None:
+                # Results from before keyword_start: the first occurrence is the best guess
+                start = match['text'].find(keyword)
+            if start < 0 or not match['text'].startswith(keyword, start):
+                if 'keyword_start' in match:
+                    extra['keyword_start'] = match['keyword_start']
+                start = end = None
+                extra['matched_keyword'] = keyword
+            else:
+                end = start + len(keyword)
+
+            pattern_id = pattern_ids.get((key, match['pattern']))
+            if pattern_id is None:
+                # Results from another rule version
+                extra['pattern'] = match['pattern']
+            else:
+                patterns[str(pattern_id)] = match['pattern']
+            if match.get('position', clause_id) != clause_id:
+                extra['position'] = match['position']
+
+            entry = [clause_id, start, end, pattern_id]
+            if extra:
+                entry.append(extra)
+            matches.append(entry)
+
+        compact[key] = dict(value, matches=matches)
+
+    compact['clauses'] = clauses
+    compact['patterns'] = patterns
+    return compact
+
+
+def expand_results(compact):
+    """Undo compact_results()"""
+    clauses = compact['clauses']
+    patterns = compact['patterns']
+    results = {}
+    for key, value in compact.items():
+        if key in ('format', 'clauses', 'patterns'):
+            continue
+        if not (isinstance(value, dict) and 'matches' in value):
+            results[key] = value
+            continue
+
+        matches = []
+        for clause_id, start, end, pattern_id, *rest in value['matches']:
+            extra = dict(rest[0]) if rest else {}
+            text = clauses[str(clause_id)]
+            match = {
+                'clause_id': clause_id,
+                'text': text,
+                'matched_keyword': extra.pop('matched_keyword', None) if start is None else text[start:end],
+                'position': extra.pop('position', clause_id),
+                'pattern': extra.pop('pattern', None) if pattern_id is None else patterns[str(pattern_id)]
+            }
+            if start is not None:
+                match['keyword_start'] = start
+            match.update(extra)
+            matches.append(match)
+        results[key] = dict(value, matches=matches)
+    return results
+
+
+def encode(payload, use_msgpack=False, use_gzip=False):
+    """Serialize a response body; returns (body bytes, headers)"""
+    if use_msgpack and msgpack is not None:
+        body = msgpack.packb(payload, use_bin_type=True)
+        content_type = 'application/msgpack'
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        content_type = 'application/json'
+
+    headers = {'Content-Type': content_type, 'Vary': 'Accept, Accept-Encoding'}
+    if use_gzip and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Canonical form of a policy for cache keys.
+
+    Only changes that can't affect clause splitting or matching: unicode NFC,
+    CRLF -> LF and surrounding whitespace.
+    """
+    text = unicodedata.normalize('NFC', text)
+    return text.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def fingerprint(*parts):
+    """Short stable hash of anything JSON-serializable (pattern sets, prompts, model names)"""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def cache_key(text, *versions):
+    """Content address for a normalized policy plus the versions that produced its result"""
+    digest = hashlib.sha256()
+    digest.update(normalize_text(text).encode('utf-8'))
+    for version in versions:
+        digest.update(b'\0')
+        digest.update(str(version).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed store that survives restarts and is shared by all workers"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            self._conn.commit()
+
+    def get(self, key, ttl):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM results WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if ttl is not None and time.time() - created > ttl:
+            self.delete(key)
+            return None
+        return json.loads(value), created
+
+    def set(self, key, value, created):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)',
+                (key, json.dumps(value), created)
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def purge_expired(self, ttl):
+        with self._lock:
+            self._conn.execute('DELETE FROM results WHERE created < ?', (time.time() - ttl,))
+            self._conn.commit()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional SQLite) result cache with single-flight.
+
+    Concurrent requests for the same key wait on one computation instead of
+    each running it. Cached values are shared between callers, treat them as
+    read-only.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (value, created)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._disk = _DiskTier(db_path) if db_path else None
+        if self._disk and ttl is not None:
+            self._disk.purge_expired(ttl)
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0}
+
+    @classmethod
+    def from_env(cls, prefix='RESULT_CACHE'):
+        """Build from e.g. RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_DB"""
+        return cls(
+            max_entries=int(os.getenv(f'{prefix}_SIZE', 1024)),
+            ttl=float(os.getenv(f'{prefix}_TTL', 3600)),
+            db_path=os.getenv(f'{prefix}_DB') or None,
+        )
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[0]
+                del self._memory[key]
+
+        if self._disk:
+            entry = self._disk.get(key, self.ttl)
+            if entry is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, *entry)
+                return entry[0]
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+        if self._disk:
+            self._disk.set(key, value, created)
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """Return the cached value or run compute() once for all concurrent callers.
+
+        Results are stored unless they are None or cacheable(result) is false.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            if flight.value is not None and (cacheable is None or cacheable(flight.value)):
+                self.set(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def get_or_compute_async(self, key, compute, cacheable=None):
+        """Async variant: compute is a coroutine function, waiters share its result"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._async_inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = future
+        try:
+            value = await compute()
+            if value is not None and (cacheable is None or cacheable(value)):
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't let asyncio log it as unretrieved
+            future.exception()
+            raise
+        finally:
+            del self._async_inflight[key]
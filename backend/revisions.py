@@ -0,0 +1,142 @@
+import re
+
+from similarity import hamming
+
+
+# Two clause versions at most this many SimHash bits apart count as "modified"
+MAX_MODIFIED_DISTANCE = 12
+
+SIMHASH_RE = re.compile(r'[0-9a-f]{1,16}')
+
+
+class RevisionError(ValueError):
+    """A client-supplied 'previous' result that isn't shaped like an analyze_revision() result"""
+
+
+def _is_index(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _is_hit(hit):
+    # [pattern index, matched text, offset in the clause]; indexes from before offsets have two
+    return (isinstance(hit, list) and len(hit) in (2, 3) and _is_index(hit[0])
+            and isinstance(hit[1], str) and (len(hit) == 2 or _is_index(hit[2])))
+
+
+def check_clause_index(index, patterns=None):
+    """Raise RevisionError unless index is a clause index that can be diffed against.
+
+    With patterns (the analyzer's, when the index was made with the same
+    rules) every hit must also name one of its categories and patterns,
+    because those hits are reused without a rescan.
+    """
+    if not isinstance(index, dict) or not isinstance(index.get('version'), str) \
+            or not isinstance(index.get('clauses'), list):
+        raise RevisionError('previous.clause_index needs a "version" string and a "clauses" list')
+    for i, entry in enumerate(index['clauses']):
+        where = f'previous.clause_index.clauses[{i}]'
+        if not isinstance(entry, dict) or not isinstance(entry.get('hash'), str) \
+                or not isinstance(entry.get('simhash'), str) or not SIMHASH_RE.fullmatch(entry['simhash']) \
+                or not isinstance(entry.get('hits'), dict):
+            raise RevisionError(f'{where} needs a "hash", a hex "simhash" and a "hits" object')
+        for category, hit in entry['hits'].items():
+            if not _is_hit(hit):
+                raise RevisionError(f'{where}.hits.{category} must be [pattern index, matched text, offset]')
+            if patterns is not None and (category not in patterns
+                                         or not 0 <= hit[0] < len(patterns[category]['patterns'])):
+                raise RevisionError(f'{where}.hits.{category} names a pattern these rules don\'t have')
+
+
+def check_matches(previous, category, clause_count):
+    """Raise RevisionError unless previous[category]['matches'] point at clauses of its clause index"""
+    section = previous[category]
+    matches = section.get('matches') if isinstance(section, dict) else None
+    if not isinstance(matches, list):
+        raise RevisionError(f'previous.{category} needs a "matches" list')
+    for i, match in enumerate(matches):
+        clause_id = match.get('clause_id') if isinstance(match, dict) else None
+        if not isinstance(clause_id, int) or isinstance(clause_id, bool) or not 0 <= clause_id < clause_count:
+            raise RevisionError(f'previous.{category}.matches[{i}].clause_id must be a clause of previous.clause_index')
+
+
+def align_clauses(old_clauses, new_clauses, max_distance=MAX_MODIFIED_DISTANCE):
+    """Pair the clauses of two clause indexes.
+
+    Identical clauses are paired by content hash, then remaining new clauses
+    are paired with the nearest remaining old clause by SimHash distance.
+    Returns {new_id: (old_id, 'unchanged' | 'modified')} plus the set of old
+    ids that were paired.
+    """
+    by_hash = {}
+    for old_id, entry in enumerate(old_clauses):
+        by_hash.setdefault(entry['hash'], []).append(old_id)
+
+    pairs = {}
+    used = set()
+    for new_id, entry in enumerate(new_clauses):
+        candidates = by_hash.get(entry['hash'])
+        if candidates:
+            old_id = candidates.pop(0)
+            pairs[new_id] = (old_id, 'unchanged')
+            used.add(old_id)
+
+    unpaired_old = [i for i in range(len(old_clauses)) if i not in used]
+    for new_id, entry in enumerate(new_clauses):
+        if new_id in pairs or not unpaired_old:
+            continue
+        sig = int(entry['simhash'], 16)
+        distance, old_id = min(
+            (hamming(sig, int(old_clauses[i]['simhash'], 16)), i) for i in unpaired_old
+        )
+        if distance <= max_distance:
+            pairs[new_id] = (old_id, 'modified')
+            used.add(old_id)
+            unpaired_old.remove(old_id)
+
+    return pairs, used
+
+
+def diff_revisions(old_index, new_index):
+    """Which clauses changed between two analyses and which risk findings came and went"""
+    old_clauses = old_index['clauses'] if old_index else []
+    new_clauses = new_index['clauses']
+    pairs, used = align_clauses(old_clauses, new_clauses)
+
+    old_findings = {(cat, e['hash']) for e in old_clauses for cat in e['hits']}
+    new_findings = {(cat, e['hash']) for e in new_clauses for cat in e['hits']}
+    old_for_new = {new_id: old_id for new_id, (old_id, _) in pairs.items()}
+    new_for_old = {old_id: new_id for new_id, old_id in old_for_new.items()}
+
+    appeared = []
+    for new_id, entry in enumerate(new_clauses):
+        for category, (_pattern_idx, keyword, *_offset) in entry['hits'].items():
+            if (category, entry['hash']) not in old_findings:
+                appeared.append({
+                    'category': category,
+                    'clause_id': new_id,
+                    'previous_clause_id': old_for_new.get(new_id),
+                    'matched_keyword': keyword
+                })
+
+    disappeared = []
+    for old_id, entry in enumerate(old_clauses):
+        for category, (_pattern_idx, keyword, *_offset) in entry['hits'].items():
+            if (category, entry['hash']) not in new_findings:
+                disappeared.append({
+                    'category': category,
+                    'previous_clause_id': old_id,
+                    'clause_id': new_for_old.get(old_id),
+                    'matched_keyword': keyword
+                })
+
+    kinds = [kind for _, kind in pairs.values()]
+    return {
+        'clauses': {
+            'unchanged': kinds.count('unchanged'),
+            'modified': kinds.count('modified'),
+            'added': len(new_clauses) - len(pairs),
+            'removed': len(old_clauses) - len(used)
+        },
+        'appeared': appeared,
+        'disappeared': disappeared
+    }
@@ -1,119 +1,228 @@
-import re
-        
+import hashlib
+import json
+
+from hit_matrix import HitMatrix
+from metrics import metrics
+from pattern_compiler import CompiledPatternSet
+from revisions import RevisionError, check_clause_index, diff_revisions
+from rules import load_rules, validate_rules
+from scoring import category_score, overall_score, risk_level
+from segmenter import RULES as SEGMENTER_RULES, clause_spans, folded, stream_clause_spans
+from similarity import clause_hash, simhash
+
+
 class RiskAnalyzer:
-    def __init__(self):
+    def __init__(self, match_budget=None, rules=None):
+        # Optional cap on how many characters of a single clause get scanned.
+        # Clauses longer than this are flagged as truncated in the results.
+        self.match_budget = match_budget
+        
+        # Categories, patterns, weights and score thresholds come from the rule
+        # file (risk_rules.json); rule_registry.py swaps in a new RiskAnalyzer
+        # when it changes
+        rules = validate_rules(rules) if rules is not None else load_rules()
         self.patterns = {
-            'data_resale': {
-                'patterns': [
-                    # Direct selling
-                    r'\b(sell|sold|selling|monetize|monetization)\s+.{0,30}\b(data|information|personal)\b',
-                    
-                    # Ad-based monetization (NEW!)
-                    r'\b(personali[sz]e|target|select|show|serve).*\bads?\b',
-                    r'\badvert(is|iz)ers?.*\b(receive|get|access).*\b(information|data|reports?|insights?)\b',
-                    r'\bprovide.*\b(partners?|advertisers?).*\b(analytics|insights?|reports?|information|data)\b',
-                    r'\bshare.*\b(advertisers?|partners?).*\b(personali[sz]|target|measure)',
-                    
-                    # Business purposes sharing (NEW!)
-                    r'\bshare.*\b(third[\s-]?part(y|ies)|partners?|affiliates?).*\b(business\s+purposes?|commercial|marketing)',
-                ],
-                'weight': 25
-            },
-            
-            'vague_language': {
-                'patterns': [
-                    # Original patterns
-                    r'\bat\s+our\s+discretion\b',
-                    r'\bas\s+we\s+deem\s+(appropriate|necessary|fit)\b',
-                    
-                    # New patterns for sophisticated vagueness
-                    r'\blegitimate\s+(business\s+)?interests?\b',
-                    r'\b(necessary|appropriate|reasonable)\s+purposes?\b',
-                    r'\bas\s+permitted\s+by\s+(applicable\s+)?law\b',
-                    r'\bfor\s+the\s+purposes?\s+(described|outlined|set\s+out)\s+(below|in\s+this)',
-                    r'\bimprove.*\bservices?\b(?!.*\bspecifically\b)',  # Vague unless specific
-                    r'\brelated\s+services?\b',
-                    r'\bother\s+purposes?\b',
-                ],
-                'weight': 20
-            },
-            
-            # Keep biometric and retention as-is
-            'biometric': {
-                'patterns': [
-                    r'\b(biometric|fingerprint|face\s+recognition|facial\s+recognition|voiceprint|faceprint)\b'
-                ],
-                'weight': 30
-            },
-            
-            'indefinite_retention': {
-                'patterns': [
-                    r'\b(indefinitely|permanently|as\s+long\s+as\s+necessary|for\s+as\s+long\s+as)\b'
-                ],
-                'weight': 20
-            }
+            category: {'patterns': config['patterns'], 'weight': config['weight']}
+            for category, config in rules['categories'].items()
         }
+        self.scoring = rules['scoring']
+        
+        # Compile every pattern once instead of on each re.search call.
+        # Unbounded .* gaps are rewritten into bounded windows here.
+        self.engine = CompiledPatternSet(self.patterns)
+        
+        # Numbered (category, pattern) pairs; compact results refer to patterns by index
+        self.pattern_table = [
+            (category, pattern) for category, config in self.patterns.items() for pattern in config['patterns']
+        ]
+        
+        # Identifies this rule set; results from another version can't be reused
+        self.version = hashlib.sha256(
+            json.dumps([self.patterns, self.scoring, self.match_budget, SEGMENTER_RULES], sort_keys=True).encode('utf-8')
+        ).hexdigest()[:16]
+        
+        # Stamped into every result: the file's label, plus the hash in case it wasn't bumped
+        self.rules_version = f"{rules['version']}+{self.version}"
+        
+        # Same, minus the weights: hit matrices stay valid while weights are tuned
+        self.patterns_version = hashlib.sha256(
+            json.dumps([self.pattern_table, self.match_budget]).encode('utf-8')
+        ).hexdigest()[:16]
     
     def analyze(self, policy_text):
-        clauses = [c.strip() for c in policy_text.split('\n\n') if len(c.strip()) > 50]
+        return self._analyze_clauses(self._clauses(policy_text))
+    
+    def _clauses(self, policy_text):
+        """(policy_text, start, end) per clause; see segmenter.py"""
+        with metrics.timer('clause_split'):
+            return [(policy_text, start, end) for start, end in clause_spans(policy_text)]
+    
+    def analyze_with_hits(self, policy_text):
+        """analyze() plus the document's HitMatrix, for rescoring under other weights later.
+
+        Every pattern is tried on every clause (not just up to the first hit
+        per category), so this costs a little more than analyze(); the
+        results are the same.
+        """
+        matrix = HitMatrix(self.patterns_version)
+        return self._analyze_clauses(self._clauses(policy_text), matrix=matrix), matrix
+    
+    def analyze_stream(self, chunks):
+        """Same as analyze() but over an iterable of text chunks.
+
+        Clauses are split off as the chunks are read (see
+        segmenter.stream_clause_spans) and only the running counts plus the
+        first 5 matches per category are kept, so the whole document never
+        has to be in memory: only the clauses still open, and with
+        match_budget set, at most about max(match_budget, 2000) chars of any
+        one clause.
+        """
+        max_clause_chars = None
+        if self.match_budget is not None:
+            max_clause_chars = max(self.match_budget, 400) + 1
+        return self._analyze_clauses(stream_clause_spans(chunks, max_clause_chars))
+    
+    def analyze_revision(self, policy_text, previous=None):
+        """Analyze a new version of a policy, reusing a previous analyze_revision() result.
+
+        Clauses whose content hash is unchanged keep their previous matches
+        without a regex pass, and the result carries a 'clause_index' for the
+        next revision plus a 'revision' diff of the findings that appeared or
+        disappeared. Raises RevisionError if previous is malformed.
+        """
+        if previous is not None and not isinstance(previous, dict):
+            raise RevisionError('previous must be an earlier /analyze/revision result')
+        previous_index = (previous or {}).get('clause_index')
+        reuse = {}
+        if previous_index is not None:
+            same_rules = isinstance(previous_index, dict) and previous_index.get('version') == self.version
+            check_clause_index(previous_index, self.patterns if same_rules else None)
+            if same_rules:
+                reuse = {entry['hash']: entry for entry in previous_index['clauses']}
         
-        results = {}
+        clauses = self._clauses(policy_text)
         
-        for category, config in self.patterns.items():
-            matches = []
+        index = []
+        results = self._analyze_clauses(clauses, reuse, index)
+        results['clause_index'] = {'version': self.version, 'clauses': index}
+        results['revision'] = diff_revisions(previous_index, results['clause_index'])
+        results['revision']['rescanned'] = sum(1 for entry in index if entry['hash'] not in reuse)
+        return results
+    
+    def _analyze_clauses(self, clauses, reuse=None, index=None, matrix=None):
+        top_matches = {category: [] for category in self.patterns}
+        total_matches = {category: 0 for category in self.patterns}
+        truncated_clauses = 0
+        
+        # Per-category regex time and per-pattern hits, only if someone is looking
+        timings = {} if metrics.active() else None
+        pattern_hits = {}
+        
+        if matrix is not None:
+            first_id = {}
+            for pattern_id, (category, _pattern) in enumerate(self.pattern_table):
+                first_id.setdefault(category, pattern_id)
+        
+        # Clauses are spans of a shared text; it is casefolded once for every clause in it
+        text = lowered = None
+        
+        # Scan each clause once for all categories
+        for i, (clause_text, start, end) in enumerate(clauses):
+            if clause_text is not text:
+                text = clause_text
+                lowered = folded(text)
             
-            for i, clause in enumerate(clauses):
-                # Check ALL patterns for this category
-                for pattern in config['patterns']:
-                    if re.search(pattern, clause, re.IGNORECASE):
-                        match_obj = re.search(pattern, clause, re.IGNORECASE)
-                        matched_text = match_obj.group(0) if match_obj else ''
-                        
-                        matches.append({
-                            'clause_id': i,
-                            'text': clause[:400],
-                            'matched_keyword': matched_text,
-                            'position': i,
-                            'pattern': pattern  # Track which pattern matched
-                        })
-                        break  # Don't match same clause multiple times
+            truncated = self.match_budget is not None and end - start > self.match_budget
+            if truncated:
+                truncated_clauses += 1
+            scan_end = start + self.match_budget if truncated else end
             
-            # Calculate score
-            if len(matches) == 0:
-                score = 0
-            elif len(matches) == 1:
-                score = config['weight']
-            elif len(matches) == 2:
-                score = min(config['weight'] * 2, 70)
+            # Hit offsets are into text, except index entries' which are into the clause
+            base = 0
+            if matrix is not None:
+                # All hits go in the matrix; the first in list order is the one scan() would return
+                all_hits = self.engine.scan_all(text, start, scan_end, timings, lowered)
+                hits = {}
+                for category, found in all_hits.items():
+                    for pattern_idx, hit_start, hit_end in found:
+                        matrix.add(i, first_id[category] + pattern_idx, hit_start - start, hit_end - start)
+                    pattern_idx, hit_start, hit_end = found[0]
+                    hits[category] = (pattern_idx, text[hit_start:hit_end], hit_start)
+                matrix.clauses = i + 1
+            elif index is None:
+                hits = self.engine.scan(text, start, scan_end, timings, lowered)
             else:
-                score = min(config['weight'] * len(matches), 100)
+                clause = text[start:end]
+                h = clause_hash(clause)
+                entry = reuse.get(h) if reuse else None
+                if entry is None:
+                    hits = self.engine.scan(text, start, scan_end, timings, lowered)
+                    entry = {
+                        'hash': h,
+                        'simhash': format(simhash(clause), '016x'),
+                        'hits': {category: [pattern_idx, matched_text, hit_start - start]
+                                 for category, (pattern_idx, matched_text, hit_start) in hits.items()}
+                    }
+                hits = entry['hits']
+                base = start
+                index.append(entry)
+            
+            for category, hit in hits.items():
+                pattern_idx, matched_text = hit[0], hit[1]
+                total_matches[category] += 1
+                if timings is not None:
+                    pattern_hits[category, pattern_idx] = pattern_hits.get((category, pattern_idx), 0) + 1
+                if len(top_matches[category]) >= 5:
+                    continue
+                
+                match = {
+                    'clause_id': i,
+                    'text': text[start:min(end, start + 400)],
+                    'matched_keyword': matched_text,
+                    'position': i,
+                    'pattern': self.patterns[category]['patterns'][pattern_idx]  # Track which pattern matched
+                }
+                # Where matched_keyword starts in the clause; a reused entry's may be
+                # off (clause_hash ignores whitespace) or missing (older indexes)
+                if len(hit) > 2 and text.startswith(matched_text, base + hit[2]):
+                    match['keyword_start'] = base + hit[2] - start
+                if truncated:
+                    match['truncated'] = True
+                top_matches[category].append(match)
+        
+        if timings is not None:
+            for category, seconds in timings.items():
+                metrics.observe('regex', seconds, category=category)
+            for (category, pattern_idx), count in pattern_hits.items():
+                metrics.inc('pattern_hits', count, category=category, pattern=pattern_idx)
+        
+        results = {}
+        
+        for category, config in self.patterns.items():
+            count = total_matches[category]
+            score = category_score(count, config['weight'], self.scoring)
             
             results[category] = {
                 'score': score,
                 'risk_level': self._get_risk_level(score),
-                'matches': matches[:5],
-                'total_matches': len(matches)
+                'matches': top_matches[category],
+                'total_matches': count
             }
         
         # Calculate overall score
-        total_weight = sum(config['weight'] for config in self.patterns.values())
-        weighted_sum = sum(
-            results[cat]['score'] * self.patterns[cat]['weight'] 
-            for cat in self.patterns.keys()
-        )
-        overall_score = weighted_sum / total_weight
+        weights = {category: config['weight'] for category, config in self.patterns.items()}
+        overall = overall_score({category: results[category]['score'] for category in weights}, weights)
         
         results['overall'] = {
-            'score': round(overall_score, 1),
-            'risk_level': self._get_risk_level(overall_score)
+            'score': round(overall, 1),
+            'risk_level': self._get_risk_level(overall),
+            'rules_version': self.rules_version
         }
         
+        if self.match_budget is not None:
+            results['overall']['truncated_clauses'] = truncated_clauses
+        
         return results
     
     def _get_risk_level(self, score):
-        if score < 30:
-            return 'low'
-        elif score < 60:
-            return 'medium'
-        else:
-            return 'high'
\ No newline at end of file
+        return risk_level(score, self.scoring['thresholds'])
\ No newline at end of file
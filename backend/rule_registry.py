@@ -0,0 +1,216 @@
+"""The live RiskAnalyzer, swapped for a new one when the rule file changes.
+
+A reload reads and validates the rule file, compiles a new RiskAnalyzer,
+times it against the current one on the last few policies this worker
+analyzed, and then replaces `registry.analyzer` in one assignment. Request
+handlers read registry.analyzer once and use that object to the end, so a
+request already running finishes on the rules it started with and the next
+one gets the new rules. Nothing waits on a lock.
+
+Each worker polls the file's mtime on a background thread, so editing
+risk_rules.json reaches every gunicorn worker without a restart. POST
+/rules/reload does the same in the worker that answers it and returns the
+report.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from risk_analyzer import RiskAnalyzer
+from rules import RuleError, load_rules, rules_path
+
+
+# Seconds between checks of the rule file's mtime (0 turns the watcher off)
+WATCH_SECONDS = 5
+# Recent policies kept to benchmark a new rule set against the current one,
+# each cut to its first BENCH_SAMPLE_CHARS and BENCH_CHARS in all
+BENCH_SAMPLES = 16
+BENCH_SAMPLE_CHARS = 50000
+BENCH_CHARS = 400000
+BENCH_REPEAT = 3
+# Reload reports kept for GET /rules
+HISTORY = 10
+
+
+def _best_ms(analyzer, texts):
+    best = float('inf')
+    for _ in range(BENCH_REPEAT):
+        start = time.perf_counter()
+        for text in texts:
+            analyzer.analyze(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def compare(old, new, texts):
+    """Time and score deltas of new against old over texts"""
+    if not texts:
+        return None
+    old_ms = _best_ms(old, texts)
+    new_ms = _best_ms(new, texts)
+    categories = {}
+    level_changes = 0
+    for text in texts:
+        before = old.analyze(text)
+        after = new.analyze(text)
+        level_changes += before['overall']['risk_level'] != after['overall']['risk_level']
+        for category in set(old.patterns) | set(new.patterns):
+            delta = categories.setdefault(category, {'changed_docs': 0, 'score_delta': 0})
+            old_score = before[category]['score'] if category in before else 0
+            new_score = after[category]['score'] if category in after else 0
+            delta['changed_docs'] += old_score != new_score
+            delta['score_delta'] += new_score - old_score
+    for delta in categories.values():
+        delta['score_delta'] = round(delta['score_delta'] / len(texts), 1)
+    return {
+        'documents': len(texts),
+        'chars': sum(len(text) for text in texts),
+        'previous_ms': round(old_ms, 2),
+        'ms': round(new_ms, 2),
+        'change_pct': round((new_ms - old_ms) / old_ms * 100, 1) if old_ms else None,
+        'risk_level_changes': level_changes,
+        'categories': categories,
+        'added_categories': sorted(set(new.patterns) - set(old.patterns)),
+        'removed_categories': sorted(set(old.patterns) - set(new.patterns))
+    }
+
+
+class RuleRegistry:
+    """Holds the current RiskAnalyzer for a rule file and reloads it"""
+
+    def __init__(self, path=None, match_budget=None, watch_seconds=WATCH_SECONDS):
+        self.path = path or rules_path()
+        self.watch_seconds = watch_seconds
+        self.stats = {'reloads': 0, 'failed_reloads': 0, 'swaps': 0}
+        self.history = deque(maxlen=HISTORY)
+        self._samples = deque()
+        self._sample_chars = 0
+        self._samples_lock = threading.Lock()
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._mtime = self._file_mtime()
+        # A broken rule file at startup is an error, not something to run without
+        self.analyzer = RiskAnalyzer(match_budget, rules=load_rules(self.path))
+        self.loaded_at = time.time()
+
+    @classmethod
+    def from_env(cls):
+        return cls(watch_seconds=float(os.getenv('RULES_WATCH_SECONDS', WATCH_SECONDS)))
+
+    def on_swap(self, fn):
+        """Call fn(new_analyzer) after every swap"""
+        self._listeners.append(fn)
+
+    def remember(self, text):
+        """Keep (the start of) a policy seen in traffic as benchmark material for the next reload"""
+        if len(text) > BENCH_SAMPLE_CHARS:
+            # Whole lines, so the last clause isn't cut mid-word
+            cut = text.rfind('\n', 0, BENCH_SAMPLE_CHARS)
+            text = text[:cut if cut > 0 else BENCH_SAMPLE_CHARS]
+        with self._samples_lock:
+            self._samples.append(text)
+            self._sample_chars += len(text)
+            while len(self._samples) > BENCH_SAMPLES or self._sample_chars > BENCH_CHARS:
+                self._sample_chars -= len(self._samples.popleft())
+
+    def samples(self):
+        """The benchmark material, copied so remember() can run meanwhile"""
+        with self._samples_lock:
+            return list(self._samples)
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, dry_run=False):
+        """Load, validate and compile the rule file, benchmark it and swap it in.
+
+        Returns a report with the versions, compile time and benchmark
+        deltas. Raises RuleError (the current rules stay) if the file is
+        invalid. With dry_run, or if the rules didn't change, nothing is
+        swapped.
+        """
+        with self._reload_lock:
+            self.stats['reloads'] += 1
+            mtime = self._file_mtime()
+            old = self.analyzer
+            start = time.perf_counter()
+            try:
+                new = RiskAnalyzer(old.match_budget, rules=load_rules(self.path))
+            except Exception as e:
+                # Not retried by the watcher until the file changes again
+                self.stats['failed_reloads'] += 1
+                self._mtime = mtime
+                if isinstance(e, RuleError):
+                    raise
+                raise RuleError([f'Could not compile the rules: {e}'])
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            report = {
+                'previous_version': old.rules_version,
+                'version': new.rules_version,
+                'changed': new.version != old.version,
+                'compile_ms': round(compile_ms, 2),
+                'patterns': len(new.pattern_table),
+                'swapped': False
+            }
+            if report['changed']:
+                report['benchmark'] = compare(old, new, self.samples())
+                if not dry_run:
+                    # One reference assignment: requests holding `old` finish on it
+                    self.analyzer = new
+                    self.loaded_at = time.time()
+                    self.stats['swaps'] += 1
+                    report['swapped'] = True
+                    for fn in self._listeners:
+                        fn(new)
+            if not dry_run:
+                self._mtime = mtime
+            report['at'] = time.time()
+            self.history.append(report)
+            return report
+
+    def watch(self):
+        """Reload on a background thread whenever the rule file's mtime changes"""
+        if self.watch_seconds > 0:
+            threading.Thread(target=self._watch, name='rule-watcher', daemon=True).start()
+        return self
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_seconds)
+            if self._file_mtime() == self._mtime:
+                continue
+            try:
+                report = self.reload()
+                if report['swapped']:
+                    print(f"🔁 Rules {report['previous_version']} -> {report['version']} "
+                          f"(compiled in {report['compile_ms']} ms)")
+            except RuleError as e:
+                print(f"⚠️ Keeping rules {self.analyzer.rules_version}: {e}")
+
+    def describe(self):
+        """Current rule set for GET /rules"""
+        analyzer = self.analyzer
+        return {
+            'version': analyzer.rules_version,
+            'path': self.path,
+            'loaded_at': self.loaded_at,
+            'categories': {
+                category: {'weight': config['weight'], 'patterns': len(config['patterns'])}
+                for category, config in analyzer.patterns.items()
+            },
+            'scoring': analyzer.scoring,
+            'history': list(self.history)
+        }
+
+    def summary(self):
+        return dict(
+            self.stats,
+            categories=len(self.analyzer.patterns),
+            patterns=len(self.analyzer.pattern_table),
+            last_compile_ms=self.history[-1]['compile_ms'] if self.history else 0
+        )
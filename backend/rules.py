@@ -0,0 +1,123 @@
+"""The risk rule file: categories, their patterns and weights, and the scoring caps/thresholds.
+
+risk_rules.json next to this file unless RISK_RULES points elsewhere:
+
+    {
+      "version": "1.0.0",
+      "categories": {
+        "biometric": {"description": "...", "weight": 30, "patterns": ["\\\\bbiometric\\\\b", ...]},
+        ...
+      },
+      "scoring": {"pair_cap": 70, "max_score": 100, "thresholds": [30, 60]}
+    }
+
+"version" is a label for people; results carry it next to a hash of the
+rules (see RiskAnalyzer.rules_version). "scoring" may be left out.
+"""
+import json
+import os
+import re
+
+from pattern_compiler import UnsafePatternError, make_safe
+from scoring import DEFAULT_SCORING
+
+
+BUNDLED_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_rules.json')
+
+CATEGORY_NAME_RE = re.compile(r'[a-z][a-z0-9_]*')
+CATEGORY_FIELDS = {'description', 'weight', 'patterns'}
+
+
+class RuleError(ValueError):
+    """A rule file that can't be used; .problems lists every reason"""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('Invalid rules: ' + '; '.join(problems))
+
+
+def rules_path():
+    return os.getenv('RISK_RULES') or BUNDLED_RULES
+
+
+def load_rules(path=None):
+    """Read and validate a rule file (default: rules_path())"""
+    path = path or rules_path()
+    try:
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuleError([f'{path}: {e}'])
+    return validate_rules(rules)
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_rules(rules):
+    """rules with scoring filled in; raises RuleError listing everything wrong"""
+    if not isinstance(rules, dict):
+        raise RuleError(['rules must be a JSON object'])
+    problems = []
+
+    version = rules.get('version')
+    if not isinstance(version, str) or not version.strip():
+        problems.append('"version" must be a non-empty string')
+
+    categories = rules.get('categories')
+    if not isinstance(categories, dict) or not categories:
+        problems.append('"categories" must be a non-empty object')
+        categories = {}
+    for name, category in categories.items():
+        if not CATEGORY_NAME_RE.fullmatch(name):
+            problems.append(f'{name}: category names are lowercase letters, digits and _')
+        if not isinstance(category, dict):
+            problems.append(f'{name}: must be an object')
+            continue
+        unknown = set(category) - CATEGORY_FIELDS
+        if unknown:
+            problems.append(f"{name}: unknown fields {', '.join(sorted(unknown))}")
+        if not _number(category.get('weight')) or category['weight'] <= 0:
+            problems.append(f'{name}: "weight" must be a positive number')
+        patterns = category.get('patterns')
+        if not isinstance(patterns, list) or not patterns:
+            problems.append(f'{name}: "patterns" must be a non-empty list')
+            continue
+        for i, pattern in enumerate(patterns):
+            if not isinstance(pattern, str) or not pattern:
+                problems.append(f'{name}.patterns[{i}]: must be a non-empty string')
+                continue
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                problems.append(f'{name}.patterns[{i}]: {e}')
+                continue
+            if compiled.match(''):
+                problems.append(f'{name}.patterns[{i}]: matches the empty string')
+                continue
+            # What RiskAnalyzer will refuse to compile
+            try:
+                make_safe(pattern)
+            except UnsafePatternError as e:
+                problems.append(f'{name}.patterns[{i}]: {e}')
+
+    overrides = rules.get('scoring') or {}
+    if not isinstance(overrides, dict):
+        problems.append('"scoring" must be an object')
+        overrides = {}
+    scoring = dict(DEFAULT_SCORING)
+    scoring.update(overrides)
+    unknown = set(scoring) - set(DEFAULT_SCORING)
+    if unknown:
+        problems.append(f"scoring: unknown fields {', '.join(sorted(unknown))}")
+    if not (_number(scoring['pair_cap']) and _number(scoring['max_score']) and scoring['pair_cap'] <= scoring['max_score']):
+        problems.append('scoring: "pair_cap" and "max_score" must be numbers with pair_cap <= max_score')
+    thresholds = scoring['thresholds']
+    if not (isinstance(thresholds, list) and len(thresholds) == 2 and all(_number(t) for t in thresholds)
+            and thresholds[0] <= thresholds[1]):
+        problems.append('scoring: "thresholds" must be two ascending numbers')
+
+    if problems:
+        raise RuleError(problems)
+    return dict(rules, scoring=scoring)
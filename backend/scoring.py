@@ -0,0 +1,32 @@
+"""The score formula shared by RiskAnalyzer and hit-matrix rescoring"""
+
+
+# A category matched once scores its weight, twice at most pair_cap, more at most max_score.
+# Scores below thresholds[0] are 'low', below thresholds[1] 'medium', else 'high'.
+DEFAULT_SCORING = {'pair_cap': 70, 'max_score': 100, 'thresholds': [30, 60]}
+
+
+def category_score(count, weight, scoring=DEFAULT_SCORING):
+    if count == 0:
+        return 0
+    elif count == 1:
+        return weight
+    elif count == 2:
+        return min(weight * 2, scoring['pair_cap'])
+    else:
+        return min(weight * count, scoring['max_score'])
+
+
+def risk_level(score, thresholds=DEFAULT_SCORING['thresholds']):
+    if score < thresholds[0]:
+        return 'low'
+    elif score < thresholds[1]:
+        return 'medium'
+    else:
+        return 'high'
+
+
+def overall_score(scores, weights):
+    """Weighted average of the category scores"""
+    total_weight = sum(weights.values())
+    return sum(scores[category] * weight for category, weight in weights.items()) / total_weight
@@ -0,0 +1,193 @@
+"""Clause boundaries as (start, end) offsets into the original text.
+
+Both backends segment policies here, so a page's innerText (a line per
+paragraph) and pasted text (blank lines between paragraphs) come apart the
+same way. Nothing is copied: callers run their regexes with
+pattern.search(text, start, end) and only slice what they report.
+
+In one regex pass over the text:
+- a blank line always ends a clause
+- so does a line break, unless the next line starts in lowercase (a
+  hard-wrapped sentence carrying on); list items ("- ", "1. ", "(a) ", "b) ")
+  always start a new one
+- a piece of min_chars or fewer (a heading, a short bullet) joins the next
+  piece of its paragraph; one left at the end of a paragraph joins the
+  previous piece, or is dropped if it is the whole paragraph
+- a clause over max_chars is split into runs of whole sentences, so walls of
+  text without line breaks still give clause-sized pieces
+
+stream_clause_spans() gives the same clauses while a text is still being
+read, holding only the last few clauses in memory.
+"""
+import re
+
+
+MIN_CLAUSE_CHARS = 50
+MAX_CLAUSE_CHARS = 2000
+
+# Starts with a literal '\n' so the regex engine can jump from newline to newline
+BREAK_RE = re.compile(r'''
+    \n (?: (?P<blank> [^\S\n]* \n ) \s*                     # blank line(s): a new paragraph
+       | (?! [^\S\n]* [a-z] (?! [a-z]{0,3} [.)] \s ) ) \s*  # a line break, unless a wrapped sentence carries on
+       )
+''', re.VERBOSE)
+
+# Sentence end (closing quotes/brackets stay with it) before a capital or digit
+SENTENCE_END_RE = re.compile(r'[.!?](["\')\]]*)\s+(?=["\'(\[]*[A-Z0-9])')
+
+# Everything that decides where clauses start and end; part of the analyzers' cache versions
+RULES = [BREAK_RE.pattern, SENTENCE_END_RE.pattern, MIN_CLAUSE_CHARS, MAX_CLAUSE_CHARS]
+
+
+def _trim(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _sentence_runs(text, start, end, max_chars, min_chars):
+    """Split a span into runs of whole sentences of at most max_chars (a longer sentence stays whole)"""
+    runs = []
+    run_start = start
+    cut = None  # (end of the last sentence seen, start of the next)
+    for m in SENTENCE_END_RE.finditer(text, start, end):
+        if cut is not None and m.end(1) - run_start > max_chars and cut[0] - run_start > min_chars:
+            runs.append((run_start, cut[0]))
+            run_start = cut[1]
+        cut = (m.end(1), m.end())
+    if cut is not None and end - run_start > max_chars and cut[0] - run_start > min_chars:
+        runs.append((run_start, cut[0]))
+        run_start = cut[1]
+    if runs and end - run_start <= min_chars:
+        runs[-1] = (runs[-1][0], end)
+    else:
+        runs.append((run_start, end))
+    return runs
+
+
+def _fit(text, span, max_chars, min_chars):
+    start, end = span
+    if end - start > max_chars:
+        return _sentence_runs(text, start, end, max_chars, min_chars)
+    return (span,)
+
+
+def clause_spans(text, start=0, end=None, min_chars=MIN_CLAUSE_CHARS, max_chars=MAX_CLAUSE_CHARS):
+    """Yield (start, end) of each clause in text[start:end], trimmed of surrounding whitespace"""
+    if end is None:
+        end = len(text)
+    last = None     # previous clause of this paragraph, held back in case a short tail joins it
+    pending = None  # short pieces waiting to join the next one
+
+    def pieces():
+        piece_start = start
+        for m in BREAK_RE.finditer(text, start, end):
+            yield piece_start, m.start(), m.group('blank') is not None
+            piece_start = m.end()
+        yield piece_start, end, True
+
+    for piece_start, piece_end, ends_paragraph in pieces():
+        piece_start, piece_end = _trim(text, piece_start, piece_end)
+        if piece_start < piece_end:
+            if pending is not None:
+                piece_start = pending[0]
+            if piece_end - piece_start > min_chars:
+                if last is not None:
+                    yield from _fit(text, last, max_chars, min_chars)
+                last = (piece_start, piece_end)
+                pending = None
+            else:
+                pending = (piece_start, piece_end)
+
+        if ends_paragraph:
+            if pending is not None and last is not None:
+                last = (last[0], pending[1])
+            if last is not None:
+                yield from _fit(text, last, max_chars, min_chars)
+            last = pending = None
+
+
+# Read at least this much more before segmenting again (and as much as is held,
+# so re-segmenting the held tail stays linear overall)
+STREAM_READ_CHARS = 64 * 1024
+# Clauses at the end of what has been read that more text could still change
+STREAM_HOLD_BACK = 3
+# Text kept at the end of the buffer when the middle of a long clause is dropped
+STREAM_KEEP_CHARS = 64
+# A clause's middle is only dropped between two runs of this many letters/digits,
+# so no regex match can start in one part and end in the other
+SPLICE_CHARS = 8
+
+
+def _last_break_end(text, endpos):
+    """End of the last BREAK_RE or SENTENCE_END_RE match before endpos (0 if none)"""
+    last = 0
+    for regex in (BREAK_RE, SENTENCE_END_RE):
+        for m in regex.finditer(text, 0, endpos):
+            last = max(last, m.end())
+    return last
+
+
+def _drop_middle(text, keep_chars):
+    """text without the middle of a long unbroken last clause, or text itself.
+
+    Every clause, run and piece starts at the end of a BREAK_RE or
+    SENTENCE_END_RE match, so after the last one only distances decide
+    anything, and any distance past keep_chars (> max_chars) decides the
+    same way. The first keep_chars chars past it stay: that is all
+    RiskAnalyzer reads of a clause with a match budget.
+    """
+    cut_end = len(text) - STREAM_KEEP_CHARS
+    while cut_end > SPLICE_CHARS and not text[cut_end - SPLICE_CHARS:cut_end].isalnum():
+        cut_end -= 1
+    cut_start = _last_break_end(text, cut_end) + keep_chars
+    while cut_start < cut_end and not text[cut_start - SPLICE_CHARS:cut_start].isalnum():
+        cut_start += 1
+    if cut_end - cut_start < STREAM_KEEP_CHARS:
+        return text
+    return text[:cut_start] + text[cut_end:]
+
+
+def stream_clause_spans(chunks, max_clause_chars=None, min_chars=MIN_CLAUSE_CHARS, max_chars=MAX_CLAUSE_CHARS):
+    """Yield (text, start, end) for each clause of ''.join(chunks), reading chunks as they come.
+
+    The clauses are the same as clause_spans() on the whole text; `text` is
+    a buffer of what is currently held, so offsets are only valid for it.
+    Memory is bounded by the longest clause. With max_clause_chars, a
+    longer clause is kept to about its first max_clause_chars chars (its
+    end is still found), so memory is bounded outright.
+    """
+    keep_chars = max(max_chars, max_clause_chars) + 1 if max_clause_chars is not None else None
+    text = ''
+    parts = []
+    fresh = 0
+    
+    def segment(final):
+        nonlocal text
+        text += ''.join(parts)
+        parts.clear()
+        spans = list(clause_spans(text, min_chars=min_chars, max_chars=max_chars))
+        ready = spans if final else spans[:-STREAM_HOLD_BACK]
+        for start, end in ready:
+            yield text, start, end
+        if len(ready) < len(spans):
+            # A clause that was never emitted starts here, with nothing pending before it
+            text = text[spans[len(ready)][0]:]
+            if keep_chars is not None:
+                text = _drop_middle(text, keep_chars)
+    
+    for chunk in chunks:
+        parts.append(chunk)
+        fresh += len(chunk)
+        if fresh >= max(STREAM_READ_CHARS, len(text)):
+            yield from segment(final=False)
+            fresh = 0
+    yield from segment(final=True)
+
+
+def folded(text):
+    """text.casefold() if it keeps every offset (true for nearly all text), else None"""
+    lowered = text.casefold()
+    return lowered if len(lowered) == len(text) else None
@@ -0,0 +1,47 @@
+import hashlib
+import re
+import unicodedata
+
+
+WORD_RE = re.compile(r'\w+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_clause(text):
+    """Clause text in NFC with whitespace runs collapsed; case, punctuation and digits stay"""
+    return SPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def clause_hash(text):
+    """Exact content hash of a clause (whitespace insensitive)"""
+    normalized = normalize_clause(text)
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _shingles(text, sizes=(3,)):
+    words = WORD_RE.findall(text.lower())
+    shingles = []
+    for size in sizes:
+        if len(words) < size:
+            shingles.append(' '.join(words))
+        else:
+            shingles.extend(' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return [s for s in shingles if s]
+
+
+def simhash(text, bits=64, sizes=(3,)):
+    """64-bit SimHash over word shingles; near-duplicate texts differ in few bits.
+
+    3-shingles suit paragraph-sized text. For single sentences, words plus
+    word pairs (sizes=(1, 2)) are less sensitive to one inserted word.
+    """
+    counts = [0] * bits
+    for shingle in _shingles(text, sizes):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(bits):
+            counts[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if counts[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
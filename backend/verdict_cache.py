@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from similarity import clause_hash, hamming, simhash
+
+
+# Words + word pairs: clauses are short, 3-shingles would make one extra word
+# look like a different clause
+SHINGLE_SIZES = (1, 2)
+# SimHash bits (of 64) a near-duplicate may differ by. A one-word edit to a
+# long boilerplate clause is usually 4 bits or fewer, while a short clause
+# with "do not" added is only 6 or 7 bits off
+MAX_DISTANCE = 4
+
+# Words that flip or hedge a clause's meaning without moving its SimHash much:
+# "We do not sell your personal information" vs "We sell your personal information"
+POLARITY_RE = re.compile(
+    r'\b(?:not|no|never|none|nor|neither|without|except|unless|only'
+    r'|may|might|can|could|will|would|shall|should|must)\b'
+)
+
+
+def polarity(clause):
+    """The clause's negation and modal words in order; near-duplicates must agree on these"""
+    text = clause.lower().replace('\u2019', "'").replace("n't", ' not').replace('cannot', 'can not')
+    return ' '.join(POLARITY_RE.findall(text))
+
+
+class VerdictCache:
+    """Persistent per-clause LLM verdict store with near-duplicate lookup.
+
+    Verdicts are keyed by a namespace (fingerprint of prompt template + model)
+    and the clause's content hash. On an exact miss, clauses whose SimHash is
+    within max_distance bits are found through an LSH band index: the 64-bit
+    signature is split into max_distance + 1 bands, so any near-duplicate
+    shares at least one band exactly. A near-duplicate only counts if it has
+    the same negation and modal words (see polarity()). Least recently used
+    entries are evicted past max_entries.
+    """
+
+    def __init__(self, db_path=None, max_entries=50000, max_distance=MAX_DISTANCE, ttl=None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path or ':memory:', check_same_thread=False, timeout=10)
+        with self._lock:
+            if db_path:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    clause_hash TEXT NOT NULL,
+                    simhash TEXT NOT NULL,
+                    polarity TEXT,
+                    verdict TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    UNIQUE (namespace, clause_hash)
+                );
+                CREATE TABLE IF NOT EXISTS verdict_bands (
+                    verdict_id INTEGER NOT NULL REFERENCES verdicts (id) ON DELETE CASCADE,
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS verdict_bands_lookup ON verdict_bands (band, value);
+                CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used);
+            ''')
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(verdicts)')]
+            if 'polarity' not in columns:
+                # Stores from before polarity was kept: their rows only serve exact hits
+                self._conn.execute('ALTER TABLE verdicts ADD COLUMN polarity TEXT')
+            self._conn.execute('PRAGMA foreign_keys = ON')
+            self._conn.commit()
+        self.stats = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls, prefix='VERDICT_CACHE'):
+        """Build from e.g. VERDICT_CACHE_DB, VERDICT_CACHE_SIZE, VERDICT_CACHE_DISTANCE"""
+        ttl = os.getenv(f'{prefix}_TTL')
+        return cls(
+            db_path=os.getenv(f'{prefix}_DB') or None,
+            max_entries=int(os.getenv(f'{prefix}_SIZE', 50000)),
+            max_distance=int(os.getenv(f'{prefix}_DISTANCE', MAX_DISTANCE)),
+            ttl=float(ttl) if ttl else None,
+        )
+
+    def _band_values(self, signature):
+        mask = (1 << self.band_bits) - 1
+        return [(band, signature >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def _fresh(self, created):
+        return self.ttl is None or time.time() - created <= self.ttl
+
+    def get(self, namespace, clause):
+        """Cached verdict for this clause or a near-duplicate of it, else None"""
+        h = clause_hash(clause)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, verdict, created FROM verdicts WHERE namespace = ? AND clause_hash = ?',
+                (namespace, h)
+            ).fetchone()
+            if row and self._fresh(row[2]):
+                self.stats['exact_hits'] += 1
+                return self._touch(row[0], row[1])
+
+            signature = simhash(clause, sizes=SHINGLE_SIZES)
+            candidates = set()
+            for band, value in self._band_values(signature):
+                candidates.update(self._conn.execute(
+                    'SELECT v.id, v.simhash, v.verdict, v.created FROM verdict_bands b '
+                    'JOIN verdicts v ON v.id = b.verdict_id '
+                    'WHERE b.band = ? AND b.value = ? AND v.namespace = ? AND v.polarity = ?',
+                    (band, value, namespace, polarity(clause))
+                ).fetchall())
+
+            best = None
+            for verdict_id, other, verdict, created in candidates:
+                distance = hamming(signature, int(other, 16))
+                if distance <= self.max_distance and self._fresh(created):
+                    if best is None or distance < best[0]:
+                        best = (distance, verdict_id, verdict)
+            if best:
+                self.stats['near_hits'] += 1
+                return self._touch(best[1], best[2])
+
+            self.stats['misses'] += 1
+            return None
+
+    def _touch(self, verdict_id, verdict):
+        self._conn.execute('UPDATE verdicts SET last_used = ? WHERE id = ?', (time.time(), verdict_id))
+        self._conn.commit()
+        return json.loads(verdict)
+
+    def put(self, namespace, clause, verdict):
+        signature = simhash(clause, sizes=SHINGLE_SIZES)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR REPLACE INTO verdicts (namespace, clause_hash, simhash, polarity, verdict, created, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (namespace, clause_hash(clause), format(signature, '016x'), polarity(clause), json.dumps(verdict), now, now)
+            )
+            self._conn.executemany(
+                'INSERT INTO verdict_bands (verdict_id, band, value) VALUES (?, ?, ?)',
+                [(cursor.lastrowid, band, value) for band, value in self._band_values(signature)]
+            )
+            self.stats['stores'] += 1
+            if self.stats['stores'] % 100 == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Checked every 100 stores, so the table can briefly run a little over
+        count = self._conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Drop a tenth at a time so eviction doesn't run on every insert
+        excess = count - self.max_entries + self.max_entries // 10
+        self._conn.execute(
+            'DELETE FROM verdicts WHERE id IN (SELECT id FROM verdicts ORDER BY last_used LIMIT ?)',
+            (excess,)
+        )
+        self.stats['evictions'] += excess
+
+    def summary(self):
+        """Counters plus hit rate, for health/metrics endpoints"""
+        lookups = self.stats['exact_hits'] + self.stats['near_hits'] + self.stats['misses']
+        hits = self.stats['exact_hits'] + self.stats['near_hits']
+        return dict(self.stats, hit_rate=round(hits / lookups, 3) if lookups else 0.0)
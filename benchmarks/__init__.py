@@ -0,0 +1,7 @@
+"""Benchmarks for both backends.
+
+synthetic.py generates seeded test policies, mock_backboard.py and
+fake_ollama.py stand in for the LLM APIs, and suite.py runs everything
+against baseline.json. The bench_*.py and load_*.py scripts are one-off
+comparisons of a single optimization.
+"""
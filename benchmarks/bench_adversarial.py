@@ -0,0 +1,83 @@
+"""Worst-case latency of the risk patterns on long clauses with no paragraph breaks.
+
+Each input is a single clause built to make the old unbounded `.*` chains
+backtrack: the leading terms repeat over and over but the final term never
+shows up (or, for the negative lookahead, the veto word sits at the very end). The raw patterns grow quadratically (or worse) with clause length,
+the gap-bounded patterns the engine actually runs stay linear.
+
+Run from the repo root:
+    python benchmarks/bench_adversarial.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from risk_analyzer import RiskAnalyzer
+
+
+# (repeating unit, tail, pattern it is designed to stress)
+ADVERSARIAL_CASES = [
+    ('advertisers receive ', '', r'\badvert(is|iz)ers?.*\b(receive|get|access).*\b(information|data|reports?|insights?)\b'),
+    ('share advertisers ', '', r'\bshare.*\b(advertisers?|partners?).*\b(personali[sz]|target|measure)'),
+    ('improve services ', ' specifically', r'\bimprove.*\bservices?\b(?!.*\bspecifically\b)'),
+]
+
+# The raw patterns are cubic on the first two cases, keep their inputs small
+RAW_SIZES = (500, 1000, 2000)
+SAFE_SIZES = (2000, 4000, 8000, 16000, 64000)
+
+
+def make_clause(unit, length, tail=''):
+    body_length = length - len(tail)
+    return (unit * (body_length // len(unit) + 1))[:body_length] + tail
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, compiled, unit, tail, sizes):
+    print(f"  {label}")
+    previous = None
+    for size in sizes:
+        clause = make_clause(unit, size, tail)
+        elapsed = best_of(lambda: compiled.search(clause))
+        growth = f"{elapsed / previous:5.1f}x" if previous else '     -'
+        print(f"    {size:>7} chars {elapsed * 1000:>10.2f} ms   growth {growth}  ({elapsed / size * 1e6:.3f} us/char)")
+        previous = elapsed
+
+
+def main():
+    analyzer = RiskAnalyzer()
+    safe_by_raw = {
+        raw: safe
+        for category in analyzer.engine.categories
+        for raw, safe in zip(category.raw_patterns, category.patterns)
+    }
+
+    for unit, tail, raw in ADVERSARIAL_CASES:
+        print(f"\n{raw}")
+        report('raw (unbounded)', re.compile(raw, re.IGNORECASE), unit, tail, RAW_SIZES)
+        report('bounded', re.compile(safe_by_raw[raw], re.IGNORECASE), unit, tail, SAFE_SIZES)
+
+    # Whole analyzer on a single wall-of-text clause, with and without a budget
+    print("\nRiskAnalyzer.analyze on one clause mixing all units")
+    unit = ''.join(case[0] for case in ADVERSARIAL_CASES)
+    budgeted = RiskAnalyzer(match_budget=20000)
+    for size in SAFE_SIZES:
+        clause = make_clause(unit, size)
+        full = best_of(lambda: analyzer.analyze(clause))
+        capped = best_of(lambda: budgeted.analyze(clause))
+        print(f"    {size:>7} chars  full {full * 1000:>9.2f} ms   budget=20000 {capped * 1000:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
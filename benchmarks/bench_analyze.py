@@ -0,0 +1,72 @@
+"""Compare RiskAnalyzer.analyze against the old per-pattern re.search loop.
+
+Run from the repo root:
+    python benchmarks/bench_analyze.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+def naive_analyze(analyzer, policy_text):
+    """The pre-compiler scan: every pattern through re.search, twice on a hit.
+
+    Uses the same gap-bounded patterns the engine runs so results are comparable.
+    """
+    clauses = [c.strip() for c in policy_text.split('\n\n') if len(c.strip()) > 50]
+    hits = {}
+    for category in analyzer.engine.categories:
+        matches = []
+        for i, clause in enumerate(clauses):
+            for raw, pattern in zip(category.raw_patterns, category.patterns):
+                if re.search(pattern, clause, re.IGNORECASE):
+                    match_obj = re.search(pattern, clause, re.IGNORECASE)
+                    matches.append((i, match_obj.group(0), raw))
+                    break
+        hits[category.name] = matches
+    return hits
+
+
+def summarize(results):
+    return {
+        category: [(m['clause_id'], m['matched_keyword'], m['pattern']) for m in results[category]['matches']]
+        for category in results if category != 'overall'
+    }
+
+
+def timeit(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    analyzer = RiskAnalyzer()
+
+    print(f"{'size':>8} {'naive ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for size_kb in (10, 40, 80):
+        policy = make_policy(size_kb)
+
+        # Same findings as the old loop, otherwise the speedup means nothing
+        naive = naive_analyze(analyzer, policy)
+        compiled = summarize(analyzer.analyze(policy))
+        for category, matches in compiled.items():
+            assert matches == naive[category][:5], category
+
+        naive_s = timeit(lambda: naive_analyze(analyzer, policy))
+        compiled_s = timeit(lambda: analyzer.analyze(policy))
+        print(f"{size_kb:>6}KB {naive_s * 1000:>10.2f} {compiled_s * 1000:>12.2f} {naive_s / compiled_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Wall-clock time of BackboardClient.enhance_analysis against the local mock.
+
+Compares one worker (the old strictly sequential behaviour) with the pooled,
+concurrent client and with batched prompting, with and without injected 503s.
+
+Run from the repo root:
+    python benchmarks/bench_backboard.py
+"""
+import copy
+import os
+import sys
+import tempfile
+import time
+
+# Keep mock assistant IDs out of the real bootstrap state file
+os.environ.setdefault('BACKBOARD_STATE_FILE', os.path.join(tempfile.mkdtemp(), 'backboard_state.json'))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from backboard_client import BackboardClient
+from synthetic import make_policy
+from mock_backboard import MockBackboard
+from risk_analyzer import RiskAnalyzer
+
+
+FAKE_KEY = 'bench-key-0123456789abcdefghij'
+
+
+def run(mock, results, workers, batch_tokens=0):
+    client = BackboardClient(FAKE_KEY, base_url=mock.base_url, max_workers=workers, batch_tokens=batch_tokens)
+    mock.requests = 0
+    start = time.perf_counter()
+    enhanced = client.enhance_analysis(copy.deepcopy(results))
+    elapsed = time.perf_counter() - start
+    validated = sum(
+        1 for category in enhanced.values() if isinstance(category, dict)
+        for m in category.get('matches', []) if 'ai_validation' in m
+    )
+    return elapsed, validated, mock.requests
+
+
+def main():
+    results = RiskAnalyzer().analyze(make_policy(40, risk_density=0.3))
+
+    rows = []
+    for error_rate in (0.0, 0.1):
+        with MockBackboard(latency=0.3, error_rate=error_rate, seed=1) as mock:
+            for workers, batch_tokens in ((1, 0), (6, 0), (12, 0), (6, 1500)):
+                elapsed, validated, calls = run(mock, results, workers, batch_tokens)
+                rows.append((error_rate, workers, batch_tokens, elapsed, validated, calls))
+
+    print(f"\n{'errors':>7} {'workers':>8} {'batch':>6} {'seconds':>8} {'validated':>10} {'http calls':>11}")
+    for error_rate, workers, batch_tokens, elapsed, validated, calls in rows:
+        print(f"{error_rate:>7.0%} {workers:>8} {batch_tokens or '-':>6} {elapsed:>8.2f} {validated:>10} {calls:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""How many LLM calls the regex cascade saves in each backend.
+
+Extension: filtered, sentence-packed chunks routed through Cascade.route at
+a few chunk sizes. Flask: the matches enhance_analysis would send to
+Backboard (top 3 per category) through Cascade.settle_match.
+
+Run from the repo root:
+    python benchmarks/bench_cascade.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from cascade import Cascade
+from chunking import pack_sentences
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_keyword_policy, make_policy
+
+
+def main():
+    analyzer = RiskAnalyzer()
+    policies = [make_keyword_policy(200, seed) for seed in range(20)]
+
+    print("extension chunks (20 policies x 200 keyword lines)")
+    print(f"{'chunk tokens':>12} {'chunks':>7} {'settled':>8} {'to LLM':>7} {'saved':>7} {'ms/chunk':>9}")
+    for chunk_tokens in (128, 256, 1024):
+        cascade = Cascade(analyzer)
+        chunks = [
+            policy[start:end] for policy in policies
+            for start, end in pack_sentences(policy, chunk_tokens)
+        ]
+        start = time.perf_counter()
+        settled, escalated = cascade.route(chunks)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{chunk_tokens:>12} {len(chunks):>7} {len(settled):>8} {len(escalated):>7} "
+            f"{len(settled) / len(chunks):>6.0%} {elapsed / len(chunks) * 1000:>9.3f}"
+        )
+
+    print("\nflask matches (20 policies x 20 KB, top 3 per category)")
+    cascade = Cascade(analyzer)
+    per_category = {}
+    for seed in range(20):
+        results = analyzer.analyze(make_policy(20, seed=seed))
+        for category, data in results.items():
+            if category == 'overall':
+                continue
+            for match in data['matches'][:3]:
+                counts = per_category.setdefault(category, [0, 0])
+                counts[0] += 1
+                counts[1] += cascade.settle_match(category, match) is not None
+    print(f"{'category':<22} {'matches':>8} {'settled':>8}")
+    for category, (total, settled) in per_category.items():
+        print(f"{category:<22} {total:>8} {settled:>8}")
+    print(cascade.summary())
+
+
+if __name__ == '__main__':
+    main()
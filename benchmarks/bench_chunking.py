@@ -0,0 +1,66 @@
+"""Ollama call count and text coverage: fixed 300-char windows vs sentence packing.
+
+The old path sent chunk_text() windows (300 chars, 30 overlap) and only the
+first 10 of them. pack_sentences() packs whole sentences up to a token budget
+and covers everything.
+
+Run from the repo root:
+    python benchmarks/bench_chunking.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from synthetic import make_policy
+from chunking import CHUNK_TOKENS, chunk_text, pack_sentences, split_sentences
+
+
+OLD_MAX_CHUNKS = 10
+
+
+def old_windows(text):
+    """(start, end) spans of the windows the old main.py actually sent"""
+    spans = []
+    for i, chunk in enumerate(chunk_text(text)[:OLD_MAX_CHUNKS]):
+        start = i * (300 - 30)
+        spans.append((start, start + len(chunk)))
+    return spans
+
+
+def measure(text, spans):
+    covered = [0] * len(text)
+    for start, end in spans:
+        for i in range(start, end):
+            covered[i] += 1
+    sent_chars = sum(end - start for start, end in spans)
+    coverage = sum(1 for c in covered if c) / len(text)
+    duplicate = (sent_chars - sum(1 for c in covered if c)) / max(sent_chars, 1)
+
+    # Sentences not wholly inside one chunk were cut in half or never sent
+    cut = 0
+    for s_start, s_end in split_sentences(text):
+        if not any(start <= s_start and s_end <= end for start, end in spans):
+            cut += 1
+    return len(spans), coverage, duplicate, cut
+
+
+def main():
+    print(f"{'size':>6} {'chunker':>10} {'calls':>6} {'coverage':>9} {'duplicate':>10} {'cut/dropped':>12} {'ms':>7}")
+    for size_kb in (2, 10, 40):
+        # Extension text comes from innerText: single newlines between blocks
+        text = make_policy(size_kb).replace('\n\n', '\n')
+        for name, chunker in (('fixed-300', old_windows), (f'sent-{CHUNK_TOKENS}', pack_sentences)):
+            start = time.perf_counter()
+            spans = chunker(text)
+            elapsed = (time.perf_counter() - start) * 1000
+            calls, coverage, duplicate, cut = measure(text, spans)
+            print(f"{size_kb:>4}KB {name:>10} {calls:>6} {coverage:>9.1%} {duplicate:>10.1%} {cut:>12} {elapsed:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
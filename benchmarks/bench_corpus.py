@@ -0,0 +1,108 @@
+"""Corpus index: ingest rate, storage and query latency against re-analysis.
+
+Records --docs synthetic policies (a third of them with --revisions edited
+versions on top) in a temporary corpus_index.CorpusIndex, then times the
+questions a dashboard asks. The baseline is how they were answered before:
+run RiskAnalyzer over every document again and filter its results.
+
+Run from the repo root:
+    python benchmarks/bench_corpus.py [--docs 1000] [--revisions 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from corpus_index import CorpusIndex
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+def revise(text, rng, n):
+    """Another version: a paragraph rewritten and one added"""
+    paragraphs = text.split('\n\n')
+    i = rng.randrange(len(paragraphs))
+    paragraphs[i] = paragraphs[i].replace('data', 'information')
+    paragraphs.append(f'Update {n}: we may retain facial recognition templates for as long as we deem necessary.')
+    return '\n\n'.join(paragraphs)
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=1000)
+    parser.add_argument('--revisions', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    analyzer = RiskAnalyzer()
+    documents = []
+    for i in range(args.docs):
+        text = make_policy(rng.randint(4, 30), risk_density=0.15, seed=i)
+        versions = [text]
+        if i % 3 == 0:
+            for n in range(args.revisions):
+                versions.append(revise(versions[-1], rng, n))
+        documents.append((f'https://www.site{i}.com/privacy', versions))
+
+    items = [
+        dict(text=text, results=analyzer.analyze(text), key=key, analyzer_version=analyzer.version)
+        for key, versions in documents for text in versions
+    ]
+    latest = [versions[-1] for _key, versions in documents]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CorpusIndex(os.path.join(tmp, 'corpus.sqlite3'))
+        start = time.perf_counter()
+        for i in range(0, len(items), 200):
+            index.add_many(items[i:i + 200])
+        ingest = time.perf_counter() - start
+        summary = index.summary()
+        db_bytes = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+
+        print(f"📥 {len(items):,} versions of {args.docs:,} policies in {ingest:.2f}s "
+              f"({len(items) / ingest:,.0f}/sec)")
+        print(f"💾 {summary['text_bytes'] / 1e6:.1f} MB of text stored in {summary['stored_bytes'] / 1e6:.2f} MB "
+              f"({summary['delta_versions']} as diffs), {summary['clauses']:,} distinct clauses, "
+              f"{db_bytes / 1e6:.1f} MB on disk\n")
+
+        def reanalyze(predicate):
+            return [text for text in latest if predicate(analyzer.analyze(text), text)]
+
+        queries = (
+            ('biometric >= 50',
+             dict(categories=['biometric'], min_score=50),
+             lambda r, t: r['biometric']['score'] >= 50),
+            ('"facial recognition" + indefinite_retention >= 60',
+             dict(categories=['indefinite_retention'], min_score=60, keywords=['facial recognition']),
+             lambda r, t: r['indefinite_retention']['score'] >= 60 and 'facial recognition' in t.lower()),
+            ('overall 40-70',
+             dict(min_score=40, max_score=70),
+             lambda r, t: 40 <= r['overall']['score'] <= 70),
+            ('domain site42.com',
+             dict(domain='site42.com'),
+             None),
+        )
+        print(f"{'query':<52} {'matches':>8} {'index ms':>9} {'re-analyze ms':>14}")
+        for label, kwargs, predicate in queries:
+            found = index.search(limit=50, **kwargs)
+            query_s = best_of(lambda: index.search(limit=50, **kwargs))
+            scan = f"{best_of(lambda: reanalyze(predicate), repeat=1) * 1000:.0f}" if predicate else '-'
+            print(f"{label:<52} {found['total']:>8,} {query_s * 1000:>9.2f} {scan:>14}")
+
+
+if __name__ == '__main__':
+    main_()
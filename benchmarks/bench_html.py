@@ -0,0 +1,142 @@
+"""Raw-HTML ingestion: section extraction against the old innerText path.
+
+Builds a long policy page with site chrome around it (nav, cookie banner,
+footer, inline scripts) and compares what the extension used to send (the
+page's text cut at 50,000 chars) with what POST /analyze/html keeps: chars,
+risky sentences that survive, and Ollama chunks after the keyword filter.
+Also times PageReader plain and gzipped, and the extension's keyword filter
+lowercasing each paragraph once per keyword against once per clause.
+
+Run from the repo root:
+    python benchmarks/bench_html.py [--sections 120]
+"""
+import argparse
+import gzip
+import html
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+from chunking import pack_sentences
+from html_extract import PageReader, relevant_text
+from synthetic import RISKY, make_policy
+
+
+# The 50,000-char cut content.js used to apply to document.body.innerText
+OLD_LIMIT = 50000
+
+HEADINGS = [
+    'Information We Collect', 'How We Use Your Information', 'Sharing With Third Parties',
+    'Data Retention', 'Biometric Information', 'Location Data', 'Your Choices', 'Children',
+    'Changes to This Policy', 'Contact Us', 'International Visitors', 'Security'
+]
+CHROME = """
+<header class="site-header"><nav>{links}</nav></header>
+<div id="onetrust-banner-sdk" class="cookie-banner"><p>We use cookies and similar technologies to
+personalise content and ads, to provide social media features and to analyse our traffic.</p>
+<button>Accept all</button><button>Manage settings</button></div>
+<script>{script}</script>
+"""
+FOOTER = '<footer><p>{links}</p><p>&copy; 2024 Example Corp. All rights reserved.</p></footer>'
+
+
+def make_page(sections, seed=0):
+    rng = random.Random(seed)
+    links = ' '.join(f'<a href="/page{i}">Product page number {i}</a>' for i in range(80))
+    script = 'var config = ' + repr({f'key{i}': 'x' * 40 for i in range(2000)}) + ';'
+    parts = [f'<!doctype html><html><head><title>Privacy Policy</title><script>{script}</script></head><body>']
+    parts.append(CHROME.format(links=links, script=script))
+    parts.append('<main><article><h1>Privacy Policy</h1>')
+    for i in range(sections):
+        parts.append(f'<h2>{rng.choice(HEADINGS)}</h2>')
+        policy = make_policy(clauses=rng.randint(3, 8), risk_density=0.15, seed=seed * 1000 + i)
+        for paragraph in policy.split('\n\n'):
+            parts.append(f'<p>{html.escape(paragraph)}</p>')
+    parts.append('</article></main><aside class="sidebar"><p>Related: ' + links + '</p></aside>')
+    parts.append(FOOTER.format(links=links) + '</body></html>')
+    return ''.join(parts)
+
+
+def visible_text(page):
+    """Roughly document.body.innerText: every text node outside head/script/style"""
+    reader = PageReader()
+    reader.parser._is_boilerplate = lambda tag, attrs: tag in ('head', 'script', 'style')
+    reader.feed(page.encode('utf-8'))
+    sections, _stats = reader.close()
+    return '\n'.join(p for section in sections for p in section['paragraphs'])
+
+
+def risky_count(text):
+    return sum(text.count(sentence) for sentence in RISKY)
+
+
+def ollama_chunks(text):
+    filtered = main.filter_relevant_paragraphs(text)
+    return len(pack_sentences(filtered, main.CHUNK_TOKENS)) if filtered.strip() else 0
+
+
+def read_page(body, encoding, chunk_size=64 * 1024):
+    reader = PageReader(encoding)
+    for start in range(0, len(body), chunk_size):
+        reader.feed(body[start:start + chunk_size])
+    return reader.close()
+
+
+def old_filter(text):
+    return "\n".join(p for p in text.split("\n") if any(word in p.lower() for word in main.KEYWORDS))
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=120)
+    args = parser.parse_args()
+
+    page = make_page(args.sections)
+    body = page.encode('utf-8')
+    gzipped = gzip.compress(body)
+    mb = len(body) / 1e6
+
+    text = visible_text(page)
+    old_text = text[:OLD_LIMIT]
+    sections, stats = read_page(gzipped, 'gzip')
+    new_text = relevant_text(sections)
+
+    print(f"📄 Page: {mb:.2f} MB of HTML ({len(gzipped) / 1e6:.2f} MB gzipped), "
+          f"{len(text):,} chars of visible text, {stats['sections']} sections\n")
+    print(f"{'path':<28} {'chars':>10} {'risky sentences':>16} {'ollama chunks':>14}")
+    for label, sample in (
+        ('all visible text', text),
+        ('old: innerText[:50000]', old_text),
+        ('new: /analyze/html', new_text),
+    ):
+        print(f"{label:<28} {len(sample):>10,} {risky_count(sample):>16} {ollama_chunks(sample):>14}")
+
+    print(f"\n{'extraction':<28} {'ms':>10} {'MB/s':>8}")
+    for label, data, encoding in (('PageReader, plain', body, None), ('PageReader, gzip', gzipped, 'gzip')):
+        seconds = best_of(lambda: read_page(data, encoding))
+        print(f"{label:<28} {seconds * 1000:>10.1f} {mb / seconds:>8.1f}")
+
+    # One paragraph per line, so the clause spans are the lines and both keep the same text
+    print(f"\n{'keyword filter':<28} {'ms':>10}")
+    for label, fn in (('lower() per keyword', old_filter), ('lower() per clause', main.filter_relevant_paragraphs)):
+        assert fn(text) == old_filter(text)
+        print(f"{label:<28} {best_of(lambda: fn(text)) * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main_()
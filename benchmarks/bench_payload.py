@@ -0,0 +1,143 @@
+"""Payload size and latency of the /analyze response formats.
+
+Compares today's JSON with the compact format (clause table + spans, pattern
+ids), each as JSON, gzip and MessagePack (if installed). 'server ms' is
+compaction + serialization + compression, 'client ms' is the reverse, and
+'request ms' is a full POST /analyze on the Flask app with the result cached,
+so only the response path differs.
+
+Run from the repo root:
+    python benchmarks/bench_payload.py
+"""
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'backend'))
+sys.path.insert(0, HERE)
+
+os.environ.pop('RESULT_CACHE_DB', None)
+
+from response_format import compact_results, encode, expand_results, msgpack
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+AI_VALIDATION = (
+    "HIGH RISK. The clause allows personal data to be used for purposes that are not specified, "
+    "which conflicts with purpose limitation and gives users no way to know what they agreed to."
+)
+GDPR_CITATION = "Article: Article 5(1)(b) - Purpose limitation\nConflict: " + AI_VALIDATION
+
+FORMATS = [
+    # name, compact, msgpack, gzip
+    ('json (today)', False, False, False),
+    ('json+gzip', False, False, True),
+    ('compact', True, False, False),
+    ('compact+gzip', True, False, True),
+    ('msgpack', False, True, False),
+    ('compact+msgpack', True, True, False),
+    ('compact+msgpack+gzip', True, True, True),
+]
+
+
+def with_ai_fields(results):
+    """What enhance_analysis adds: a validation and citation on the first 3 matches per category"""
+    results = json.loads(json.dumps(results))
+    for value in results.values():
+        for match in value.get('matches', [])[:3] if isinstance(value, dict) else []:
+            match['ai_validation'] = AI_VALIDATION
+            match['gdpr_citation'] = GDPR_CITATION
+            match['validated_by'] = 'ai'
+    results['ai_enhanced'] = True
+    return results
+
+
+def timeit(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def server_side(results, analyzer, compact, use_msgpack, use_gzip):
+    payload = compact_results(results, analyzer) if compact else results
+    return encode(payload, use_msgpack, use_gzip)[0]
+
+
+def client_side(body, compact, use_msgpack, use_gzip):
+    if use_gzip:
+        body = gzip.decompress(body)
+    payload = msgpack.unpackb(body) if use_msgpack else json.loads(body)
+    return expand_results(payload) if compact else payload
+
+
+def flask_app(stack):
+    # No Backboard at all: only the response path is being measured
+    os.environ['BACKBOARD_API_KEY'] = ''
+    tmp = stack.enter_context(tempfile.TemporaryDirectory())
+    os.environ['BACKBOARD_STATE_FILE'] = os.path.join(tmp, 'state.json')
+    os.environ['JOB_DB'] = os.path.join(tmp, 'jobs.sqlite3')
+    os.environ['HANDOFF_DB'] = os.path.join(tmp, 'handoff.sqlite3')
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        import app
+    return app
+
+
+def request_ms(client, text, compact, use_msgpack, use_gzip):
+    """Best POST /analyze time with these Accept headers"""
+    headers = {}
+    if use_msgpack:
+        headers['Accept'] = 'application/msgpack'
+    if use_gzip:
+        headers['Accept-Encoding'] = 'gzip'
+    url = '/analyze?format=compact' if compact else '/analyze'
+    return timeit(lambda: client.post(url, json={'policy': text}, headers=headers)) * 1000
+
+
+def main():
+    analyzer = RiskAnalyzer()
+    scenarios = [
+        ('20KB regex', make_policy(20, seed=1), False),
+        ('200KB dense regex', make_policy(200, risk_density=0.5, seed=2), False),
+        ('200KB dense + AI', make_policy(200, risk_density=0.5, seed=2), True),
+    ]
+    formats = [f for f in FORMATS if msgpack is not None or not f[2]]
+    if msgpack is None:
+        print("⏭️  msgpack not installed, skipping the MessagePack rows")
+
+    with contextlib.ExitStack() as stack:
+        app = flask_app(stack)
+        client = app.app.test_client()
+
+        for label, text, ai in scenarios:
+            results = analyzer.analyze(text)
+            if ai:
+                results = with_ai_fields(results)
+            # Warm the cache so requests only pay for the response
+            app.result_cache.get_or_compute = lambda key, compute, results=results: results
+
+            print(f"\n{label}")
+            print(f"{'format':<22} {'bytes':>8} {'vs today':>9} {'server ms':>10} {'client ms':>10} {'request ms':>11}")
+            base = None
+            for name, compact, use_msgpack, use_gzip in formats:
+                body = server_side(results, analyzer, compact, use_msgpack, use_gzip)
+                assert client_side(body, compact, use_msgpack, use_gzip) == results, name
+                if base is None:
+                    base = len(body)
+                server = timeit(lambda: server_side(results, analyzer, compact, use_msgpack, use_gzip)) * 1000
+                client_ms = timeit(lambda: client_side(body, compact, use_msgpack, use_gzip)) * 1000
+                request = request_ms(client, text, compact, use_msgpack, use_gzip)
+                print(f"{name:<22} {len(body):>8} {len(body) / base:>8.0%} {server:>10.3f} {client_ms:>10.3f} {request:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Rescoring a corpus from hit matrices against re-running the regexes.
+
+Builds a seeded corpus, keeps each document's hit matrix, then times a
+what-if weight change both ways: RiskAnalyzer.analyze over every text with
+the new weights, and Rescorer over the stored matrices (including the JSON
+round trip they'd take through bulk_analyze.py --hits output).
+
+Run from the repo root:
+    python benchmarks/bench_rescore.py [--docs 300]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from hit_matrix import HitMatrix, Rescorer
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+WHAT_IF = {'weights': {'biometric': 45, 'vague_language': 10}, 'thresholds': [25, 55]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=300)
+    args = parser.parse_args()
+
+    corpus = [make_policy(20, risk_density=0.3, seed=seed) for seed in range(args.docs)]
+    analyzer = RiskAnalyzer()
+
+    start = time.perf_counter()
+    for text in corpus:
+        analyzer.analyze(text)
+    analyze_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrices = [analyzer.analyze_with_hits(text)[1] for text in corpus]
+    with_hits_s = time.perf_counter() - start
+    lines = [json.dumps(matrix.to_dict()) for matrix in matrices]
+
+    # What-if the slow way: same weights in a fresh analyzer, every regex again
+    tuned = RiskAnalyzer()
+    for category, weight in WHAT_IF['weights'].items():
+        tuned.patterns[category]['weight'] = weight
+    start = time.perf_counter()
+    for text in corpus:
+        tuned.analyze(text)
+    rescan_s = time.perf_counter() - start
+
+    rescorer = Rescorer(analyzer, WHAT_IF)
+    start = time.perf_counter()
+    for matrix in matrices:
+        rescorer.score(matrix)
+    rescore_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for line in lines:
+        rescorer.score(HitMatrix.from_dict(json.loads(line)))
+    rescore_json_s = time.perf_counter() - start
+
+    size = sum(len(line) for line in lines) / len(lines)
+    print(f"📚 {args.docs} docs of ~20 KB, hit matrix ~{size:.0f} bytes of JSON each\n")
+    print(f"{'step':<34} {'seconds':>9} {'docs/sec':>10}")
+    for label, seconds in (
+        ('analyze()', analyze_s),
+        ('analyze_with_hits()', with_hits_s),
+        ('what-if: re-analyze', rescan_s),
+        ('what-if: rescore matrices', rescore_s),
+        ('what-if: rescore from JSONL lines', rescore_json_s),
+    ):
+        print(f"{label:<34} {seconds:>9.3f} {args.docs / seconds:>10.0f}")
+    print(f"\n⚡ Rescoring is {rescan_s / rescore_s:.0f}x faster than re-analyzing "
+          f"({rescan_s / rescore_json_s:.0f}x including JSON parsing)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Local GDPR retrieval: query latency, and Backboard calls per GDPR_MODE.
+
+Times GdprRetriever.search on clauses from a synthetic policy, then runs
+enhance_analysis against MockBackboard in each mode. 'remote' pays for the
+knowledge base bootstrap and a second citation call per conflicting clause,
+'local' puts the retrieved articles into a single prompt, and 'articles'
+makes no calls at all.
+
+Run from the repo root:
+    python benchmarks/bench_retriever.py
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'backend'))
+sys.path.insert(0, HERE)
+
+from backboard_client import CATEGORY_GDPR_FOCUS, GDPR_MODES, BackboardClient
+from gdpr_retriever import retriever
+from mock_backboard import MockBackboard
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+FAKE_KEY = 'bench-key-0123456789abcdefghij'
+
+
+def time_search(queries, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            retriever.search(query)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries)
+
+
+def run_mode(mode, results):
+    with MockBackboard(latency=0.05) as mock, tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = BackboardClient(FAKE_KEY, base_url=mock.base_url, gdpr_mode=mode)
+            client.state_path = os.path.join(tmp, 'state.json')
+            start = time.perf_counter()
+            enhanced = client.enhance_analysis(results)
+            elapsed = time.perf_counter() - start
+    cited = sum(
+        1 for category in CATEGORY_GDPR_FOCUS for m in enhanced[category]['matches'] if 'gdpr_citation' in m
+    )
+    return elapsed, mock.requests, cited
+
+
+def main():
+    analyzer = RiskAnalyzer()
+    text = make_policy(50, risk_density=0.4, seed=11)
+    results = analyzer.analyze(text)
+
+    queries = [
+        f"{m['text']} {focus}"
+        for category, focus in CATEGORY_GDPR_FOCUS.items() for m in results[category]['matches']
+    ]
+    print(f"🔎 {len(retriever.records)} article paragraphs, {len(retriever.postings)} terms")
+    print(f"⏱️  search: {time_search(queries) * 1e6:.1f} µs per clause ({len(queries)} clauses)\n")
+
+    for category, focus in CATEGORY_GDPR_FOCUS.items():
+        if results[category]['matches']:
+            top = retriever.search(f"{results[category]['matches'][0]['text']} {focus}", k=1)
+            print(f"{category:<22} -> {top[0][1]['heading'] if top else '-'}")
+
+    print(f"\n{'mode':<10} {'seconds':>8} {'http calls':>11} {'cited':>6}")
+    for mode in GDPR_MODES:
+        elapsed, requests, cited = run_mode(mode, analyzer.analyze(text))
+        print(f"{mode:<10} {elapsed:>8.2f} {requests:>11} {cited:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Rule reloads: compile time, and request latency while engines are swapped under load.
+
+Copies risk_rules.json to a temp file and runs --threads threads analyzing
+policies through a RuleRegistry for --seconds, first with the rules left
+alone, then while another thread rewrites the file and reloads every
+--every seconds (alternating between two weights). Prints the reload
+reports' compile times and benchmark deltas, and request latency and
+failures for both runs; a swap should cost no failed or stalled requests.
+
+Run from the repo root:
+    python benchmarks/bench_rules.py [--threads 4] [--seconds 5] [--every 0.5]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rule_registry import RuleRegistry
+from rules import BUNDLED_RULES
+from synthetic import make_policy
+
+
+def hammer(registry, texts, seconds, threads):
+    """Analyze texts from several threads; returns (sorted latencies in ms, failures, versions seen)"""
+    latencies = []
+    failures = []
+    versions = set()
+    stop = time.monotonic() + seconds
+
+    def worker(n):
+        i = n
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                analyzer = registry.analyzer
+                results = analyzer.analyze(texts[i % len(texts)])
+                if results['overall']['rules_version'] != analyzer.rules_version:
+                    raise AssertionError('result stamped with another rule version')
+                versions.add(analyzer.rules_version)
+            except Exception as e:
+                failures.append(repr(e))
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += threads
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sorted(latencies), failures, versions
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--every', type=float, default=0.5, help='seconds between reloads')
+    args = parser.parse_args()
+
+    texts = [make_policy(20, risk_density=0.2, seed=i) for i in range(8)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rules.json')
+        shutil.copy(BUNDLED_RULES, path)
+        with open(path) as f:
+            rules = json.load(f)
+        registry = RuleRegistry(path, watch_seconds=0)
+        for text in texts:
+            registry.remember(text)
+
+        reports = []
+
+        def reloader(stop):
+            n = 0
+            while not stop.is_set():
+                n += 1
+                rules['version'] = f'bench.{n}'
+                rules['categories']['biometric']['weight'] = 30 + n % 2 * 10
+                with open(path + '.tmp', 'w') as f:
+                    json.dump(rules, f)
+                os.replace(path + '.tmp', path)
+                reports.append(registry.reload())
+                stop.wait(args.every)
+
+        print(f"{'run':<16} {'requests':>9} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'versions':>9}")
+        for label in ('steady', 'reloading'):
+            stop = threading.Event()
+            thread = threading.Thread(target=reloader, args=(stop,)) if label == 'reloading' else None
+            if thread:
+                thread.start()
+            latencies, failures, versions = hammer(registry, texts, args.seconds, args.threads)
+            if thread:
+                stop.set()
+                thread.join()
+            print(f"{label:<16} {len(latencies):>9,} {len(failures):>7} {percentile(latencies, 0.5):>8.2f} "
+                  f"{percentile(latencies, 0.99):>8.2f} {latencies[-1] if latencies else 0:>8.2f} {len(versions):>9}")
+            for failure in failures[:3]:
+                print(f"   ❌ {failure}")
+
+        compile_ms = sorted(report['compile_ms'] for report in reports)
+        print(f"\n🔁 {len(reports)} reloads, compile {percentile(compile_ms, 0.5):.1f} ms median, "
+              f"{compile_ms[-1] if compile_ms else 0:.1f} ms max")
+        if reports and reports[-1].get('benchmark'):
+            bench = reports[-1]['benchmark']
+            print(f"📊 last reload on {bench['documents']} policies: {bench['previous_ms']} -> {bench['ms']} ms "
+                  f"({bench['change_pct']:+}%), {bench['risk_level_changes']} risk level changes, "
+                  f"biometric score {bench['categories']['biometric']['score_delta']:+} on average")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,81 @@
+"""Clause segmentation throughput in MB/s, old splitting against segmenter.py.
+
+Three ~1 MB inputs: dashboard-style paragraphs, extension-style innerText
+(single newlines) and a wall of text with no breaks at all. For each:
+- split: the old split('\\n\\n') + strip + length filter, against clause_spans()
+- analyze: RiskAnalyzer scanning copied clause strings, against scanning
+  spans of the one document
+- extension filter: the old per-line keyword filter, against
+  filter_relevant_paragraphs() on clause_spans()
+
+Run from the repo root:
+    python benchmarks/bench_segmenter.py [--size-kb 1024]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+from risk_analyzer import RiskAnalyzer
+from segmenter import clause_spans
+from synthetic import make_policy
+
+
+def old_split(text):
+    return [c.strip() for c in text.split('\n\n') if len(c.strip()) > 50]
+
+
+def old_filter(text):
+    return "\n".join(p for p in text.split("\n") if any(word in p.lower() for word in main.KEYWORDS))
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-kb', type=int, default=1024)
+    args = parser.parse_args()
+
+    analyzer = RiskAnalyzer()
+    inputs = (
+        ('paragraphs', make_policy(args.size_kb, risk_density=0.15, seed=1)),
+        ('innerText', make_policy(args.size_kb, risk_density=0.15, seed=2).replace('\n\n', '\n')),
+        ('wall of text', make_policy(args.size_kb, risk_density=0.15, seed=3, paragraph_breaks=False)),
+    )
+
+    print(f"{'input':<14} {'step':<18} {'old clauses':>12} {'old MB/s':>9} {'new clauses':>12} {'new MB/s':>9}")
+    for name, text in inputs:
+        mb = len(text.encode('utf-8')) / 1e6
+        spans = list(clause_spans(text))
+        copies = [(text[start:end], 0, end - start) for start, end in spans]
+        views = [(text, start, end) for start, end in spans]
+        old_kept = old_filter(text).count('\n') + 1
+        new_kept = main.filter_relevant_paragraphs(text).count('\n') + 1
+
+        for step, old, old_count, new, new_count in (
+            ('split', lambda: old_split(text), len(old_split(text)), lambda: list(clause_spans(text)), len(spans)),
+            ('analyze', lambda: analyzer._analyze_clauses(copies), len(spans),
+             lambda: analyzer._analyze_clauses(views), len(spans)),
+            ('extension filter', lambda: old_filter(text), old_kept,
+             lambda: main.filter_relevant_paragraphs(text), new_kept),
+        ):
+            old_s = best_of(old)
+            new_s = best_of(new)
+            print(f"{name:<14} {step:<18} {old_count:>12,} {mb / old_s:>9.1f} {new_count:>12,} {mb / new_s:>9.1f}")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,132 @@
+"""Time to first finding: /analyze vs /analyze/stream against a fake Ollama.
+
+Serves the extension backend with uvicorn on a free port and posts one
+policy that mentions every flag, so the stream can stop early once the
+aggregate saturates. Reports when the first true flag reached the client,
+when the final result arrived, and how many Ollama calls were made.
+
+Run from the repo root:
+    python benchmarks/bench_stream.py
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.pop('RESULT_CACHE_DB', None)
+os.environ.pop('VERDICT_CACHE_DB', None)
+# Every chunk goes to Ollama; bench_cascade.py measures what the rules tier saves
+os.environ['CASCADE_THRESHOLD'] = '2'
+
+import httpx
+import uvicorn
+
+import main
+from fake_ollama import FakeOllama
+from ollama_client import OllamaScheduler
+from result_cache import ResultCache
+from verdict_cache import VerdictCache
+
+
+LATENCY = 2.0  # seconds per prompt, about what a 3B model takes on a laptop
+CHUNK_TOKENS = 128
+
+# Each topic gets its own section, like a real policy; everything after the
+# retention section can't change the answer any more
+SECTIONS = [
+    "We collect precise location and GPS data to show nearby offers.",
+    "Our app may access your camera and microphone when you join a video call.",
+    "Face geometry and fingerprint templates are processed to unlock your account.",
+    "We store your account details and purchase history to provide the service.",
+    "Support transcripts are retained for 30 days and then deleted.",
+    "You can delete your account and its settings at any time from your profile.",
+    "Requests to delete data are handled by our support team within the app.",
+    "Cookies store your language and display preferences on this device.",
+]
+POLICY = "\n".join(sentence for sentence in SECTIONS for _ in range(12))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def reset():
+    main.result_cache = ResultCache()
+    main.verdict_cache = VerdictCache()
+    main.scheduler = OllamaScheduler(main.ollama, initial_limit=2, max_limit=2)
+
+
+def first_true(analysis):
+    return any(analysis.get(key) for key in main.FLAG_KEYS)
+
+
+def run_plain(base_url):
+    start = time.perf_counter()
+    response = httpx.post(f"{base_url}/analyze", json={'text': POLICY}, timeout=None)
+    elapsed = time.perf_counter() - start
+    first = elapsed if first_true(response.json()['analysis']) else None
+    return first, elapsed, response.json()
+
+
+def run_stream(base_url):
+    start = time.perf_counter()
+    first = None
+    result = None
+    with httpx.stream('POST', f"{base_url}/analyze/stream", json={'text': POLICY}, timeout=None) as response:
+        event = None
+        for line in response.iter_lines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                payload = json.loads(line[len('data: '):])
+                if first is None and first_true(payload['analysis']):
+                    first = time.perf_counter() - start
+                if event == 'result':
+                    result = payload
+    return first, time.perf_counter() - start, result
+
+
+def main_():
+    main.CHUNK_TOKENS = CHUNK_TOKENS
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    with FakeOllama(latency=LATENCY, slots=2) as fake:
+        main.ollama.url = fake.url
+        chunks = len(main.pack_sentences(main.filter_relevant_paragraphs(POLICY), CHUNK_TOKENS))
+        print(f"fake Ollama: {LATENCY}s/prompt, 2 slots; {chunks} chunks of up to {CHUNK_TOKENS} tokens\n")
+        print(f"{'mode':<26} {'first flag':>10} {'result':>8} {'calls':>6}  outcome")
+        for label, run, stream in (
+            ('/analyze', run_plain, False),
+            ('/analyze/stream', run_stream, False),
+            ('/analyze/stream + tokens', run_stream, True),
+        ):
+            # Calls cancelled by the previous run still hold the fake's slots
+            # (real Ollama stops generating when the client hangs up)
+            while fake.waiting:
+                time.sleep(0.05)
+            reset()
+            main.OLLAMA_STREAM = stream
+            fake.requests = 0
+            first, elapsed, result = run(base_url)
+            outcome = ', '.join(key for key in ('saturated', 'partial', 'failed') if result.get(key)) or 'complete'
+            print(f"{label:<26} {first:>9.2f}s {elapsed:>7.2f}s {fake.requests:>6}  {outcome}")
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,186 @@
+"""Local stand-in for Ollama's /api/generate.
+
+Like a real single-GPU Ollama it only works on a few prompts at once (`slots`)
+and every prompt in flight slows the others down, so pushing more concurrent
+calls at it past a point only adds latency. A share of calls (`error_rate`)
+fails with a 500 like an out-of-memory runner. Flags are derived from keywords
+in each clause, and `"stream": true` is answered with NDJSON token chunks
+like the real server. Run it standalone:
+    python benchmarks/fake_ollama.py --port 11434 --latency 0.5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+FLAG_PATTERNS = {
+    "mentions_biometric_data": r"biometric|fingerprint|face",
+    "mentions_location_tracking": r"location|gps",
+    "mentions_camera_or_microphone": r"camera|microphone",
+    "data_retention_policy_present": r"retain|retention|store",
+    "retention_duration_specified": r"\b\d+\s+(?:days|months|years)\b",
+}
+
+# Roughly what qwen2.5:3b emits per streamed line
+TOKEN_CHARS = 4
+
+
+def answer(clause):
+    flags = {key: bool(re.search(pattern, clause, re.IGNORECASE)) for key, pattern in FLAG_PATTERNS.items()}
+    found = [key for key, value in flags.items() if value]
+    flags["risk_reason"] = f"Clause mentions {', '.join(found)}." if found else "Nothing notable."
+    return flags
+
+
+class FakeOllama:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, slots=4, slowdown=0.25, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.slowdown = slowdown
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.slots = threading.Semaphore(slots)
+        self.active = 0
+        self.waiting = 0  # in flight, including prompts queued for a slot
+        self.peak = 0
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 128
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextmanager
+    def _slot(self):
+        """Wait for a free slot; yields how long this prompt takes to answer"""
+        with self.lock:
+            self.requests += 1
+            self.waiting += 1
+            self.peak = max(self.peak, self.waiting)
+        with self.slots:
+            with self.lock:
+                self.active += 1
+                busy = self.active
+            try:
+                # Shared compute: each extra prompt in flight slows this one down
+                yield self.latency * (1 + self.slowdown * (busy - 1))
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.waiting -= 1
+
+    def _answer(self, prompt):
+        clauses = re.findall(r'"""(.*?)"""', prompt, re.DOTALL)
+        batch_ids = re.findall(r'^\[(\d+)\]$', prompt, re.MULTILINE)
+        if batch_ids:
+            return json.dumps([dict(answer(clause), id=int(i)) for i, clause in zip(batch_ids, clauses)], indent=2)
+        return json.dumps(answer(clauses[0] if clauses else prompt), indent=2)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                text = fake._answer(body.get('prompt', ''))
+                try:
+                    with fake._slot() as duration:
+                        with fake.lock:
+                            fail = fake.rng.random() < fake.error_rate
+                            fake.errors += fail
+                        if fail:
+                            time.sleep(duration / 2)
+                            self._error()
+                        elif body.get('stream', True):
+                            self._stream(body.get('model'), text, duration)
+                        else:
+                            time.sleep(duration)
+                            self._send(body.get('model'), text)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # caller gave up (deadline or cancelled)
+
+            def _send(self, model, text):
+                data = json.dumps({'model': model, 'response': text, 'done': True}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self):
+                data = json.dumps({'error': 'model runner has unexpectedly stopped'}).encode('utf-8')
+                self.send_response(500)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model, text, duration):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                pieces = [text[i:i + TOKEN_CHARS] for i in range(0, len(text), TOKEN_CHARS)]
+                for piece in pieces:
+                    time.sleep(duration / len(pieces))
+                    self._chunk({'model': model, 'response': piece, 'done': False})
+                self._chunk({'model': model, 'response': '', 'done': True})
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _chunk(self, payload):
+                line = json.dumps(payload).encode('utf-8') + b'\n'
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per prompt with nothing else running')
+    parser.add_argument('--slots', type=int, default=4, help='prompts worked on at once')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 500')
+    args = parser.parse_args()
+
+    fake = FakeOllama(port=args.port, latency=args.latency, slots=args.slots, error_rate=args.error_rate)
+    print(f"Fake Ollama listening on {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Concurrent users hitting the extension backend's /analyze against a fake Ollama.
+
+Every user posts a different policy (so neither cache helps) through the
+FastAPI app in-process. Reports throughput and p50/p99 latency per
+concurrency level, for a fixed Ollama concurrency limit and for the adaptive
+scheduler, plus how long a trivial request (/test) waits while the app is
+busy, i.e. whether the event loop stays free.
+
+Run from the repo root:
+    python benchmarks/load_ollama.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Fresh in-memory caches only; every policy is distinct anyway
+os.environ.pop('RESULT_CACHE_DB', None)
+os.environ.pop('VERDICT_CACHE_DB', None)
+# Every chunk goes to Ollama; bench_cascade.py measures what the rules tier saves
+os.environ['CASCADE_THRESHOLD'] = '2'
+
+import httpx
+
+import main
+from fake_ollama import FakeOllama
+from ollama_client import OllamaScheduler
+from synthetic import make_unique_policy
+from verdict_cache import VerdictCache
+
+
+LATENCY = 0.2
+SLOTS = 4
+USERS = (1, 8, 32)
+PARAGRAPHS = 20
+CHUNK_TOKENS = 256  # several Ollama calls per policy
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def probe_loop(client, stop, waits):
+    """Time a trivial request every 50ms while the load runs"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.post('/test')
+        waits.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def run_level(client, users, seed):
+    rng = random.Random(seed)
+    policies = [make_unique_policy(rng, PARAGRAPHS) for _ in range(users)]
+    latencies = []
+
+    async def user(text):
+        start = time.perf_counter()
+        response = await client.post('/analyze', json={'text': text})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    waits = []
+    probe = asyncio.ensure_future(probe_loop(client, stop, waits))
+    start = time.perf_counter()
+    await asyncio.gather(*(user(text) for text in policies))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return elapsed, latencies, waits
+
+
+async def run(fake, label, **limits):
+    main.scheduler = OllamaScheduler(main.ollama, **limits)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://app', timeout=None) as client:
+        for seed, users in enumerate(USERS):
+            fake.peak = 0
+            fake.requests = 0
+            elapsed, latencies, waits = await run_level(client, users, seed=hash((label, seed)) & 0xffff)
+            print(
+                f"{label:<14} {users:>5} {users / elapsed:>9.2f} {percentile(latencies, 50):>8.2f}s "
+                f"{percentile(latencies, 99):>8.2f}s {fake.requests / elapsed:>9.1f} {fake.peak:>5} "
+                f"{max(waits) * 1000:>9.1f}ms  limit={main.scheduler.limit}"
+            )
+
+
+async def bench(fake):
+    main.ollama.url = fake.url
+    main.CHUNK_TOKENS = CHUNK_TOKENS
+    # (Almost) exact-match verdicts only: the small filler vocabulary would make near-duplicates
+    main.verdict_cache = VerdictCache(max_distance=1)
+    print(
+        f"fake Ollama: {LATENCY}s/prompt, {SLOTS} slots; "
+        f"{PARAGRAPHS} paragraphs/policy in {CHUNK_TOKENS}-token chunks, deadline {main.ANALYZE_DEADLINE:.0f}s\n"
+    )
+    print(f"{'scheduler':<14} {'users':>5} {'policies/s':>9} {'p50':>9} {'p99':>9} {'calls/s':>9} {'peak':>5} {'/test max':>11}")
+    await run(fake, 'fixed 1', initial_limit=1, min_limit=1, max_limit=1)
+    await run(fake, 'fixed 16', initial_limit=16, min_limit=16, max_limit=16)
+    await run(fake, 'adaptive', initial_limit=2, max_limit=16)
+    await main.ollama.aclose()
+
+
+def main_():
+    with FakeOllama(latency=LATENCY, slots=SLOTS) as fake:
+        asyncio.run(bench(fake))
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,132 @@
+"""Local stand-in for the Backboard.io API.
+
+Implements just the endpoints BackboardClient uses, with configurable
+latency and error rate. Run it standalone:
+    python benchmarks/mock_backboard.py --port 8765 --latency 0.5
+and point the Flask app at it with BACKBOARD_BASE_URL=http://127.0.0.1:8765/api
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockBackboard:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _reply(self, path, body):
+        """Response payload for a path, or None for 404"""
+        if path == '/api/knowledge-bases':
+            return {'knowledge_base_id': f"kb_{next(self.ids)}"}
+        if re.fullmatch(r'/api/knowledge-bases/[^/]+/documents', path):
+            return {'status': 'ok'}
+        if path == '/api/assistants':
+            return {'assistant_id': f"asst_{next(self.ids)}"}
+        if re.fullmatch(r'/api/assistants/[^/]+/threads', path):
+            return {'thread_id': f"thread_{next(self.ids)}"}
+        if re.fullmatch(r'/api/threads/[^/]+/messages', path):
+            batch_ids = re.findall(r'%5B(\d+)%5D\+FOCUS|\[(\d+)\] FOCUS', body)
+            if batch_ids:
+                content = json.dumps([
+                    {
+                        'id': int(a or b),
+                        'verdict': 'YES',
+                        'explanation': 'The clause conflicts with the purpose limitation principle.',
+                        'article': 'Article 5(1)(b) - Purpose limitation'
+                    }
+                    for a, b in batch_ids
+                ])
+            elif 'RELEVANT+GDPR+ARTICLES' in body or 'RELEVANT GDPR ARTICLES' in body:
+                content = (
+                    "YES. No retention period is given, so data may be kept longer than necessary.\n"
+                    "Article: Article 5(1)(e) - Storage limitation"
+                )
+            elif 'regulatory+citation' in body or 'regulatory citation' in body:
+                content = "Article: Article 5(1)(e) - Storage limitation\nConflict: No retention period is given."
+            else:
+                content = "YES. The clause conflicts with Article 5(1)(b) - Purpose limitation."
+            return {'content': content}
+        return None
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8', 'replace')
+                with mock.lock:
+                    mock.requests += 1
+                    fail = mock.rng.random() < mock.error_rate
+
+                # Only the LLM call is slow, setup calls are quick
+                if '/messages' in self.path:
+                    time.sleep(mock.latency)
+
+                payload = None if fail else mock._reply(self.path, body)
+                status = 503 if fail else (200 if payload is not None else 404)
+                data = json.dumps(payload or {'error': 'unavailable'}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per message call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 503')
+    args = parser.parse_args()
+
+    mock = MockBackboard(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Mock Backboard listening on {mock.base_url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""Benchmark suite with a stored baseline and a regression check.
+
+Micro-benchmarks time the pure-Python stages (regex analysis, chunking,
+aggregation, the rules cascade). End-to-end ones post to /analyze on both
+apps in-process, with MockBackboard and FakeOllama standing in for the LLMs
+(injected latency and error rates). Micro timings are divided by a fixed
+calibration loop before they are compared, so a baseline saved on one
+machine can be checked on another. End-to-end timings are the fake servers'
+fixed latency plus the apps' own work, which no single ratio corrects, so
+--check only reports them unless --check-e2e is given (then compared as is).
+
+Run from the repo root:
+    python benchmarks/suite.py                   # print timings
+    python benchmarks/suite.py --save-baseline   # write benchmarks/baseline.json
+    python benchmarks/suite.py --check           # exit 1 if a micro-benchmark got >25% slower
+    python benchmarks/suite.py --check --check-e2e   # end-to-end ones too, same machine only
+    python benchmarks/suite.py --only analyze --check --threshold 0.4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'backend'))
+sys.path.insert(0, os.path.join(HERE, '..', 'privacy-risk-extension', 'backend'))
+sys.path.insert(0, HERE)
+
+# Fresh in-memory caches only; every run must do the work
+os.environ.pop('RESULT_CACHE_DB', None)
+os.environ.pop('VERDICT_CACHE_DB', None)
+
+from cascade import Cascade
+from chunking import chunk_text, pack_sentences
+from fake_ollama import FakeOllama
+from mock_backboard import MockBackboard
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_keyword_policy, make_policy, make_unique_policy
+
+
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+THRESHOLD = 0.25
+FAKE_KEY = 'bench-key-0123456789abcdefghij'
+
+BENCHMARKS = []
+
+
+def benchmark(name, kind='micro', repeat=5):
+    """Register a setup function: it gets an ExitStack and returns the callable to time"""
+    def register(setup):
+        BENCHMARKS.append({'name': name, 'kind': kind, 'repeat': repeat, 'setup': setup})
+        return setup
+    return register
+
+
+# ---------------------------
+# Micro-benchmarks
+# ---------------------------
+@benchmark('analyze_20kb')
+def analyze_20kb(stack):
+    analyzer, text = RiskAnalyzer(), make_policy(20)
+    return lambda: analyzer.analyze(text)
+
+
+@benchmark('analyze_200kb_dense')
+def analyze_200kb_dense(stack):
+    analyzer, text = RiskAnalyzer(), make_policy(200, risk_density=0.5, seed=1)
+    return lambda: analyzer.analyze(text)
+
+
+@benchmark('analyze_wall_of_text')
+def analyze_wall_of_text(stack):
+    # 64 KB with no paragraph breaks, which the segmenter splits into sentence runs
+    analyzer, text = RiskAnalyzer(), make_policy(64, paragraph_breaks=False, seed=2)
+    return lambda: analyzer.analyze(text)
+
+
+@benchmark('chunk_text_200kb')
+def chunk_text_200kb(stack):
+    text = make_policy(200, seed=3)
+    return lambda: chunk_text(text)
+
+
+@benchmark('pack_sentences_200kb')
+def pack_sentences_200kb(stack):
+    text = make_policy(200, seed=3)
+    return lambda: pack_sentences(text)
+
+
+@benchmark('pack_sentences_no_breaks')
+def pack_sentences_no_breaks(stack):
+    text = make_policy(200, paragraph_breaks=False, seed=4)
+    return lambda: pack_sentences(text)
+
+
+@benchmark('cascade_route_400_chunks')
+def cascade_route(stack):
+    cascade = Cascade(RiskAnalyzer())
+    chunks = [
+        policy[start:end] for policy in (make_keyword_policy(200, seed) for seed in range(5))
+        for start, end in pack_sentences(policy, 128)
+    ]
+    return lambda: cascade.route(chunks)
+
+
+@benchmark('aggregate_5000_results')
+def aggregate(stack):
+    import main
+    rng = random.Random(5)
+    results = [
+        dict({key: rng.random() < 0.1 for key in main.FLAG_KEYS}, risk_reason="Clause mentions location.")
+        for _ in range(5000)
+    ]
+    return lambda: main.aggregate_results(results)
+
+
+# ---------------------------
+# End-to-end /analyze
+# ---------------------------
+def flask_app(stack, mock):
+    """Import the Flask app pointed at the mock (never the real Backboard)"""
+    os.environ['BACKBOARD_API_KEY'] = FAKE_KEY
+    os.environ['BACKBOARD_BASE_URL'] = mock.base_url
+    tmp = stack.enter_context(tempfile.TemporaryDirectory())
+    os.environ['BACKBOARD_STATE_FILE'] = os.path.join(tmp, 'state.json')
+    os.environ['JOB_DB'] = os.path.join(tmp, 'jobs.sqlite3')
+    os.environ['HANDOFF_DB'] = os.path.join(tmp, 'handoff.sqlite3')
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        app.backboard.base_url = mock.base_url
+        app.backboard.warm_up(background=False)
+    return app
+
+
+def post_flask(app, text, use_ai):
+    from result_cache import ResultCache
+    from verdict_cache import VerdictCache
+    app.result_cache = ResultCache()
+    app.backboard.verdict_cache = VerdictCache(max_distance=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = app.app.test_client().post('/analyze', json={'policy': text, 'use_ai': use_ai})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+@benchmark('flask_analyze_regex_50kb', kind='e2e')
+def flask_regex(stack):
+    mock = stack.enter_context(MockBackboard(latency=0.0))
+    app = flask_app(stack, mock)
+    text = make_policy(50, seed=6)
+    return lambda: post_flask(app, text, use_ai=False)
+
+
+@benchmark('flask_analyze_ai_backboard', kind='e2e', repeat=3)
+def flask_ai(stack):
+    mock = stack.enter_context(MockBackboard(latency=0.05))
+    app = flask_app(stack, mock)
+    # Set after warm-up, so only the LLM calls fail
+    mock.error_rate = 0.1
+    text = make_policy(20, risk_density=0.3, seed=7)
+    return lambda: post_flask(app, text, use_ai=True)
+
+
+@benchmark('extension_analyze_ollama', kind='e2e', repeat=3)
+def extension_ollama(stack):
+    import httpx
+    import main
+    from ollama_client import OllamaScheduler
+    from result_cache import ResultCache
+    from verdict_cache import VerdictCache
+
+    fake = stack.enter_context(FakeOllama(latency=0.05, slots=4, error_rate=0.1, seed=8))
+    main.ollama.url = fake.url
+    loop = asyncio.new_event_loop()
+    stack.callback(loop.close)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://app', timeout=None)
+    stack.callback(lambda: loop.run_until_complete(client.aclose()))
+    text = make_unique_policy(random.Random(8), 40)
+
+    async def post():
+        main.result_cache = ResultCache()
+        main.verdict_cache = VerdictCache(max_distance=1)
+        main.scheduler = OllamaScheduler(main.ollama, initial_limit=4, max_limit=4)
+        response = await client.post('/analyze', json={'text': text})
+        response.raise_for_status()
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            loop.run_until_complete(post())
+
+    return run
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+def calibrate(repeat=10):
+    """Seconds for a fixed mix of interpreter and regex work on this machine"""
+    text = make_policy(20, seed=99)
+    pattern = re.compile(r'\b(sell|retain|facial)\w*\b', re.IGNORECASE)
+
+    def work():
+        total = 0
+        for i in range(200000):
+            total += i * i % 7
+        for _ in range(20):
+            total += len(pattern.findall(text))
+        return total
+
+    return best_of(work, repeat)
+
+
+def best_of(fn, repeat):
+    fn()  # warm up
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_all(only=None):
+    results = {}
+    for bench in BENCHMARKS:
+        if only and not any(part in bench['name'] for part in only):
+            continue
+        with contextlib.ExitStack() as stack:
+            try:
+                fn = bench['setup'](stack)
+            except ImportError as e:
+                print(f"⏭️  {bench['name']}: skipped ({e})")
+                continue
+            seconds = best_of(fn, bench['repeat'])
+        results[bench['name']] = {'kind': bench['kind'], 'seconds': seconds}
+        print(f"⏱️  {bench['name']:<28} {seconds * 1000:>10.2f} ms")
+    return results
+
+
+def compare(results, calibration, baseline, threshold, check_e2e=False):
+    """Print each benchmark against the baseline; returns the names that regressed.
+
+    End-to-end results are only printed unless check_e2e: calibration can't
+    scale them, so a baseline from another machine says little about them.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28} {'ms':>10} {'baseline':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<28} {result['seconds'] * 1000:>10.2f} {'-':>10} {'new':>7}")
+            continue
+        ratio = result['seconds'] / base['seconds']
+        if result['kind'] == 'micro':
+            ratio /= calibration / baseline['calibration']
+        status = ''
+        if result['kind'] != 'micro' and not check_e2e:
+            status = '  (not checked)'
+        elif ratio > 1 + threshold:
+            status = '  ❌ regression'
+            regressions.append(name)
+        print(f"{name:<28} {result['seconds'] * 1000:>10.2f} {base['seconds'] * 1000:>10.2f} {ratio:>7.2f}{status}")
+    return regressions
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', help='run benchmarks whose name contains any of these')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store these timings as the new baseline')
+    parser.add_argument('--check', action='store_true', help='compare against the baseline, exit 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--check-e2e', action='store_true',
+                        help='also fail on end-to-end regressions (uncalibrated, for baselines from this machine)')
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    results = run_all(args.only)
+    # Measured on both sides of the run, so one busy moment doesn't skew every ratio
+    calibration = min(calibration, calibrate())
+    print(f"🧮 calibration {calibration * 1000:.2f} ms")
+
+    if args.save_baseline:
+        baseline = {'calibration': calibration, 'python': platform.python_version(), 'results': results}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"💾 Saved baseline to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, calibration, baseline, args.threshold, args.check_e2e)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,95 @@
+"""Seeded synthetic privacy policies for the benchmarks.
+
+The same seed always gives the same text, so timings and call counts are
+comparable between runs and machines.
+"""
+import random
+
+
+FILLER = [
+    "This Privacy Policy explains how the Company handles information when you use the website and mobile applications.",
+    "You can update your account settings at any time from the preferences page in the dashboard.",
+    "We use industry standard encryption to protect data in transit between your device and our servers.",
+    "If you have questions about this policy you may contact our support team using the form on the help page.",
+    "Cookies are small text files that are stored on your computer when you visit certain pages.",
+]
+
+RISKY = [
+    "We may sell aggregated personal information to carefully selected partners.",
+    "Advertisers may receive reports about how users interact with ads shown in the app.",
+    "We use facial recognition to help you tag friends in uploaded photos.",
+    "We retain your data for as long as necessary to provide the services.",
+    "We may use your information for other purposes at our discretion.",
+    "We process data where we have a legitimate business interest in doing so.",
+]
+
+# Lines the extension's keyword filter keeps, one topic each
+KEYWORD_LINES = [
+    "We collect precise location and GPS data to show nearby offers.",
+    "Our app may access your camera and microphone when you join a video call.",
+    "Face geometry and fingerprint templates are processed to unlock your account.",
+    "We store your account details and purchase history to provide the service.",
+    "Support transcripts are retained for 30 days and then deleted.",
+    "You can delete your account and its settings at any time from your profile.",
+    "Cookies store your language and display preferences on this device.",
+    "We use facial recognition to help you tag friends in uploaded photos.",
+    "We retain your data for as long as necessary to provide the services.",
+    "Location history is stored until you turn it off in settings.",
+    "Voice recordings may be reviewed to improve speech features.",
+    "Backups are deleted within 90 days of account closure.",
+]
+
+WORDS = (
+    "account", "partners", "service", "device", "browser", "advertising", "analytics",
+    "settings", "request", "country", "vendor", "profile", "session", "content", "purchase"
+)
+KEYWORD_LEADS = (
+    "We collect precise location and GPS data from your device",
+    "We may retain your information for as long as necessary",
+    "Face and fingerprint templates are processed for verification",
+    "The app may access your camera and microphone",
+    "We store usage records and delete them on request"
+)
+
+
+def make_policy(size_kb=None, risk_density=0.15, seed=0, clauses=None, paragraph_breaks=True):
+    """Dashboard-style policy: '\\n\\n'-separated paragraphs of 2-5 sentences.
+
+    Stops at size_kb kilobytes or after `clauses` paragraphs, whichever is
+    given. risk_density is the share of sentences taken from RISKY. Without
+    paragraph_breaks everything is one wall of text, the worst case for
+    clause splitting and pattern matching.
+    """
+    if size_kb is None and clauses is None:
+        raise ValueError("give size_kb or clauses")
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while True:
+        if size_kb is not None and total >= size_kb * 1024:
+            break
+        if clauses is not None and len(paragraphs) >= clauses:
+            break
+        sentences = [
+            rng.choice(RISKY) if rng.random() < risk_density else rng.choice(FILLER)
+            for _ in range(rng.randint(2, 5))
+        ]
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return ('\n\n' if paragraph_breaks else ' ').join(paragraphs)
+
+
+def make_keyword_policy(lines, seed=0):
+    """Extension-style policy: keyword lines in same-topic runs of four, like the sections of a real policy"""
+    rng = random.Random(seed)
+    return "\n".join(rng.choice(KEYWORD_LINES) for _ in range(lines // 4) for _ in range(4))
+
+
+def make_unique_policy(rng, paragraphs):
+    """Keyword lines padded with random filler, so no two policies (or chunks) repeat"""
+    lines = []
+    for _ in range(paragraphs):
+        filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60)))
+        lines.append(f"{rng.choice(KEYWORD_LEADS)} {filler}.")
+    return "\n".join(lines)
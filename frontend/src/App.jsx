@@ -1,29 +1,57 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import PolicyInput from "./components/PolicyInput";
 import RiskDashboard from "./components/RiskDashboard";
 import LoadingSpinner from "./components/LoadingSpinner";
-import { analyzePolicy } from "./utils/api";
+import { analyzePolicy, fetchHandoff, fetchJobResults } from "./utils/api";
 
 function App() {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [aiPending, setAiPending] = useState(false);
+  const [initialText, setInitialText] = useState("");
 
-  const handleAnalyze = async (policyText, useAI) => {
+  // Show the pattern findings while the AI validation job runs
+  const showRegexResults = (regexResults) => {
+    setResults(regexResults);
+    setLoading(false);
+    setAiPending(true);
+  };
+
+  const runAnalysis = async (analyze) => {
     setLoading(true);
     setError(null);
     setResults(null);
 
     try {
-      const data = await analyzePolicy(policyText, useAI);
-      setResults(data);
+      setResults(await analyze());
     } catch (err) {
       setError(err.message || "Analysis failed");
     } finally {
       setLoading(false);
+      setAiPending(false);
     }
   };
 
+  const handleAnalyze = (policyText, useAI) =>
+    runAnalysis(() => analyzePolicy(policyText, useAI, showRegexResults));
+
+  // Opened from the extension with ?handoff=<session>: load the page it sent,
+  // and the results if it already started the analysis
+  useEffect(() => {
+    const session = new URLSearchParams(window.location.search).get("handoff");
+    if (!session) return;
+
+    fetchHandoff(session)
+      .then((page) => {
+        setInitialText(page.page_text || "");
+        if (page.job_id) {
+          runAnalysis(() => fetchJobResults(page.job_id, showRegexResults));
+        }
+      })
+      .catch((err) => setError(err.message));
+  }, []);
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
       {/* Header */}
@@ -40,7 +68,11 @@ function App() {
 
       {/* Main Content */}
       <main className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
-        <PolicyInput onAnalyze={handleAnalyze} loading={loading} />
+        <PolicyInput
+          onAnalyze={handleAnalyze}
+          loading={loading || aiPending}
+          initialText={initialText}
+        />
 
         {loading && <LoadingSpinner />}
 
@@ -50,6 +82,24 @@ function App() {
           </div>
         )}
 
+        {aiPending && (
+          <div className="mt-6 bg-blue-50 border border-blue-200 rounded-lg p-4">
+            <p className="text-blue-800">
+              🤖 AI validation in progress. Pattern-based results are shown
+              below and will update when it finishes.
+            </p>
+          </div>
+        )}
+
+        {results?.ai_error && (
+          <div className="mt-6 bg-yellow-50 border border-yellow-200 rounded-lg p-4">
+            <p className="text-yellow-800">
+              AI validation failed ({results.ai_error}). Showing pattern-based
+              results only.
+            </p>
+          </div>
+        )}
+
         {results && <RiskDashboard results={results} />}
       </main>
 
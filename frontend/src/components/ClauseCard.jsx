@@ -14,10 +14,10 @@ export default function ClauseCard({ match, category }) {
       {match.ai_validation && (
         <div className="bg-blue-50 border border-blue-200 rounded p-3 mb-2">
           <div className="flex items-start gap-2">
-            <span className="text-lg">🤖</span>
+            <span className="text-lg">{match.validated_by === "rules" ? "📏" : "🤖"}</span>
             <div>
               <div className="font-semibold text-blue-900 text-sm">
-                AI Analysis:
+                {match.validated_by === "rules" ? "Rule Check:" : "AI Analysis:"}
               </div>
               <p className="text-sm text-blue-800 mt-1">
                 {match.ai_validation}
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 
-export default function PolicyInput({ onAnalyze, loading }) {
+export default function PolicyInput({ onAnalyze, loading, initialText }) {
   const [policyText, setPolicyText] = useState("");
   const [useAI, setUseAI] = useState(false);
 
@@ -26,12 +26,10 @@ We reserve the right to monetize user data in ways we deem appropriate.`;
     setPolicyText(sample);
   };
 
+  // Page text sent from the browser extension
   useEffect(() => {
-        fetch("http://127.0.0.1:5000/get_page")
-            .then(res => res.json())
-            .then(data => setPolicyText(data.page_text))
-            .catch(err => console.error(err));
-    }, []);
+    if (initialText) setPolicyText(initialText);
+  }, [initialText]);
 
   return (
     <div className="bg-white rounded-lg shadow-md p-6">
@@ -2,13 +2,109 @@ import axios from "axios";
 
 const API_URL = "http://localhost:5000";
 
-export async function analyzePolicy(policyText, useAI = false) {
+// Seconds each GET /jobs/<id> long-poll may wait (the server caps it at 30)
+const POLL_WAIT_SECONDS = 25;
+
+// Results come back in the compact format: each clause and pattern is sent
+// once and matches are [clause_id, start, end, pattern_id, extra?] spans.
+const COMPACT = { format: "compact" };
+
+function expandResults(results) {
+  if (results?.format !== "compact") {
+    return results;
+  }
+  const { format, clauses, patterns, ...rest } = results;
+  const expanded = {};
+  for (const [key, value] of Object.entries(rest)) {
+    if (!value || !Array.isArray(value.matches)) {
+      expanded[key] = value;
+      continue;
+    }
+    const matches = value.matches.map(([clauseId, start, end, patternId, extra = {}]) => {
+      const text = clauses[clauseId];
+      const { matched_keyword, position, pattern, ...fields } = extra;
+      return {
+        clause_id: clauseId,
+        text,
+        matched_keyword: start === null ? matched_keyword : text.slice(start, end),
+        keyword_start: start ?? fields.keyword_start,
+        position: position ?? clauseId,
+        pattern: patternId === null ? pattern : patterns[patternId],
+        ...fields,
+      };
+    });
+    expanded[key] = { ...value, matches };
+  }
+  return expanded;
+}
+
+function isPending(job) {
+  return job.status === "queued" || job.status === "running";
+}
+
+// Long-poll a job until it finishes. While it runs, onRegexResults gets
+// the regex results it was created with.
+async function waitForJob(job, onRegexResults) {
+  if (isPending(job) && onRegexResults) {
+    onRegexResults(expandResults(job.results));
+  }
+  while (isPending(job)) {
+    ({ data: job } = await axios.get(`${API_URL}/jobs/${job.job_id}`, {
+      params: { wait: POLL_WAIT_SECONDS, ...COMPACT },
+    }));
+  }
+
+  const results = expandResults(job.results);
+  if (job.status === "failed") {
+    // The regex findings still stand, only the AI validation is missing
+    return { ...results, ai_error: job.error };
+  }
+  return results;
+}
+
+// With AI the regex results come back at once (passed to onRegexResults)
+// and the GDPR validation runs as a background job on the server.
+export async function analyzePolicy(policyText, useAI = false, onRegexResults) {
+  try {
+    if (!useAI) {
+      const response = await axios.post(
+        `${API_URL}/analyze`,
+        { policy: policyText, use_ai: false },
+        { params: COMPACT }
+      );
+      return expandResults(response.data);
+    }
+
+    const { data: job } = await axios.post(
+      `${API_URL}/jobs`,
+      { policy: policyText },
+      { params: COMPACT }
+    );
+    return await waitForJob(job, onRegexResults);
+  } catch (error) {
+    throw new Error(error.response?.data?.error || "Analysis failed");
+  }
+}
+
+// A page sent by the extension: { page_text, job_id }. job_id is set when
+// the extension asked for the analysis to start right away.
+export async function fetchHandoff(session) {
   try {
-    const response = await axios.post(`${API_URL}/analyze`, {
-      policy: policyText,
-      use_ai: useAI,
+    const response = await axios.get(`${API_URL}/get_page`, {
+      params: { session },
     });
     return response.data;
+  } catch (error) {
+    throw new Error(error.response?.data?.error || "Could not load the page");
+  }
+}
+
+export async function fetchJobResults(jobId, onRegexResults) {
+  try {
+    const { data: job } = await axios.get(`${API_URL}/jobs/${jobId}`, {
+      params: COMPACT,
+    });
+    return await waitForJob(job, onRegexResults);
   } catch (error) {
     throw new Error(error.response?.data?.error || "Analysis failed");
   }
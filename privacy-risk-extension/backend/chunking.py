@@ -1,3 +1,17 @@
+import re
+
+from batching import CHARS_PER_TOKEN
+
+
+# Default chunk size in tokens. Prompt scaffolding plus the JSON answer need
+# roughly another 400, which fits the context main.py asks Ollama for.
+CHUNK_TOKENS = 1024
+
+# End of a sentence (punctuation, optional closing quote/bracket, whitespace)
+# or a line break
+SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+
+
 def chunk_text(text, chunk_size=300, overlap=30):
     chunks = []
     start = 0
@@ -9,4 +23,66 @@ def chunk_text(text, chunk_size=300, overlap=30):
         chunks.append(chunk)
         start += chunk_size - overlap
 
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+def _trimmed(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_sentences(text):
+    """(start, end) character spans of the sentences and lines in text"""
+    spans = []
+    start = 0
+    for m in SENTENCE_BREAK_RE.finditer(text):
+        span = _trimmed(text, start, m.end())
+        if span[0] < span[1]:
+            spans.append(span)
+        start = m.end()
+    span = _trimmed(text, start, len(text))
+    if span[0] < span[1]:
+        spans.append(span)
+    return spans
+
+
+def _fit(text, start, end, max_chars):
+    """Split a span longer than max_chars at whitespace (hard cut if there is none)"""
+    while end - start > max_chars:
+        cut = text.rfind(' ', start + 1, start + max_chars + 1)
+        if cut <= start:
+            cut = start + max_chars
+        piece = _trimmed(text, start, cut)
+        if piece[0] < piece[1]:
+            yield piece
+        start = _trimmed(text, cut, end)[0]
+    if start < end:
+        yield start, end
+
+
+def pack_sentences(text, token_budget=CHUNK_TOKENS):
+    """Pack whole sentences into chunks of at most token_budget tokens.
+
+    Returns (start, end) character offsets into text; every sentence lands
+    in exactly one chunk, with no overlap. A single sentence over the budget
+    is split at word boundaries.
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    chunks = []
+    chunk_start = chunk_end = None
+
+    for sentence_start, sentence_end in split_sentences(text):
+        for start, end in _fit(text, sentence_start, sentence_end, max_chars):
+            if chunk_start is not None and end - chunk_start > max_chars:
+                chunks.append((chunk_start, chunk_end))
+                chunk_start = None
+            if chunk_start is None:
+                chunk_start = start
+            chunk_end = end
+
+    if chunk_start is not None:
+        chunks.append((chunk_start, chunk_end))
+    return chunks
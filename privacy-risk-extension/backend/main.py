@@ -1,11 +1,26 @@
-from fastapi import FastAPI
-from chunking import chunk_text
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import requests
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
 import json
+import os
 import re
-from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+
+# Shared helpers (result cache, ...) live next to the Flask backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+from chunking import CHUNK_TOKENS, pack_sentences
+from batching import estimate_tokens, pack_batches, parse_json_array
+from result_cache import ResultCache, cache_key, fingerprint, normalize_text
+from verdict_cache import VerdictCache
+from cascade import Cascade
+from metrics import metrics
+from html_extract import PageReader, PageTooLarge, relevant_text, section_summary
+from segmenter import RULES as SEGMENTER_RULES, clause_spans
+from ollama_client import AsyncOllamaClient, OllamaScheduler
 
 app = FastAPI()
 
@@ -20,7 +35,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip JSON bodies for clients that accept it (SSE streams are left alone)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "qwen2.5:3b"  # Faster than 7B
+
+# qwen2.5:3b supports far more, but Ollama defaults to 2048 unless asked
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", CHUNK_TOKENS))
+
+# Pack several chunks into one Ollama prompt up to this many tokens (0 = off).
+# Keep it under OLLAMA_NUM_CTX, leaving room for the answer.
+OLLAMA_BATCH_TOKENS = int(os.getenv("OLLAMA_BATCH_TOKENS", 0))
+
+# Give up on whatever Ollama hasn't answered after this many seconds; the
+# partial verdict is returned but not cached
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE", 180))
+
+# Let /analyze/stream report flags as Ollama writes them instead of waiting
+# for each whole answer
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "1") == "1"
+
+result_cache = ResultCache.from_env()
+verdict_cache = VerdictCache.from_env()
+
+# Regex tier answers clear-cut chunks; only the rest go to Ollama
+cascade = Cascade.from_env()
+
+# One connection pool and one queue for every request in the process.
+# The concurrency limit starts at OLLAMA_CONCURRENCY and adapts to latency.
+ollama = AsyncOllamaClient(OLLAMA_URL, OLLAMA_MODEL, num_ctx=OLLAMA_NUM_CTX)
+scheduler = OllamaScheduler(
+    ollama,
+    initial_limit=int(os.getenv("OLLAMA_CONCURRENCY", 2)),
+    max_limit=int(os.getenv("OLLAMA_MAX_CONCURRENCY", 8)),
+    target_latency=float(os.getenv("OLLAMA_TARGET_LATENCY", 60))
+)
+
+
+@app.on_event("shutdown")
+async def close_ollama():
+    await ollama.aclose()
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+metrics.add_collector("result_cache_events_total", lambda: result_cache.stats, label="event")
+metrics.add_collector("verdict_cache", lambda: verdict_cache.summary(), kind="gauge")
+metrics.add_collector("cascade", lambda: cascade.summary(), kind="gauge")
+metrics.add_collector("ollama_scheduler", lambda: scheduler.summary(), kind="gauge")
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """Request latency, plus a Server-Timing breakdown when the caller sends X-Profile: 1"""
+    token = metrics.start_profile() if request.headers.get("x-profile") else None
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        profile = metrics.stop_profile(token) if token else None
+    elapsed = time.perf_counter() - start
+
+    route = getattr(request.scope.get("route"), "path", "other")
+    metrics.observe("http_request", elapsed, route=route)
+    metrics.inc("http_requests", route=route, status=response.status_code)
+    if profile is not None:
+        response.headers["Server-Timing"] = metrics.server_timing(profile, elapsed)
+    return response
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 # ---------------------------
@@ -53,6 +142,45 @@ Clause:
 """
 
 
+FLAG_KEYS = [
+    "mentions_biometric_data",
+    "mentions_location_tracking",
+    "mentions_camera_or_microphone",
+    "data_retention_policy_present",
+    "retention_duration_specified",
+]
+
+
+def build_batch_prompt(chunks):
+    clauses = "\n\n".join(f'[{i + 1}]\n"""{chunk}"""' for i, chunk in enumerate(chunks))
+    return f"""
+You are a privacy compliance analyst.
+
+Analyze each numbered clause below on its own.
+
+Return STRICT JSON only: an array with one object per clause, in order:
+
+[
+  {{
+    "id": 1,
+    "mentions_biometric_data": true/false,
+    "mentions_location_tracking": true/false,
+    "mentions_camera_or_microphone": true/false,
+    "data_retention_policy_present": true/false,
+    "retention_duration_specified": true/false,
+    "risk_reason": "brief explanation"
+  }}
+]
+
+Clauses:
+{clauses}
+"""
+
+
+# Prompt scaffolding cost per batch, on top of the chunks themselves
+BATCH_OVERHEAD_TOKENS = estimate_tokens(build_batch_prompt([]))
+
+
 # ---------------------------
 # Keyword Filtering (Huge Speed Boost)
 # ---------------------------
@@ -65,12 +193,16 @@ KEYWORDS = [
 
 
 def filter_relevant_paragraphs(text):
-    paragraphs = text.split("\n")
+    # Same clause boundaries as the dashboard's RiskAnalyzer, but short lines
+    # (a heading, a one-line bullet) are kept on their own
     relevant = []
 
-    for p in paragraphs:
-        if any(word in p.lower() for word in KEYWORDS):
-            relevant.append(p)
+    for start, end in clause_spans(text, min_chars=0):
+        clause = text[start:end]
+        # Lowercased once per clause, not once per keyword
+        lowered = clause.lower()
+        if any(word in lowered for word in KEYWORDS):
+            relevant.append(clause)
 
     return "\n".join(relevant)
 
@@ -78,37 +210,24 @@ def filter_relevant_paragraphs(text):
 # ---------------------------
 # Ollama Query (Safe + Robust)
 # ---------------------------
-def query_ollama(prompt):
+async def query_ollama(prompt, request_id, deadline, on_text=None):
     try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": "qwen2.5:3b",  # Faster than 7B
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=120
-        )
-
-        data = response.json()
-
-        # Handle Ollama returning error JSON
-        if "response" not in data:
-            print("Ollama error:", data)
+        raw_output = await scheduler.generate(request_id, prompt, deadline, on_text)
+        if raw_output is None:
             return {}
 
-        raw_output = data["response"]
-
         # Extract JSON safely (LLMs sometimes add extra text)
         json_match = re.search(r"\{.*\}", raw_output, re.DOTALL)
         if json_match:
             return json.loads(json_match.group())
         else:
             print("⚠️ No JSON found in:", raw_output)
+            metrics.inc("ollama_parse_failures", prompt="single")
             return {}
 
     except Exception as e:
-        print("Ollama request failed:", e)
+        print("Ollama response parse failed:", e)
+        metrics.inc("ollama_parse_failures", prompt="single")
         return {}
 
 
@@ -144,17 +263,78 @@ def aggregate_results(results):
 
 
 # ---------------------------
-# Chunk Processor (Thread Safe)
+# Chunk Processor
 # ---------------------------
-def process_chunk(chunk):
+async def process_chunk(chunk, request_id, deadline, on_text=None):
     try:
         prompt = build_prompt(chunk)
-        return query_ollama(prompt)
+        return await query_ollama(prompt, request_id, deadline, on_text)
     except Exception as e:
         print("Chunk failed:", e)
         return {}
 
 
+def _parse_flags(entry):
+    return entry if any(key in entry for key in FLAG_KEYS) else None
+
+
+async def process_batch(batch, request_id, deadline, on_text=None):
+    """One Ollama call for several chunks; chunks it didn't answer are retried alone"""
+    if len(batch) == 1:
+        return [await process_chunk(batch[0], request_id, deadline, on_text)]
+
+    raw_output = await scheduler.generate(request_id, build_batch_prompt(batch), deadline, on_text)
+    parsed = parse_json_array(raw_output, len(batch), _parse_flags)
+
+    retry = [i for i, flags in enumerate(parsed) if flags is None]
+    if retry:
+        print(f"⚠️ No verdict for {len(retry)} chunks in batch, retrying on their own")
+        metrics.inc("ollama_parse_failures", len(retry), prompt="batch")
+        retried = await asyncio.gather(*(process_chunk(batch[i], request_id, deadline, on_text) for i in retry))
+        for i, flags in zip(retry, retried):
+            parsed[i] = flags
+    return parsed
+
+
+# A flag the model has already written as true, before its answer is complete
+STREAMED_FLAG_RE = re.compile(r'"(%s)"\s*:\s*true' % "|".join(FLAG_KEYS))
+
+
+def flag_watcher(on_flags):
+    """on_text callback that reports each newly streamed true flag once"""
+    seen = set()
+    scanned = [0]
+
+    def on_text(text):
+        # Only look at what arrived since last time (plus room for a split match)
+        start = max(0, scanned[0] - 64)
+        scanned[0] = len(text)
+        found = set(STREAMED_FLAG_RE.findall(text, start)) - seen
+        if found:
+            seen.update(found)
+            on_flags({key: True for key in found})
+
+    return on_text
+
+
+def saturated(analysis):
+    """Every flag is already true, so further chunks can't change the answer"""
+    return all(analysis[key] for key in FLAG_KEYS)
+
+
+# ---------------------------
+# Result Cache
+# ---------------------------
+# Anything that changes the answer for the same text must be in here
+# Per-chunk verdicts only depend on the single-chunk prompt and model
+VERDICT_NAMESPACE = fingerprint(OLLAMA_MODEL, build_prompt("{clause}"))
+
+ANALYSIS_VERSION = fingerprint(
+    OLLAMA_MODEL, build_prompt("{clause}"), KEYWORDS, SEGMENTER_RULES, "sentences", CHUNK_TOKENS, cascade.version,
+    build_batch_prompt(["{clause}"]) if OLLAMA_BATCH_TOKENS else None, OLLAMA_BATCH_TOKENS
+)
+
+
 # ---------------------------
 # Analyze Endpoint
 # ---------------------------
@@ -164,11 +344,114 @@ async def analyze(request: dict):
     if not text:
         return {"error": "No text provided"}
 
+    return await cached_analysis(normalize_text(text))
+
+
+async def cached_analysis(text):
+    # Popular pages (Google, Meta, ...) are analyzed once; concurrent identical
+    # requests wait on the same Ollama run
+    key = cache_key(text, ANALYSIS_VERSION)
+    return await result_cache.get_or_compute_async(
+        key,
+        lambda: run_analysis(text),
+        cacheable=cacheable
+    )
+
+
+def cacheable(result):
+    return not result.get("failed") and not result.get("partial")
+
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: dict):
+    """Server-Sent Events: `progress` as chunks (or streamed flags) come in, then `result`"""
+    text = request.get("text", "")
+    if not text:
+        return {"error": "No text provided"}
+
+    return stream_analysis(normalize_text(text))
+
+
+def stream_analysis(text, first_events=()):
+    """SSE response for text; first_events are (event, payload) sent before any analysis"""
+    key = cache_key(text, ANALYSIS_VERSION)
+    cached = result_cache.get(key)
+
+    async def events():
+        for event, payload in first_events:
+            yield sse(event, payload)
+        if cached is not None:
+            yield sse("result", cached)
+            return
+        # If the extension closes the popup, the generator is closed and
+        # iter_analysis cancels whatever Ollama work is left
+        async for event, payload in iter_analysis(text, stream_tokens=OLLAMA_STREAM):
+            if event == "result" and cacheable(payload):
+                result_cache.set(key, payload)
+            yield sse(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/analyze/html")
+async def analyze_html(request: Request, stream: bool = False):
+    """The page's raw HTML (optionally gzip/deflate compressed), parsed as it arrives.
+
+    Boilerplate is dropped and only the policy sections html_extract finds
+    (retention, sharing, biometrics, ...) are analyzed, however long the
+    page. The answer carries an `extraction` summary; with ?stream=true it
+    is SSE like /analyze/stream, starting with an `extraction` event.
+    """
+    charset = re.search(r"charset=([\w.:-]+)", request.headers.get("content-type", ""))
+    try:
+        with metrics.timer("extract"):
+            reader = PageReader(request.headers.get("content-encoding"), charset.group(1) if charset else None)
+            async for data in request.stream():
+                reader.feed(data)
+            sections, stats = reader.close()
+    except PageTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    extraction = dict(stats, outline=section_summary(sections))
+    text = normalize_text(relevant_text(sections))
+    print(f"📄 Page: {stats['html_bytes']} bytes of HTML -> {len(text)} chars in {stats['relevant_sections']} sections")
+    if not text:
+        return JSONResponse({"error": "No policy sections found in the page", "extraction": extraction}, status_code=400)
+
+    if stream:
+        return stream_analysis(text, [("extraction", extraction)])
+    return dict(await cached_analysis(text), extraction=extraction)
+
+
+async def run_analysis(text):
+    result = None
+    async for _event, result in iter_analysis(text):
+        pass
+    return result
+
+
+async def iter_analysis(text, stream_tokens=False):
+    """Yield ("progress", result) as chunks are answered, then ("result", result).
+
+    Flags are OR-ed across chunks, so once all of them are true the rest of
+    the Ollama calls are cancelled and the result is final.
+    """
     print("Filtering text...")
-    filtered_text = filter_relevant_paragraphs(text)
+    with metrics.timer("filter"):
+        filtered_text = filter_relevant_paragraphs(text)
 
     if not filtered_text.strip():
-        return {
+        yield "result", {
             "analysis": {
                 "mentions_biometric_data": False,
                 "mentions_location_tracking": False,
@@ -178,19 +461,103 @@ async def analyze(request: dict):
                 "risk_reason": "No relevant clauses found."
             }
         }
+        return
+
+    # Whole sentences packed up to the token budget; nothing is dropped
+    with metrics.timer("chunking"):
+        chunks = [filtered_text[start:end] for start, end in pack_sentences(filtered_text, CHUNK_TOKENS)]
+
+    # Boilerplate chunks (or near-copies of them) were already answered for another site
+    with metrics.timer("verdict_cache"):
+        all_results = [verdict_cache.get(VERDICT_NAMESPACE, chunk) for chunk in chunks]
+    todo = [chunk for chunk, cached in zip(chunks, all_results) if cached is None]
+    all_results = [cached for cached in all_results if cached is not None]
+
+    with metrics.timer("cascade"):
+        settled, todo = cascade.route(todo)
+    all_results += [flags for _chunk, flags in settled]
+
+    if OLLAMA_BATCH_TOKENS:
+        batches = pack_batches(todo, OLLAMA_BATCH_TOKENS - BATCH_OVERHEAD_TOKENS, cost=estimate_tokens)
+    else:
+        batches = [[chunk] for chunk in todo]
+    cascade.record_llm_calls(len(batches))
+    print(
+        f"Processing {len(chunks)} chunks ({len(chunks) - len(todo) - len(settled)} cached, "
+        f"{len(settled)} settled by rules) in {len(batches)} Ollama calls"
+    )
+
+    # Flags seen in answers that are still being written
+    streamed = []
+    done = len(chunks) - len(todo)
+    is_saturated = bool(all_results) and saturated(aggregate_results(all_results))
+    partial = False
+
+    def progress():
+        return {
+            "analysis": aggregate_results(all_results + streamed),
+            "chunks_done": done,
+            "chunks_total": len(chunks)
+        }
 
-    chunks = chunk_text(filtered_text)
-    print(f"Processing {len(chunks)} chunks")
-
-    # CPU-safe worker count
-    max_workers = min(2, len(chunks))
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        all_results = list(executor.map(process_chunk, chunks[:10]))
-
+    if batches and not is_saturated:
+        # Ollama concurrency is the scheduler's job; this request just queues
+        # its calls and takes its fair turn with everyone else's
+        request_id = scheduler.new_request_id()
+        deadline = time.monotonic() + ANALYZE_DEADLINE
+        events = asyncio.Queue()
+        on_text = flag_watcher(lambda flags: events.put_nowait(("flags", flags))) if stream_tokens else None
+
+        async def run_batch(batch):
+            try:
+                results = await process_batch(batch, request_id, deadline, on_text)
+            except Exception as e:
+                print("Batch failed:", e)
+                results = [{} for _ in batch]
+            events.put_nowait(("batch", (batch, results)))
+
+        tasks = [asyncio.ensure_future(run_batch(batch)) for batch in batches]
+        pending = len(tasks)
+        try:
+            if done:
+                yield "progress", progress()
+            while pending:
+                kind, payload = await events.get()
+                if kind == "flags":
+                    streamed.append(payload)
+                else:
+                    pending -= 1
+                    batch, results = payload
+                    for chunk, flags in zip(batch, results):
+                        if flags:
+                            verdict_cache.put(VERDICT_NAMESPACE, chunk, flags)
+                        all_results.append(flags)
+                    done += len(batch)
+
+                current = progress()
+                if saturated(current["analysis"]):
+                    is_saturated = True
+                    break
+                yield "progress", current
+        finally:
+            for task in tasks:
+                task.cancel()
+            scheduler.cancel_request(request_id)
+
+        partial = not is_saturated and time.monotonic() >= deadline and not all(all_results)
+
+    all_results += streamed
     final_result = aggregate_results(all_results)
 
-    return {"analysis": final_result}
+    # Every Ollama call failed: still answer, but don't cache the empty verdict
+    if not any(all_results):
+        yield "result", {"analysis": final_result, "failed": True}
+    elif partial:
+        yield "result", {"analysis": final_result, "partial": True}
+    elif is_saturated and done < len(chunks):
+        yield "result", {"analysis": final_result, "saturated": True}
+    else:
+        yield "result", {"analysis": final_result}
 
 
 # ---------------------------
@@ -198,4 +565,9 @@ async def analyze(request: dict):
 # ---------------------------
 @app.post("/test")
 async def test():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "verdict_cache": verdict_cache.summary(),
+        "ollama": scheduler.summary(),
+        "cascade": cascade.summary()
+    }
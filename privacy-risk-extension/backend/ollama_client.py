@@ -0,0 +1,259 @@
+import asyncio
+import functools
+import itertools
+import json
+import time
+from collections import OrderedDict, deque
+
+import httpx
+
+from metrics import metrics
+
+
+class AsyncOllamaClient:
+    """Non-blocking /api/generate calls over one pooled keep-alive connection set"""
+
+    def __init__(self, url, model, num_ctx=4096, max_connections=16, timeout=120, rate_limiter=None):
+        self.url = url
+        self.model = model
+        self.num_ctx = num_ctx
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout
+        )
+
+    def _payload(self, prompt, stream):
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"num_ctx": self.num_ctx}
+        }
+
+    async def generate(self, prompt, timeout=None, on_text=None):
+        """Raw model output for a prompt, or None if Ollama failed.
+
+        With on_text, the answer is streamed and on_text(text_so_far) is
+        called as tokens arrive.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async()
+        start = time.perf_counter()
+        status = "cancelled"
+        try:
+            if on_text is not None:
+                text = await asyncio.wait_for(self._generate_stream(prompt, on_text), timeout)
+                status = "ok" if text is not None else "error"
+                return text
+
+            # httpx's timeout bounds each connect/read/write on its own; wait_for bounds the whole call
+            response = await asyncio.wait_for(
+                self._client.post(self.url, json=self._payload(prompt, False), timeout=timeout), timeout
+            )
+            data = response.json()
+
+            # Handle Ollama returning error JSON
+            if "response" not in data:
+                print("Ollama error:", data)
+                status = "error"
+                return None
+
+            status = "ok"
+            return data["response"]
+
+        except Exception as e:
+            status = "timeout" if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)) else "error"
+            print("Ollama request failed:", repr(e))
+            return None
+        finally:
+            metrics.observe("ollama_call", time.perf_counter() - start)
+            metrics.inc("ollama_calls", status=status)
+
+    async def _generate_stream(self, prompt, on_text):
+        # Ollama streams one JSON object per line, each with the next few tokens
+        text = ""
+        async with self._client.stream("POST", self.url, json=self._payload(prompt, True)) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if "error" in data:
+                    print("Ollama error:", data)
+                    return None
+                if data.get("response"):
+                    text += data["response"]
+                    on_text(text)
+                if data.get("done"):
+                    break
+        return text
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class _Job:
+    __slots__ = ("request_id", "prompt", "deadline", "on_text", "future")
+
+    def __init__(self, request_id, prompt, deadline, on_text, future):
+        self.request_id = request_id
+        self.prompt = prompt
+        self.deadline = deadline
+        self.on_text = on_text
+        self.future = future
+
+
+class OllamaScheduler:
+    """Process-wide queue in front of Ollama, shared by every /analyze request.
+
+    - Concurrency limit adapts to measured latency (AIMD): it grows by one
+      while calls finish within `tolerance` x the fastest latency seen (and
+      under target_latency, if given) and is cut by a quarter when they get
+      slower than that, since a saturated Ollama only queues work internally.
+    - Requests are served round-robin, so one huge policy can't starve a
+      short one queued behind it.
+    - Every job carries its request's deadline; jobs still queued when it
+      passes resolve to None without calling Ollama.
+    - cancel_request() drops a request's queued jobs and aborts its running
+      calls, e.g. once its answer can't change any more.
+    """
+
+    def __init__(self, client, initial_limit=2, min_limit=1, max_limit=8, target_latency=None, tolerance=2.0):
+        self.client = client
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.active = 0
+        self.ewma_latency = None
+        self.min_latency = None
+        self._last_decrease = 0.0
+        self._queues = OrderedDict()  # request id -> deque of jobs
+        self._running = {}  # request id -> set of tasks calling Ollama
+        self._ids = itertools.count()
+        self.stats = {"completed": 0, "failed": 0, "expired": 0, "cancelled": 0}
+
+    def new_request_id(self):
+        return next(self._ids)
+
+    @property
+    def queued(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def submit(self, request_id, prompt, deadline=None, on_text=None):
+        """Queue a prompt; returns a future resolving to the raw output or None"""
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(request_id, prompt, deadline, on_text, future)
+        self._queues.setdefault(request_id, deque()).append(job)
+        self._pump()
+        return future
+
+    async def generate(self, request_id, prompt, deadline=None, on_text=None):
+        return await self.submit(request_id, prompt, deadline, on_text)
+
+    def cancel_request(self, request_id):
+        """Drop everything a request still has queued and abort its running calls"""
+        for job in self._queues.pop(request_id, ()):
+            if not job.future.done():
+                job.future.set_result(None)
+        for task in self._running.pop(request_id, ()):
+            task.cancel()
+
+    def _next_job(self):
+        while self._queues:
+            request_id, queue = self._queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # Back of the line: round-robin across requests
+                self._queues[request_id] = queue
+            if job.future.done():
+                continue
+            if job.deadline is not None and time.monotonic() >= job.deadline:
+                self.stats["expired"] += 1
+                job.future.set_result(None)
+                continue
+            return job
+        return None
+
+    def _pump(self):
+        while self.active < self.limit:
+            job = self._next_job()
+            if job is None:
+                return
+            self.active += 1
+            task = asyncio.ensure_future(self._call(job))
+            # Bookkeeping in a done callback: it also runs for tasks cancelled
+            # before they ever started
+            task.add_done_callback(functools.partial(self._finish, job, time.monotonic()))
+            self._running.setdefault(job.request_id, set()).add(task)
+
+    async def _call(self, job):
+        timeout = None
+        if job.deadline is not None:
+            timeout = max(job.deadline - time.monotonic(), 0.001)
+        return await self.client.generate(job.prompt, timeout=timeout, on_text=job.on_text)
+
+    def _finish(self, job, start, task):
+        self.active -= 1
+        running = self._running.get(job.request_id)
+        if running is not None:
+            running.discard(task)
+            if not running:
+                del self._running[job.request_id]
+
+        now = time.monotonic()
+        result = None
+        if task.cancelled():
+            self.stats["cancelled"] += 1
+        elif task.exception() is not None:
+            print("Ollama scheduler job failed:", repr(task.exception()))
+            self._observe(now - start, ok=False)
+        else:
+            result = task.result()
+            if result is None and job.deadline is not None and now >= job.deadline:
+                # Cut off by the request's deadline, says nothing about Ollama's load
+                self.stats["expired"] += 1
+            else:
+                self._observe(now - start, ok=result is not None)
+
+        if not job.future.done():
+            job.future.set_result(result)
+        self._pump()
+
+    def _observe(self, latency, ok):
+        self.stats["completed" if ok else "failed"] += 1
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = 0.8 * self.ewma_latency + 0.2 * latency
+
+        if ok and (self.min_latency is None or latency < self.min_latency):
+            self.min_latency = latency
+
+        target = self.min_latency * self.tolerance if self.min_latency else None
+        if self.target_latency is not None:
+            target = min(target, self.target_latency) if target else self.target_latency
+
+        now = time.monotonic()
+        if not ok or (target is not None and self.ewma_latency > target):
+            # Calls started before the last cut still report the old latency;
+            # give the smaller limit one round trip before cutting again
+            if now - self._last_decrease > self.ewma_latency:
+                self.limit = max(self.min_limit, int(self.limit * 0.75))
+                self._last_decrease = now
+        elif self.active + 1 >= self.limit and self.limit < self.max_limit:
+            # Only grow while the current limit is actually being used
+            self.limit += 1
+
+    def summary(self):
+        return dict(
+            self.stats,
+            limit=self.limit,
+            active=self.active,
+            queued=self.queued,
+            ewma_latency=round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            min_latency=round(self.min_latency, 3) if self.min_latency is not None else None
+        )
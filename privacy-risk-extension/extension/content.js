@@ -20,6 +20,11 @@ function extractText() {
     return document.body.innerText;
 }
 
+// The whole page; the backend finds the policy sections itself, so nothing is cut off
+function extractHtml() {
+    return document.documentElement.outerHTML;
+}
+
 // Listen for popup request
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     if (request.action === "extractText") {
@@ -32,4 +37,11 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
         });
 
     }
+
+    if (request.action === "extractHtml") {
+        sendResponse({
+            isPolicyPage: isPolicyPage(),
+            pageHtml: extractHtml()
+        });
+    }
 });
\ No newline at end of file
@@ -7,6 +7,15 @@ document.addEventListener("DOMContentLoaded", () => {
         resultsContainer.innerHTML = `<div class="spinner"></div> ${message}`;
     }
 
+    // Policy pages compress ~5-10x; older browsers just send the plain HTML
+    async function gzipBody(text) {
+        if (typeof CompressionStream === "undefined") {
+            return { body: text, headers: {} };
+        }
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream("gzip"));
+        return { body: await new Response(stream).blob(), headers: { "Content-Encoding": "gzip" } };
+    }
+
     analyzeBtn.addEventListener("click", async () => {
         // resultsContainer.innerHTML = "Analyzing policy... ⏳";
         
@@ -15,31 +24,67 @@ document.addEventListener("DOMContentLoaded", () => {
             const [tab] = await chrome.tabs.query({ active: true, currentWindow: true });
             showSpinner("Analyzing page...");
             
-            // Request text from content script
-            chrome.tabs.sendMessage(tab.id, { action: "extractText" }, async (response) => {
+            // Request the page's HTML from content script
+            chrome.tabs.sendMessage(tab.id, { action: "extractHtml" }, async (response) => {
                 if (!response || !response.isPolicyPage) {
                     resultsContainer.innerText = "This does not appear to be a privacy or terms page.";
                     return;
                 }
 
-                const pageText = response.pageText;
-
                 try {
-                    const res = await fetch("http://127.0.0.1:8000/analyze", {
+                    // The backend strips boilerplate and keeps the policy sections.
+                    // Server-Sent Events: "extraction", "progress" after each chunk, then "result"
+                    const { body, headers } = await gzipBody(response.pageHtml);
+                    const res = await fetch("http://127.0.0.1:8000/analyze/html?stream=true", {
                         method: "POST",
-                        headers: { "Content-Type": "application/json" },
-                        body: JSON.stringify({ text: pageText })
+                        headers: { "Content-Type": "text/html; charset=utf-8", ...headers },
+                        body
                     });
 
-                    const data = await res.json();
+                    if (!res.ok) {
+                        const error = await res.json().catch(() => ({}));
+                        resultsContainer.innerText = error.error || "Failed to get analysis from backend.";
+                        return;
+                    }
+
+                    const reader = res.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = "";
+                    let data = null;
+                    let finished = false;
+
+                    while (!finished) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+
+                        let boundary;
+                        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                            const message = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+
+                            const event = (message.match(/^event: (.*)$/m) || [])[1];
+                            const payload = (message.match(/^data: (.*)$/m) || [])[1];
+                            if (!payload) continue;
+
+                            data = JSON.parse(payload);
+                            if (!data.analysis) continue;
+
+                            finished = event === "result";
+                            renderAnalysis(data.analysis);
+                            if (!finished && data.chunks_total) {
+                                const status = document.createElement("div");
+                                status.innerHTML = `<div class="spinner"></div> ${data.chunks_done} / ${data.chunks_total} sections checked`;
+                                resultsContainer.appendChild(status);
+                            }
+                        }
+                    }
 
-                    if (!data.analysis) {
+                    if (!data || !data.analysis) {
                         resultsContainer.innerText = "Failed to get analysis from backend.";
                         return;
                     }
 
-                    renderAnalysis(data.analysis);
-
                 } catch (err) {
                     console.error("Error during fetch:", err);
                     resultsContainer.innerText = "Error contacting analysis server.";
@@ -103,16 +148,20 @@ document.addEventListener("DOMContentLoaded", () => {
             const pageText = response.pageText;
             resultsDiv.innerText = "Sending page data... ⏳";
 
+            // The web app asks for this session's page, so concurrent users don't see each other's
+            const session = crypto.randomUUID();
+
             try {
                 const res = await fetch("http://127.0.0.1:5000/receive_data", {
                     method: "POST",
                     headers: { "Content-Type": "application/json" },
-                    body: JSON.stringify({ page_text: pageText })
+                    // analyze: the dashboard gets the results without sending the text back
+                    body: JSON.stringify({ page_text: pageText, session, analyze: true })
                 });
 
                 if (!res.ok) throw new Error("Failed to send page text");
 
-                window.open("http://localhost:5173/", "_blank");
+                window.open(`http://localhost:5173/?handoff=${session}`, "_blank");
                 resultsDiv.innerText = "Page data sent! ✅";
             } catch (err) {
                 console.error(err);
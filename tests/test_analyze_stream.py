@@ -0,0 +1,75 @@
+"""analyze_stream() must give exactly what analyze() gives, with or without a match budget.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import segmenter
+from risk_analyzer import RiskAnalyzer
+from synthetic import RISKY, make_policy
+
+
+WORDS = ('we may share your data with partners and sell personal information to advertisers '
+         'retain indefinitely biometric e.g. 1.5 U.S. the of').split()
+JOINS = ['\n\n', '\n', ' ', '\n  \n', '\nand ', '. ', '\n1. ', '\n- ', '']
+
+
+def random_policy(seed):
+    """Risky sentences, headings, list items, hard wraps and long unpunctuated runs"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(rng.randint(1, 60)):
+        kind = rng.random()
+        if kind < 0.3:
+            parts.append(rng.choice(RISKY))
+        elif kind < 0.5:
+            parts.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 600))))
+        elif kind < 0.6:
+            parts.append('Heading')
+        else:
+            sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40))).capitalize()
+            parts.append(sentence + rng.choice(['.', '!', '?', '."', '', '.)']))
+        parts.append(rng.choice(JOINS))
+    return ''.join(parts)
+
+
+def texts():
+    yield make_policy(40, risk_density=0.3, seed=1)
+    yield make_policy(40, risk_density=0.3, seed=2).replace('\n\n', '\n')
+    yield make_policy(40, risk_density=0.3, seed=3, paragraph_breaks=False)
+    for seed in range(60):
+        yield random_policy(seed)
+
+
+@pytest.fixture
+def small_reads(monkeypatch):
+    # Segment after nearly every chunk, so clauses are held back and resumed all the time
+    monkeypatch.setattr(segmenter, 'STREAM_READ_CHARS', 16)
+    monkeypatch.setattr(segmenter, 'STREAM_KEEP_CHARS', 16)
+
+
+@pytest.mark.parametrize('match_budget', [None, 20, 450, 3000])
+@pytest.mark.parametrize('chunk_size', [1, 97, 4096])
+def test_stream_matches_analyze(small_reads, match_budget, chunk_size):
+    analyzer = RiskAnalyzer(match_budget=match_budget)
+    for text in texts():
+        chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+        assert analyzer.analyze_stream(chunks) == analyzer.analyze(text)
+
+
+def test_stream_memory_is_bounded_with_budget(small_reads):
+    # One 1.5 MB clause: with a budget only about its first max(budget, 2000) chars are held
+    held = []
+    chunks = ('we may share your data with partners for business purposes ' * 50 for _ in range(500))
+    for text, start, end in segmenter.stream_clause_spans(chunks, max_clause_chars=401):
+        held.append(len(text))
+    assert len(held) == 1
+    assert max(held) < 10000
@@ -0,0 +1,90 @@
+"""enhance_analysis() marks results it couldn't fully validate, and those are never cached.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from backboard_client import BackboardClient
+from result_cache import ResultCache
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+@pytest.fixture
+def client():
+    # Nothing listens on port 9; every test replaces the network calls
+    client = BackboardClient('k' * 32, base_url='http://127.0.0.1:9', gdpr_mode='local')
+    client.assistant_id = 'assistant'
+    return client
+
+
+@pytest.fixture
+def results():
+    return RiskAnalyzer().analyze(make_policy(20, risk_density=0.6, seed=7))
+
+
+def clause_count(results):
+    return sum(len(results[c]['matches'][:3]) for c in ('data_resale', 'biometric', 'indefinite_retention', 'vague_language'))
+
+
+def test_full_pass_gets_ai_version(client, results, monkeypatch):
+    monkeypatch.setattr(client, '_enhance_match', lambda match, focus: {'ai_validation': 'NO'})
+    results = client.enhance_analysis(results)
+    assert results['ai_version'] == client.version
+    assert 'ai_partial' not in results and 'ai_failed' not in results
+
+
+def test_no_assistant(client, results, monkeypatch):
+    monkeypatch.setattr(client, '_get_or_create_assistant', lambda: None)
+    expected = clause_count(results)
+    results = client.enhance_analysis(results)
+    assert results['ai_partial'] is True and results['ai_failed'] == expected
+    assert 'ai_version' not in results
+
+
+def test_failed_calls(client, results, monkeypatch):
+    failing = results['biometric']['matches'][0]['text']
+    monkeypatch.setattr(client, '_enhance_match',
+                        lambda match, focus: None if match['text'] == failing else {'ai_validation': 'NO'})
+    results = client.enhance_analysis(results)
+    assert results['ai_partial'] is True and results['ai_failed'] >= 1
+    assert 'ai_version' not in results
+
+    # Retrying clears the markers once every call succeeds
+    monkeypatch.setattr(client, '_enhance_match', lambda match, focus: {'ai_validation': 'NO'})
+    results = client.enhance_analysis(results)
+    assert 'ai_partial' not in results and results['ai_version'] == client.version
+
+
+def test_only_complete_results_are_cached(client, results, monkeypatch):
+    cache = ResultCache()
+    calls = []
+
+    def run_analysis():
+        calls.append(1)
+        return client.enhance_analysis(dict(results))
+
+    monkeypatch.setattr(client, '_get_or_create_assistant', lambda: None)
+    for _ in range(2):
+        cache.get_or_compute('key', run_analysis, cacheable=client.is_complete)
+    assert len(calls) == 2 and cache.get('key') is None
+
+    monkeypatch.setattr(client, '_get_or_create_assistant', lambda: 'assistant')
+    monkeypatch.setattr(client, '_enhance_match', lambda match, focus: {'ai_validation': 'NO'})
+    cache.get_or_compute('key', run_analysis, cacheable=client.is_complete)
+    assert cache.get('key')['ai_version'] == client.version
+
+
+def test_is_complete_needs_every_enhanced_clause(client, results, monkeypatch):
+    monkeypatch.setattr(client, '_enhance_match', lambda match, focus: {'ai_validation': 'NO'})
+    results = client.enhance_analysis(results)
+    assert client.is_complete(results)
+    del results['biometric']['matches'][0]['ai_validation']
+    assert not client.is_complete(results)
@@ -0,0 +1,57 @@
+"""The cascade settles a match with a rule verdict only on positive evidence.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from cascade import SURE, Cascade
+from risk_analyzer import RiskAnalyzer
+from rules import load_rules
+
+
+@pytest.fixture(scope='module')
+def cascade():
+    return Cascade()
+
+
+@pytest.mark.parametrize('category, text, term', [
+    ('indefinite_retention', 'You can permanently delete your account at any time from your settings.', 'permanently'),
+    ('indefinite_retention', "We don't keep your messages permanently.", 'permanently'),
+    ('indefinite_retention', 'We retain data as long as necessary.', 'as long as necessary'),
+    ('indefinite_retention', 'We keep logs permanently, unless you ask, then for 30 days.', 'permanently'),
+    ('biometric', 'We do not collect biometric identifiers of any kind.', 'biometric'),
+    ('biometric', 'Biometric laws in Illinois give residents additional rights.', 'Biometric'),
+])
+def test_escalates_without_positive_evidence(cascade, category, text, term):
+    _fields, confidence = cascade.assess_match(category, {'text': text, 'matched_keyword': term})
+    assert confidence < cascade.threshold
+
+
+@pytest.mark.parametrize('category, text, term', [
+    ('indefinite_retention', 'We retain your personal data indefinitely.', 'indefinitely'),
+    ('indefinite_retention', 'Your messages are stored permanently on our servers.', 'permanently'),
+    ('biometric', 'We collect biometric identifiers such as face geometry to verify you.', 'biometric'),
+])
+def test_settles_affirmative_matches(cascade, category, text, term):
+    fields, confidence = cascade.assess_match(category, {'text': text, 'matched_keyword': term})
+    assert confidence == SURE
+    assert fields['validated_by'] == 'rules'
+
+
+def test_negated_chunk_goes_to_llm(cascade):
+    settled, escalated = cascade.route(['We do not collect biometric identifiers such as fingerprints or face scans.'])
+    assert escalated and not settled
+
+
+def test_rule_file_without_the_categories():
+    rules = load_rules()
+    del rules['categories']['biometric']
+    cascade = Cascade(RiskAnalyzer(rules=rules))
+    flags, _confidence, reasons = cascade.assess('We collect biometric data such as fingerprints.')
+    assert flags['mentions_biometric_data'] is False and not reasons
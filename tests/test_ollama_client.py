@@ -0,0 +1,35 @@
+"""An Ollama call gives up at its deadline, however the time is spread over the request.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'privacy-risk-extension', 'backend'))
+
+from ollama_client import AsyncOllamaClient
+
+
+async def slow_ollama(request):
+    # No single phase is slow enough for httpx's own timeout to notice
+    await asyncio.sleep(1)
+    return httpx.Response(200, json={'response': '{}'})
+
+
+def test_non_streaming_call_keeps_its_deadline():
+    async def call():
+        client = AsyncOllamaClient('http://ollama/api/generate', 'model')
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(slow_ollama))
+        start = time.perf_counter()
+        text = await client.generate('prompt', timeout=0.1)
+        return text, time.perf_counter() - start
+
+    text, seconds = asyncio.run(call())
+    assert text is None
+    assert seconds < 0.5
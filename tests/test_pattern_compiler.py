@@ -0,0 +1,58 @@
+"""Folded patterns must find exactly what the IGNORECASE originals find.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from pattern_compiler import CompiledPatternSet, fold_pattern
+from risk_analyzer import RiskAnalyzer
+from segmenter import folded
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    (r'\bshare.{0,100}\bdata', r'share(?<=\bshare).{0,100}\bdata'),
+    (r'\bads?\b', r'ad(?<=\bad)s?\b'),
+    (r'\b(sell|sold)\s+data', r'(sell(?<=\bsell)|sold(?<=\bsold))\s+data'),
+    (r'\b(?:a|b)?x', r'\b(?:a|b)?x'),
+    (r'\b[a-z]+ing\b', r'\b[a-z]+ing\b'),
+    (r'\bShare\b', None),
+    (r'[A-Z]{2}', None),
+    (r'(?-i:sell)', None),
+])
+def test_fold_pattern(pattern, expected):
+    assert fold_pattern(pattern) == expected
+
+
+WORDS = ['We', 'SELL', 'sell', 'Sold', 'data', 'Share', 'ADS', 'ads', 'adsorb', 'with', 'partners', 'İ',
+         'straße', 'ſell', 'Biometric', 'Kelvin', 'to', 'target', 'FINGERPRINT', '.', ',', '\n', 'permanently']
+
+
+def test_folded_scan_matches_original():
+    patterns = dict(RiskAnalyzer().patterns)
+    patterns['extra'] = {'weight': 1, 'patterns': [r'\bads?\b', r'\b(sell|sold)\s+data', r'[A-Z]{3,}', r'\bSELL\b']}
+    engine = CompiledPatternSet(patterns)
+    rng = random.Random(7)
+    for _ in range(500):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 80)))
+        lowered = folded(text)
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, len(text))
+        # No lowered: the IGNORECASE patterns on the original text
+        expected = engine.scan(text, start, end)
+        assert engine.scan(text, start, end, lowered=lowered) == expected
+        assert engine.scan_all(text, start, end, lowered=lowered) == engine.scan_all(text, start, end)
+
+
+def test_rewritten_patterns_compile_like_the_originals():
+    for category in RiskAnalyzer().engine.categories:
+        for pattern, compiled in zip(category.patterns, category.folded):
+            assert compiled is not None, pattern
+            assert re.compile(pattern, re.IGNORECASE).groups == compiled.groups
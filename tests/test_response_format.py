@@ -0,0 +1,45 @@
+"""Compact spans point at the text that actually matched, and expand back to the full format.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from response_format import compact_results, expand_results
+from risk_analyzer import RiskAnalyzer
+from synthetic import make_policy
+
+
+# 'biometric' occurs first inside a word the pattern's \b rules out
+EARLIER = 'Our nonbiometric checks stay on your device, but we use biometric identifiers to log you in.'
+
+
+def test_span_is_the_real_match():
+    analyzer = RiskAnalyzer()
+    results = analyzer.analyze(EARLIER)
+    match = results['biometric']['matches'][0]
+    assert match['keyword_start'] == EARLIER.index(' biometric') + 1
+
+    compact = compact_results(results, analyzer)
+    _clause_id, start, end, _pattern_id = compact['biometric']['matches'][0]
+    assert (start, end) == (match['keyword_start'], match['keyword_start'] + len('biometric'))
+    assert expand_results(compact) == results
+
+
+def test_round_trip():
+    analyzer = RiskAnalyzer(match_budget=450)
+    for text in (make_policy(40, risk_density=0.5, seed=5), make_policy(40, risk_density=0.5, seed=6, paragraph_breaks=False)):
+        results = analyzer.analyze(text)
+        assert expand_results(compact_results(results, analyzer)) == results
+
+
+def test_results_from_before_keyword_start():
+    analyzer = RiskAnalyzer()
+    results = analyzer.analyze(EARLIER)
+    del results['biometric']['matches'][0]['keyword_start']
+    _clause_id, start, _end, _pattern_id = compact_results(results, analyzer)['biometric']['matches'][0]
+    assert start == EARLIER.index('biometric')
@@ -0,0 +1,72 @@
+"""analyze_revision() rejects a malformed client-supplied 'previous' with RevisionError (a 400).
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from revisions import RevisionError, check_matches
+from risk_analyzer import RiskAnalyzer
+from similarity import clause_hash
+from synthetic import make_policy
+
+
+@pytest.fixture(scope='module')
+def first():
+    analyzer = RiskAnalyzer()
+    text = make_policy(20, risk_density=0.5, seed=4)
+    return analyzer, text, analyzer.analyze_revision(text)
+
+
+def test_unchanged_revision_reuses_every_clause(first):
+    analyzer, text, previous = first
+    results = analyzer.analyze_revision(text, previous)
+    assert results['revision']['rescanned'] == 0
+    assert {k: v for k, v in results.items() if k != 'revision'} == \
+        {k: v for k, v in previous.items() if k != 'revision'}
+
+
+def breakages(previous):
+    def clauses(p):
+        return p['clause_index']['clauses']
+    yield lambda p: 'not a result'
+    yield lambda p: dict(p, clause_index=[])
+    yield lambda p: dict(p, clause_index={'version': p['clause_index']['version']})
+    yield lambda p: clauses(p).append(None)
+    yield lambda p: clauses(p)[0].update(simhash='zz')
+    yield lambda p: clauses(p)[0].pop('hash')
+    yield lambda p: clauses(p)[0].update(hits={'biometric': [0]})
+    yield lambda p: clauses(p)[0].update(hits={'biometric': [10 ** 6, 'biometric']})
+    yield lambda p: clauses(p)[0].update(hits={'no_such_category': [0, 'x']})
+    yield lambda p: clauses(p)[0].update(hits={'biometric': [0, 'biometric', -1]})
+
+
+def test_malformed_previous_raises_revision_error(first):
+    analyzer, text, previous = first
+    for breakage in breakages(previous):
+        broken = copy.deepcopy(previous)
+        broken = breakage(broken) or broken
+        with pytest.raises(RevisionError):
+            analyzer.analyze_revision(text, broken)
+
+
+def test_match_clause_ids_are_bounds_checked(first):
+    _analyzer, _text, previous = first
+    category = 'data_resale'
+    broken = copy.deepcopy(previous)
+    broken[category]['matches'] = [{'clause_id': len(previous['clause_index']['clauses'])}]
+    with pytest.raises(RevisionError):
+        check_matches(broken, category, len(broken['clause_index']['clauses']))
+
+
+def test_clause_hash_keeps_punctuation_and_digits():
+    assert clause_hash('We keep data for 30  days.') == clause_hash('We keep data\nfor 30 days.')
+    assert clause_hash('We keep data for 30 days.') != clause_hash('We keep data for 3.0 days.')
+    assert clause_hash('We sell data.') != clause_hash('We sell data?')
@@ -0,0 +1,45 @@
+"""Rule files are rejected with a RuleError listing the problems, never a crash or a half-loaded analyzer.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import rule_registry
+from rule_registry import RuleRegistry
+from rules import RuleError, load_rules, validate_rules
+
+
+@pytest.mark.parametrize('scoring', [[70, 100], 'strict', 5])
+def test_scoring_that_is_not_an_object(scoring):
+    rules = dict(load_rules(), scoring=scoring)
+    with pytest.raises(RuleError) as e:
+        validate_rules(rules)
+    assert e.value.problems == ['"scoring" must be an object']
+
+
+def test_unsafe_patterns_are_problems():
+    rules = load_rules()
+    rules['categories']['biometric']['patterns'] = [r'\bbiometric\b', r'(\w+\s?)+$', r'(face\s*)+scan']
+    with pytest.raises(RuleError) as e:
+        validate_rules(rules)
+    assert [p.split(':')[0] for p in e.value.problems] == ['biometric.patterns[1]', 'biometric.patterns[2]']
+    assert 'nested unbounded quantifier' in e.value.problems[0]
+
+
+def test_remembered_samples_are_capped(monkeypatch):
+    monkeypatch.setattr(rule_registry, 'BENCH_SAMPLE_CHARS', 1000)
+    monkeypatch.setattr(rule_registry, 'BENCH_CHARS', 3000)
+    registry = RuleRegistry(watch_seconds=0)
+    for _ in range(10):
+        registry.remember('We may sell your data.\n' * 200)
+    samples = registry.samples()
+    assert len(samples) == 3
+    assert all(len(text) <= 1000 and text.endswith('.') for text in samples)
+    registry.remember('short')
+    assert len(registry.samples()) == 4
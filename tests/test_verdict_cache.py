@@ -0,0 +1,57 @@
+"""Near-duplicate verdict lookups must not cross a negation.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from verdict_cache import VerdictCache
+
+
+SELLS = {'ai_validation': 'YES - sale of personal data without consent'}
+NEGATED = 'We do not sell your personal information to third parties.'
+AFFIRMED = 'We sell your personal information to third parties.'
+BOILERPLATE = ('We may share information we collect about you with our affiliates, service providers and '
+               'business partners for business purposes, such as providing customer support, processing '
+               'payments, and improving our services, and as otherwise permitted by law.')
+
+
+def test_negated_clause_does_not_reuse_verdict():
+    for max_distance in (VerdictCache().max_distance, 7):
+        cache = VerdictCache(max_distance=max_distance)
+        cache.put('ns', AFFIRMED, SELLS)
+        assert cache.get('ns', NEGATED) is None
+        cache.put('ns', NEGATED, {'ai_validation': 'NO'})
+        assert cache.get('ns', AFFIRMED) == SELLS
+
+
+def test_near_duplicate_still_hits():
+    cache = VerdictCache()
+    cache.put('ns', BOILERPLATE, SELLS)
+    assert cache.get('ns', BOILERPLATE.replace('business partners', 'partners')) == SELLS
+    assert cache.stats['near_hits'] == 1
+    assert cache.get('ns', BOILERPLATE.replace('We may share', 'We never share')) is None
+
+
+def test_store_from_before_polarity_only_serves_exact_hits(tmp_path):
+    path = str(tmp_path / 'verdicts.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE verdicts (
+            id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, clause_hash TEXT NOT NULL,
+            simhash TEXT NOT NULL, verdict TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL,
+            UNIQUE (namespace, clause_hash)
+        );
+    ''')
+    conn.close()
+    old = VerdictCache(path)
+    old.put('ns', BOILERPLATE, SELLS)
+    old._conn.execute('UPDATE verdicts SET polarity = NULL')
+    old._conn.commit()
+    cache = VerdictCache(path)
+    assert cache.get('ns', BOILERPLATE) == SELLS
+    assert cache.get('ns', BOILERPLATE.replace('business partners', 'partners')) is None